@@ -0,0 +1,106 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from torpido.config.cache import Cache
+from torpido.config.config import Config
+from torpido.config.constants import CACHE_FPS, CACHE_FRAME_COUNT, CACHE_RANK_BIN, CACHE_RANK_MOTION, \
+    CACHE_RANK_BLUR, CACHE_RANK_TEXT, CACHE_RANK_AUDIO, CACHE_SHOTS
+from torpido.tools.features import FeatureTrack, save_features, load_features
+from torpido.tools.ranking import Ranking
+from torpido.tools.recut import recut, _text_ranks
+from torpido.tools.sweep import sweep, _text_hits
+
+
+class FeatureTrackTest(unittest.TestCase):
+    def test_extend(self):
+        track = FeatureTrack()
+        track.extend([1.5, 2.5])
+        track.extend([3.5])
+        self.assertEqual(3, len(track))
+        self.assertListEqual([1.5, 2.5, 3.5], track.values().tolist())
+
+    def test_merge(self):
+        first, second = FeatureTrack(), FeatureTrack(offset=3)
+        first.extend([1, 2, 3])
+        second.extend([4, 5])
+
+        second.merge(first)
+        self.assertListEqual([1, 2, 3, 4, 5], second.values().tolist())
+
+
+class FeaturesTest(unittest.TestCase):
+    # values of the cache the re cut writes over, the other tests use them
+    CACHE_KEYS = (CACHE_FPS, CACHE_FRAME_COUNT, CACHE_RANK_BIN)
+    RANK_KEYS = (CACHE_RANK_MOTION, CACHE_RANK_BLUR, CACHE_RANK_TEXT, CACHE_RANK_AUDIO, CACHE_SHOTS)
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache = {key: Cache().read_data(key) for key in self.CACHE_KEYS}
+        self.ranks = {key: Ranking.get(key) for key in self.RANK_KEYS}
+
+    def tearDown(self):
+        for key, value in self.cache.items():
+            Cache().write_data(key, value)
+        for key, rank in self.ranks.items():
+            Ranking.add(key, rank)
+        self.dir.cleanup()
+
+    def test_save_load(self):
+        save_features("test", self.dir.name, fps=25.0, values=np.arange(4))
+        features = load_features("test", self.dir.name)
+
+        self.assertEqual(25.0, features["fps"])
+        self.assertListEqual([0, 1, 2, 3], features["values"].tolist())
+        self.assertIsNone(load_features("no_such", self.dir.name))
+
+    def save_video(self):
+        # 2 secs at 2 fps, the first sec has text, the second sec has motion and audio
+        save_features("visual", self.dir.name, fps=2.0, frame_count=4.0, variance=np.full(4, 1000.0),
+                      delta=np.array([0, 0, 80, 80]), change=np.zeros(4),
+                      blur_threshold=float(Config.BLUR_THRESHOLD), blur_base=float(Config.BLUR_THRESHOLD))
+        save_features("textual", self.dir.name, fps=2.0, frame_count=4.0, skip_frames=2, scores=np.array([0.9, -1.0]))
+        save_features("audio", self.dir.name, rms=np.array([0.0, 1.0]))
+
+    def test_recut(self):
+        self.save_video()
+        recut(self.dir.name)
+        self.assertListEqual([0, Config.RANK_MOTION], Ranking.get(CACHE_RANK_MOTION))
+        self.assertListEqual([0, 0], Ranking.get(CACHE_RANK_BLUR))
+        self.assertListEqual([Config.RANK_TEXT, 0], Ranking.get(CACHE_RANK_TEXT))
+        self.assertListEqual([0, Config.RANK_AUDIO], Ranking.get(CACHE_RANK_AUDIO))
+
+    def test_sweep(self):
+        self.save_video()
+        grid = dict(MOTION_THRESHOLD=[50, 100], RANK_MOTION=[3], RANK_TEXT=[5], RANK_AUDIO=[3],
+                    MIN_RANK_OUT_VIDEO=[4, 5, 6])
+        results = {(result["MOTION_THRESHOLD"], result["MIN_RANK_OUT_VIDEO"]): result
+                   for result in sweep(grid, self.dir.name)}
+
+        # ranks of the secs are 5 and 6, or 5 and 3 without the motion
+        self.assertEqual(6, len(results))
+        self.assertEqual((2, 1, 1.0), tuple(results[50, 4][key] for key in ("duration", "clips", "kept")))
+        self.assertEqual((1, 1, 0.5), tuple(results[50, 5][key] for key in ("duration", "clips", "kept")))
+        self.assertEqual(0, results[50, 6]["clips"])
+        self.assertEqual(0, results[100, 5]["clips"])
+
+    def test_fractional_bins(self):
+        # 2.5 frames a bin, the frames 0 - 2 are the first bin and 3 - 4 the second, same as the visual
+        textual = dict(fps=2.5, frame_count=5.0, skip_frames=1, rank_bin=1.0,
+                       scores=np.array([0.9, 0.9, -1, -1, -1, 0.9]))
+        np.testing.assert_allclose([Config.RANK_TEXT * 2 / 3, 0], _text_ranks(textual))
+
+        hits, frames = _text_hits(textual, [0.5])
+        self.assertListEqual([[2, 0]], hits.tolist())
+        self.assertListEqual([3, 2], frames.tolist())
+
+    def test_text_tail(self):
+        # the last frame is past the last sample, it keeps the rank of the sample instead of the mean
+        textual = dict(fps=1.0, frame_count=5.0, skip_frames=2, rank_bin=1.0, scores=np.array([0.9, -1]))
+        self.assertListEqual([Config.RANK_TEXT, Config.RANK_TEXT, 0, 0, 0], _text_ranks(textual))
+        self.assertListEqual([[1, 1, 0, 0, 0]], _text_hits(textual, [0.5])[0].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
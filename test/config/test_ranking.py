@@ -1,6 +1,10 @@
 import unittest
 
-from torpido.tools.ranking import Ranking
+from torpido.config.cache import Cache
+from torpido.config.config import Config
+from torpido.config.constants import CACHE_FPS, CACHE_FRAME_COUNT, CACHE_RANK_AUDIO, CACHE_RANK_BIN, \
+    CACHE_RANK_BLUR, CACHE_RANK_MOTION
+from torpido.tools.ranking import Ranking, RankAccumulator, ShotIndex
 
 
 class CacheTest(unittest.TestCase):
@@ -25,6 +29,114 @@ class CacheTest(unittest.TestCase):
     def test_get_thumbnail_sec(self):
         self.assertEqual(int, type(Ranking.get_thumbnail_sec()))
 
+    def test_snap(self):
+        shots = [4.2, 10.0, 20.5]
+        self.assertListEqual([0.0, 4.2, 10.0, 15.0], Ranking.snap([0, 5, 9, 15], shots, 1.0))
+        self.assertListEqual([0, 5], Ranking.snap([0, 5], shots, 0))
+
+        # the clips that meet after snapping are joined
+        self.assertListEqual([[4.2, 20.5]], Ranking._snap_to_shots([[4, 9], [11, 20]], shots, 1.0))
+
+        # a short clip that would snap to a single cut keeps its edges
+        self.assertListEqual([[10, 12]], Ranking._snap_to_shots([[10, 12]], [11.0], 1.0))
+        self.assertListEqual([[4, 5], [10.0, 12]], Ranking._snap_to_shots([[4, 5], [9, 12]], [4.5, 10.0], 1.0))
+
+    def test_trim_bins(self):
+        ranks = [0, 0, 0, 10, 20, 30, 0, 0]
+        self.assertListEqual([[3, 5]], Ranking._trim_by_rank(ranks))
+        self.assertListEqual([[0.3, 0.5]], Ranking._trim_by_rank(ranks, 0.1))
+
+
+class UnsettledTest(unittest.TestCase):
+    # values of the cache the tests write over, the other tests use them
+    CACHE_KEYS = (CACHE_FPS, CACHE_FRAME_COUNT, CACHE_RANK_BIN)
+    RANK_KEYS = (CACHE_RANK_MOTION, CACHE_RANK_BLUR, CACHE_RANK_AUDIO)
+
+    def setUp(self):
+        self.cache = {key: Cache().read_data(key) for key in self.CACHE_KEYS}
+        self.ranks = {key: Ranking.get(key) for key in self.RANK_KEYS}
+
+    def tearDown(self):
+        for key, value in self.cache.items():
+            Cache().write_data(key, value)
+        for key, rank in self.ranks.items():
+            Ranking.add(key, rank)
+
+    def test_unsettled_seconds(self):
+        Cache().write_data(CACHE_FPS, 1)
+        Cache().write_data(CACHE_FRAME_COUNT, 3)
+        Ranking.add(CACHE_RANK_MOTION, [0, 0, Config.MIN_RANK_OUT_VIDEO + 1])
+        Ranking.add(CACHE_RANK_BLUR, [0, 0, 0])
+        Ranking.add(CACHE_RANK_AUDIO, [0, Config.MIN_RANK_OUT_VIDEO, 0])
+
+        # can not reach the min, text can change the cut, already over the min
+        expected = [Config.RANK_TEXT > Config.MIN_RANK_OUT_VIDEO, True, False]
+        self.assertListEqual(expected, Ranking.unsettled_seconds())
+
+    def test_unsettled_seconds_hysteresis(self):
+        Cache().write_data(CACHE_FPS, 1)
+        Cache().write_data(CACHE_FRAME_COUNT, 4)
+        Ranking.add(CACHE_RANK_MOTION, [0, 2, 4, 7])
+        Ranking.add(CACHE_RANK_BLUR, [0, 0, 0, 0])
+        Ranking.add(CACHE_RANK_AUDIO, [0, 0, 0, 0])
+
+        settings = Config.MIN_RANK_OUT_VIDEO, Config.RANK_TEXT, Config.CLIP_HYSTERESIS
+        Config.MIN_RANK_OUT_VIDEO, Config.RANK_TEXT, Config.CLIP_HYSTERESIS = 6, 3, 2
+        try:
+            # the text takes the second bin over the min less the hysteresis, a clip can go on through it
+            self.assertListEqual([False, True, True, False], Ranking.unsettled_seconds())
+        finally:
+            Config.MIN_RANK_OUT_VIDEO, Config.RANK_TEXT, Config.CLIP_HYSTERESIS = settings
+
+
+class RankAccumulatorTest(unittest.TestCase):
+    def test_means(self):
+        rank = RankAccumulator(fps=2)
+        for val in [0, 2, 4, 4, 1]:
+            rank.add(val)
+        # the partial second at the end is left out
+        self.assertListEqual([1.0, 4.0], rank.means())
+
+    def test_fractional_fps(self):
+        rank = RankAccumulator(fps=2.5)
+        rank.extend([1] * 5 + [0] * 5)
+        # seconds hold 3, 2, 3, 2 frames
+        self.assertListEqual([1.0, 1.0, 0.0, 0.0], rank.means())
+
+    def test_bins(self):
+        rank = RankAccumulator(fps=10, bin_secs=0.2)
+        rank.extend([0, 4, 4, 4, 1, 1, 2])
+        # bins of 2 frames each
+        self.assertListEqual([2.0, 4.0, 1.0], rank.means())
+
+    def test_merge(self):
+        ranks = [i % 3 for i in range(100)]
+        whole, first, second = RankAccumulator(fps=7), RankAccumulator(fps=7), RankAccumulator(fps=7, offset=40)
+        whole.extend(ranks)
+        first.extend(ranks[:40])
+        second.extend(ranks[40:])
+        first.merge(second)
+        self.assertListEqual(whole.means(), first.means())
+
+
+class ShotIndexTest(unittest.TestCase):
+    def test_cuts(self):
+        changes = [0, 50, 0, 0, 0, 0, 40, 45, 0, 0]
+        shots = ShotIndex(fps=4, threshold=30)
+        shots.extend(changes)
+        # the change at position p is of the frame p + 1, the cut right after a cut is dropped
+        self.assertEqual(3, len(shots))
+        self.assertListEqual([0.5, 1.75], shots.seconds())
+
+    def test_merge(self):
+        changes = [0, 50, 0, 0, 0, 0, 40, 0, 0, 50]
+        whole, first, second = ShotIndex(4, 30), ShotIndex(4, 30), ShotIndex(4, 30, offset=5)
+        whole.extend(changes)
+        first.extend(changes[:5])
+        second.extend(changes[5:])
+        first.merge(second)
+        self.assertListEqual(whole.seconds(), first.seconds())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -23,6 +23,24 @@ class TimestampTest(unittest.TestCase):
 
         self.assertListEqual([[1, 2], [6, 8]], trim_by_rank(ranks))
 
+    def test_rank_runs(self):
+        ranks = [0, 5, 2, 5, 0, 0, 5, 5, 0]
+        runs = lambda *settings: [[int(start), int(end)] for _, start, end in zip(*rank_runs(ranks, 3, *settings))]
+
+        self.assertListEqual([[1, 2], [3, 4], [6, 8]], runs())
+
+        # the dip to 2 does not end the clip, the gap of 2 secs is joined, short clips are dropped
+        self.assertListEqual([[1, 4], [6, 8]], runs(2))
+        self.assertListEqual([[1, 4], [6, 8]], runs(0, 2))
+        self.assertListEqual([[1, 8]], runs(0, 3))
+        self.assertListEqual([[6, 8]], runs(0, 0, 2))
+
+    def test_rank_runs_rows(self):
+        rows, starts, ends = rank_runs([[0, 5, 5], [5, 0, 5]], [3, 4])
+        self.assertListEqual([0, 1, 1], rows.tolist())
+        self.assertListEqual([1, 0, 2], starts.tolist())
+        self.assertListEqual([3, 1, 3], ends.tolist())
+
     def test_timestamps(self):
         ranks = [
             [0, 0, 0, 0, 0],
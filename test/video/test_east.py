@@ -0,0 +1,69 @@
+import unittest
+
+import numpy as np
+
+from torpido.video import decode_boxes, max_confidence
+
+
+def loop_boxes(scores, geometry, min_confidence):
+    # the per cell loop the textual used before
+    num_rows, num_cols = scores.shape[2:4]
+    rect, confidences = list(), list()
+
+    for y in range(0, num_rows):
+        scoresData = scores[0, 0, y]
+        xData0, xData1, xData2, xData3 = geometry[0, 0, y], geometry[0, 1, y], geometry[0, 2, y], geometry[0, 3, y]
+        anglesData = geometry[0, 4, y]
+
+        for x in range(0, num_cols):
+            if scoresData[x] < min_confidence:
+                continue
+
+            (offsetX, offsetY) = (x * 4, y * 4)
+            angle = anglesData[x]
+            cos, sin = np.cos(angle), np.sin(angle)
+            h = xData0[x] + xData2[x]
+            w = xData1[x] + xData3[x]
+
+            endX = int(offsetX + (cos * xData1[x]) + (sin * xData2[x]))
+            endY = int(offsetY - (sin * xData1[x]) + (cos * xData2[x]))
+            rect.append((int(endX - w), int(endY - h), endX, endY))
+            confidences.append(scoresData[x])
+
+    return rect, confidences
+
+
+def loop_detected(scores, min_confidence):
+    detected = list()
+    for image_scores in scores:
+        confidences = [score for row in image_scores[0] for score in row if score >= min_confidence]
+        detected.append(len(confidences) > 0)
+    return detected
+
+
+class EastTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.scores = rng.random((3, 1, 80, 80), dtype=np.float32)
+        self.geometry = np.concatenate((rng.random((3, 4, 80, 80), dtype=np.float32) * 40,
+                                        rng.uniform(-np.pi / 2, np.pi / 2, (3, 1, 80, 80)).astype(np.float32)), axis=1)
+
+    def test_boxes(self):
+        for min_confidence in (0.0, 0.5, 0.99, 1.1):
+            rect, confidences = decode_boxes(self.scores, self.geometry, min_confidence)
+            expected_rect, expected_confidences = loop_boxes(self.scores, self.geometry, min_confidence)
+
+            self.assertListEqual(expected_rect, [tuple(box) for box in rect.tolist()])
+            self.assertListEqual(expected_confidences, confidences.tolist())
+
+    def test_detected(self):
+        # the second image has no text, its scores are all low
+        self.scores[1] *= 0.4
+        for min_confidence in (0.3, 0.5):
+            detected = [score >= min_confidence for score in max_confidence(self.scores)]
+            self.assertListEqual(loop_detected(self.scores, min_confidence), detected)
+        self.assertListEqual([True, False, True], [score >= 0.5 for score in max_confidence(self.scores)])
+
+
+if __name__ == '__main__':
+    unittest.main()
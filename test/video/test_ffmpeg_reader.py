@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from torpido.tools.ffmpeg import _build_rawvideo_command
+from torpido.video import FFmpegReader, ffmpeg_available
+from test.video.test_frame_bus import write_video
+
+
+class FFmpegReaderTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, "reader.avi")
+        write_video(self.file)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_command(self):
+        command = _build_rawvideo_command(self.file, 500, 281, "gray")
+        self.assertIn("scale=500:281:flags=area", command)
+        self.assertEqual(["-pix_fmt", "gray", "-f", "rawvideo", "-"], command[-5:])
+
+    @unittest.skipUnless(ffmpeg_available(), "ffmpeg not found")
+    def test_gray_frames(self):
+        reader, count = FFmpegReader(self.file, gray=True, buffers=4), 0
+        self.assertEqual(20, reader.fps)
+
+        while True:
+            grabbed, frame = reader.read()
+            if not grabbed:
+                break
+            self.assertEqual((281, 500), frame.shape)
+            count += 1
+
+        reader.release()
+        self.assertEqual(40, count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from torpido.video import FrameBatch, blur_variance, calibrate_blur_threshold
+
+
+def single_frame(previous, frame, blur_threshold, motion_threshold):
+    blur = cv2.Laplacian(frame, cv2.CV_64F).var() < blur_threshold
+    delta = cv2.absdiff(cv2.GaussianBlur(previous, (21, 21), 0), cv2.GaussianBlur(frame, (21, 21), 0))
+    return np.max(cv2.threshold(delta, motion_threshold, 255, cv2.THRESH_BINARY)[1]) > 0, blur
+
+
+class FrameBatchTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.frames = [rng.integers(0, 255, (60, 80), dtype=np.uint8) for _ in range(10)]
+        for frame in self.frames[5:]:
+            frame[:] = cv2.GaussianBlur(frame, (9, 9), 0)
+        self.frames[7] = self.frames[6].copy()
+
+    def test_same_as_single_frames(self):
+        expected = [single_frame(previous, frame, 500, 20) for previous, frame in zip(self.frames, self.frames[1:])]
+        changes = [np.mean(cv2.absdiff(cv2.GaussianBlur(previous, (21, 21), 0), cv2.GaussianBlur(frame, (21, 21), 0)))
+                   for previous, frame in zip(self.frames, self.frames[1:])]
+
+        batch, motion, blur, change = FrameBatch((60, 80), 4, 500, 20), list(), list(), list()
+        batch.set_previous(self.frames[0])
+        for frame in self.frames[1:]:
+            if batch.add(frame):
+                result = batch.detect()
+                motion.extend(result[0])
+                blur.extend(result[1])
+                change.extend(result[2])
+
+        # partial batch at the end
+        self.assertEqual(1, len(batch))
+        result = batch.detect()
+        motion.extend(result[0])
+        blur.extend(result[1])
+        change.extend(result[2])
+
+        self.assertListEqual([val[0] for val in expected], motion)
+        self.assertListEqual([val[1] for val in expected], blur)
+        np.testing.assert_allclose(changes, change, rtol=1e-5)
+        self.assertIn(True, blur)
+        self.assertIn(False, motion)
+
+    def test_duplicates(self):
+        expected = [single_frame(previous, frame, 500, 20) for previous, frame in zip(self.frames, self.frames[1:])]
+
+        # the blur of the repeated frame is not measured again, the results stay the same
+        batch, motion, blur = FrameBatch((60, 80), 4, 500, 20), list(), list()
+        batch.set_previous(self.frames[0])
+        for i, frame in enumerate(self.frames[1:], 1):
+            if batch.add(frame, duplicate=i == 7):
+                result = batch.detect()
+                motion.extend(result[0])
+                blur.extend(result[1])
+
+        result = batch.detect()
+        motion.extend(result[0])
+        blur.extend(result[1])
+        self.assertListEqual([val[0] for val in expected], motion)
+        self.assertListEqual([val[1] for val in expected], blur)
+
+        # a duplicate that still changed has its motion measured, only the blur of the previous frame is kept
+        batch.add(self.frames[1], duplicate=True)
+        motion, blur, change = batch.detect()
+        self.assertListEqual([single_frame(self.frames[-1], self.frames[1], 500, 20)[0]], motion.tolist())
+        self.assertListEqual([expected[-1][1]], blur.tolist())
+        self.assertGreater(change[0], 0)
+
+    def test_blur_variance(self):
+        expected = [cv2.Laplacian(frame, cv2.CV_64F).var() for frame in self.frames]
+        np.testing.assert_allclose(expected, blur_variance(np.dstack(self.frames)))
+
+    def test_calibration(self):
+        self.assertEqual(500, calibrate_blur_threshold(self.frames, 500, "full"))
+
+        # the mapped threshold finds the same blurred frames on the pyramid level
+        threshold = calibrate_blur_threshold(self.frames, 500, "pyramid")
+        self.assertNotEqual(500, threshold)
+
+        stack = np.dstack(self.frames)
+        full = blur_variance(stack) < 500
+        pyramid = blur_variance(stack, "pyramid") < threshold
+        self.assertListEqual(full.tolist(), pyramid.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
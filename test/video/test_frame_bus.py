@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+import unittest
+from multiprocessing import Process, Queue
+
+import cv2
+import numpy as np
+
+from torpido.config.config import Config
+from torpido.video import FrameBus, frame_key
+
+
+def write_video(file, frames=40, size=(640, 360)):
+    writer = cv2.VideoWriter(file, cv2.VideoWriter_fourcc(*'MJPG'), 20, size)
+    for i in range(frames):
+        frame = np.full((size[1], size[0], 3), i * 5, dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+
+
+def consume(reader, index, queue):
+    count = 0
+    while reader.more():
+        if reader.read() is None:
+            break
+        count += 1
+    reader.stop()
+    queue.put((index, count))
+
+
+def crash(reader):
+    # reads a frame and exits without stopping the reader
+    reader.read()
+
+
+class FrameBusTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, "bus.avi")
+        write_video(self.file)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_shape(self):
+        bus = FrameBus(self.file, consumers=1, slots=4)
+        self.assertEqual((281, 500, 3), bus.shape)
+        self.assertEqual(20, bus.fps)
+        bus.close()
+
+    def test_all_consumers_get_all_frames(self):
+        bus = FrameBus(self.file, consumers=2, slots=4).start()
+        queue = Queue()
+        workers = [Process(target=consume, args=(bus.reader(i), i, queue)) for i in range(2)]
+
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        counts = dict([queue.get(), queue.get()])
+        bus.close()
+
+        self.assertEqual({0: 40, 1: 40}, counts)
+
+    def test_dead_consumer_is_detached(self):
+        bus = FrameBus(self.file, consumers=2, slots=4).start()
+        queue = Queue()
+        workers = [Process(target=crash, args=(bus.reader(0),)),
+                   Process(target=consume, args=(bus.reader(1), 1, queue))]
+
+        for index, worker in enumerate(workers):
+            worker.start()
+            bus.watch(index, worker)
+        for worker in workers:
+            worker.join(timeout=30)
+
+        alive = workers[1].is_alive()
+        if alive:
+            workers[1].terminate()
+        bus.close()
+
+        self.assertFalse(alive)
+        self.assertEqual((1, 40), queue.get(timeout=1))
+
+    def test_failed_decoder_ends(self):
+        bus = FrameBus(self.file, consumers=1, slots=4)
+
+        # frames of another aspect ratio do not fit the slots, the decoder fails on the first
+        write_video(self.file, size=(640, 640))
+        bus.start()
+
+        queue = Queue()
+        worker = Process(target=consume, args=(bus.reader(0), 0, queue))
+        worker.start()
+        worker.join(timeout=30)
+
+        alive = worker.is_alive()
+        if alive:
+            worker.terminate()
+        bus.close()
+
+        self.assertFalse(alive)
+        self.assertEqual((0, 0), queue.get(timeout=1))
+
+
+    def test_frame_keys(self):
+        dedupe, Config.FRAME_DEDUPE = Config.FRAME_DEDUPE, True
+        try:
+            bus = FrameBus(self.file, consumers=1, slots=4).start()
+            reader, keys = bus.reader(0), list()
+            while reader.more():
+                frame = reader.read()
+                if frame is None:
+                    break
+                keys.append(reader.hash)
+                self.assertEqual(frame_key(frame), reader.hash)
+            reader.stop()
+            bus.close()
+        finally:
+            Config.FRAME_DEDUPE = dedupe
+
+        # the flat frames have the same hash, the brightness keeps them apart
+        self.assertEqual(40, len(keys))
+        self.assertEqual({0}, {frame_hash for frame_hash, _ in keys})
+        self.assertEqual(40, len({mean for _, mean in keys}))
+
+
+if __name__ == '__main__':
+    unittest.main()
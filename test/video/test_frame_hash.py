@@ -0,0 +1,67 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from torpido.config.constants import HASH_MEAN_DELTA
+from torpido.video import HashCache, dhash, frame_key, hamming
+
+
+class FrameHashTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.frame = cv2.GaussianBlur(rng.integers(0, 255, (90, 160, 3), dtype=np.uint8), (15, 15), 0)
+
+    def test_dhash(self):
+        frame_hash = dhash(self.frame)
+        self.assertLess(frame_hash, 2 ** 64)
+
+        # same hash for the gray frame, a resized copy and a slightly noisy copy
+        self.assertEqual(frame_hash, dhash(cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)))
+        self.assertLessEqual(hamming(frame_hash, dhash(cv2.resize(self.frame, (320, 180)))), 2)
+        self.assertGreater(hamming(frame_hash, dhash(np.fliplr(self.frame).copy())), 8)
+
+    def test_frame_key(self):
+        frame_hash, mean = frame_key(self.frame)
+        self.assertEqual(dhash(self.frame), frame_hash)
+        self.assertEqual(round(cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY).mean()), mean)
+
+        # flat frames hash to 0 at any brightness, only the mean tells them apart
+        dark, bright = frame_key(np.full((90, 160), 40, np.uint8)), frame_key(np.full((90, 160), 120, np.uint8))
+        self.assertEqual(dark[0], bright[0])
+        self.assertEqual((40, 120), (dark[1], bright[1]))
+
+    def test_cache(self):
+        cache = HashCache("Test", distance=1)
+        self.assertIsNone(cache.previous((0b1010, 100)))
+        cache.put((0b1010, 100), True)
+
+        # near the last hash, at the same brightness
+        self.assertTrue(cache.previous((0b1011, 100)))
+        self.assertTrue(cache.previous((0b1010, 100 + HASH_MEAN_DELTA)))
+        self.assertIsNone(cache.previous((0b0101, 100)))
+        self.assertIsNone(cache.previous((0b1010, 100 + HASH_MEAN_DELTA + 1)))
+
+        # only the last frame is matched, not an older frame with the same hash
+        cache.put((0b0101, 100), False)
+        self.assertIsNone(cache.previous((0b1010, 100)))
+        self.assertFalse(cache.previous((0b0101, 100)))
+
+        self.assertEqual((3, 4), (cache.hits, cache.misses))
+        self.assertAlmostEqual(3 / 7, cache.hit_rate())
+
+    def test_fade(self):
+        # a fade of flat frames, each step of the brightness is analysed again
+        cache, analysed = HashCache("Test"), 0
+        for level in range(0, 200, 10):
+            for _ in range(3):
+                key = frame_key(np.full((90, 160, 3), level, np.uint8))
+                if cache.previous(key) is None:
+                    cache.put(key, level)
+                    analysed += 1
+        self.assertEqual(20, analysed)
+        self.assertEqual((40, 20), (cache.hits, cache.misses))
+
+
+if __name__ == '__main__':
+    unittest.main()
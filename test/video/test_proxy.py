@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from torpido.config.config import Config
+from torpido.config.constants import CACHE_DIR, PROXY_FILE
+from torpido.io import FFMPEG
+from torpido.tools.ffmpeg import _build_proxy_command
+
+
+class ProxyTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, "input.mp4")
+        with open(self.file, "wb") as file:
+            file.write(b"\0" * 16)
+        self.settings = Config.PROXY_FPS, Config.PROXY_CACHE_MB
+
+    def tearDown(self):
+        Config.PROXY_FPS, Config.PROXY_CACHE_MB = self.settings
+        shutil.rmtree(self.dir)
+
+    def test_command(self):
+        command = _build_proxy_command("in.mp4", "out.avi", 500)
+        self.assertIn("scale=500:-2:flags=area", command)
+        self.assertListEqual(["-c:v", "mjpeg"], command[-5:-3])
+        self.assertEqual("'out.avi'", command[-1])
+
+        # the frame rate filter only when the fps is set
+        self.assertIn("scale=500:-2:flags=area,fps=10", _build_proxy_command("in.mp4", "out.avi", 500, 10))
+
+    def test_file_name(self):
+        Config.PROXY_FPS = 10
+        proxy_file = FFMPEG.get_proxy_file_name_path(self.file)
+        self.assertEqual(os.path.normpath(CACHE_DIR), os.path.dirname(proxy_file))
+        self.assertEqual(proxy_file, FFMPEG.get_proxy_file_name_path(self.file))
+
+        # other settings or a changed input make another proxy
+        Config.PROXY_FPS = 5
+        self.assertNotEqual(proxy_file, FFMPEG.get_proxy_file_name_path(self.file))
+
+        Config.PROXY_FPS = 10
+        with open(self.file, "ab") as file:
+            file.write(b"\0")
+        self.assertNotEqual(proxy_file, FFMPEG.get_proxy_file_name_path(self.file))
+
+    def test_evict(self):
+        proxies = [os.path.join(self.dir, PROXY_FILE % i) for i in range(4)]
+        for age, proxy_file in enumerate(proxies):
+            with open(proxy_file, "wb") as file:
+                file.write(b"\0" * 400 * 1024)
+            # the first is the oldest
+            os.utime(proxy_file, (time.time() - 100 + age, time.time() - 100 + age))
+
+        # 1 MB holds the 2 most recent, the oldest in use is kept
+        Config.PROXY_CACHE_MB = 1
+        removed = FFMPEG.evict_proxies(keep=proxies[0], directory=self.dir)
+
+        self.assertListEqual(proxies[1:3], sorted(removed))
+        self.assertListEqual([proxies[0], proxies[3]], sorted(p for p in proxies if os.path.isfile(p)))
+
+
+if __name__ == '__main__':
+    unittest.main()
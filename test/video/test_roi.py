@@ -0,0 +1,42 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from torpido.video import RegionOfInterest
+
+
+class RegionOfInterestTest(unittest.TestCase):
+    def setUp(self):
+        # letterboxed frames, 20 rows of black bars and a static logo on changing content
+        rng = np.random.default_rng(0)
+        self.frames = list()
+        for _ in range(8):
+            frame = np.zeros((140, 200, 3), dtype=np.uint8)
+            frame[20:120] = cv2.GaussianBlur(rng.integers(0, 255, (100, 200, 3), dtype=np.uint8), (5, 5), 0)
+            cv2.rectangle(frame, (160, 30), (190, 45), (255, 255, 255), -1)
+            self.frames.append(frame)
+
+    def test_detect(self):
+        roi = RegionOfInterest.detect(self.frames)
+        np.testing.assert_allclose((0, 20 / 140, 1, 120 / 140), roi.box)
+        self.assertEqual((100, 200), roi.crop(self.frames[0]).shape[:2])
+
+        # single overlay around the logo
+        self.assertEqual(1, len(roi.overlays))
+        left, top, right, bottom = roi.overlays[0]
+        self.assertTrue(left * 200 <= 160 and right * 200 >= 190 and top * 140 <= 30 and bottom * 140 >= 45)
+
+        frame = roi.mask(self.frames[0].copy())
+        self.assertEqual(1, len(np.unique(frame[32:44, 162:188].reshape(-1, 3), axis=0)))
+
+    def test_static_video(self):
+        # the whole video is static, nothing is masked
+        roi = RegionOfInterest.detect([self.frames[0]] * 8)
+        self.assertListEqual([], roi.overlays)
+        self.assertTrue(RegionOfInterest().is_full())
+        self.assertTrue(RegionOfInterest.detect([]).is_full())
+
+
+if __name__ == '__main__':
+    unittest.main()
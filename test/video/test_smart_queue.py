@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+from threading import Thread
+
+import numpy as np
+
+from torpido.video import SmartQueue, Stream
+from test.video.test_frame_bus import write_video
+
+
+class SmartQueueTest(unittest.TestCase):
+    def test_capacity_from_budget(self):
+        queue = SmartQueue(budget=10 * 100 * 100, shape=(100, 100))
+        self.assertEqual(10, queue.capacity)
+
+    def test_order_and_close(self):
+        queue = SmartQueue(maxSize=4)
+        for i in range(3):
+            queue.put(np.full((2, 2), i, dtype=np.uint8))
+        queue.close()
+
+        self.assertListEqual([0, 1, 2], [int(queue.get()[0, 0]) for _ in range(3)])
+        self.assertIsNone(queue.get())
+        self.assertTrue(queue.empty())
+
+    def test_producer_waits_for_consumer(self):
+        queue, frames = SmartQueue(maxSize=2), list()
+
+        def produce():
+            for i in range(50):
+                queue.put(np.full((2, 2), i, dtype=np.uint8))
+            queue.close()
+
+        producer = Thread(target=produce)
+        producer.start()
+
+        while True:
+            frame = queue.get()
+            if frame is None:
+                break
+            frames.append(int(frame[0, 0]))
+
+        producer.join()
+        self.assertListEqual(list(range(50)), frames)
+
+
+class StreamTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, "stream.avi")
+        write_video(self.file)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_all_frames_read(self):
+        stream, count = Stream(self.file, gray=True).start(), 0
+        while stream.more():
+            frame = stream.read()
+            if frame is None:
+                break
+            self.assertEqual((281, 500), frame.shape)
+            count += 1
+
+        stream.stop()
+        self.assertEqual(40, count)
+
+
+if __name__ == '__main__':
+    unittest.main()
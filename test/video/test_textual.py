@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import unittest
+from multiprocessing import Pool
+from unittest import mock
+
+import cv2
+import numpy as np
+
+from torpido import textual
+from torpido.config.config import Config
+from torpido.textual import Textual
+
+SKIP_FRAMES = 3
+
+
+class MeanNet:
+    # stands in for the EAST model, the score of each cell is the brightness of the image there
+    def setInput(self, blob):
+        self.blob = blob
+
+    def forward(self, names):
+        return [(self.blob[:, :1, ::4, ::4] + 128) / 255]
+
+
+def write_clip(file, frames=50):
+    writer = cv2.VideoWriter(file, cv2.VideoWriter_fourcc(*'MJPG'), 20, (640, 360))
+    rng = np.random.default_rng(0)
+    for i in range(frames):
+        frame = np.full((360, 640, 3), (i * 37) % 200, dtype=np.uint8)
+        frame[rng.integers(0, 300):, rng.integers(0, 600):] = 255 - 4 * i
+        writer.write(frame)
+    writer.release()
+
+
+def loop_scores(file, skip_frames):
+    # the loop the textual used before, every frame decoded and each sample run on its own
+    net, capture, scores, count = MeanNet(), cv2.VideoCapture(file), list(), 0
+    while True:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        count += 1
+        if count % skip_frames != 0:
+            continue
+
+        blob = cv2.dnn.blobFromImage(cv2.resize(frame, (320, 320)), 1.0, (320, 320), (123.68, 116.78, 103.94),
+                                     swapRB=True, crop=False)
+        net.setInput(blob)
+        scores.append(float(np.amax(net.forward(None)[0])))
+    capture.release()
+    return scores
+
+
+class TextualTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, "clip.avi")
+        write_clip(self.file)
+        self.expected = loop_scores(self.file, SKIP_FRAMES)
+        self.batch_size = Config.TEXT_BATCH_SIZE
+
+        self.patches = [mock.patch.object(textual, "TEXT_EAST_MODEL_PATH", "east.pb"),
+                        mock.patch.object(textual.cv2.dnn, "readNet", return_value=MeanNet())]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        Config.TEXT_BATCH_SIZE = self.batch_size
+        shutil.rmtree(self.dir)
+
+    def test_grabbed_samples(self):
+        # the frames between the samples are only grabbed, the samples stay the same
+        scores, _, _ = Textual()._process_chunk(self.file, SKIP_FRAMES, 0, len(self.expected))
+        self.assertEqual(16, len(scores))
+        np.testing.assert_allclose(self.expected, scores, rtol=1e-6)
+
+    def test_batches(self):
+        # a partial batch at the end, all the samples are ranked in order
+        Config.TEXT_BATCH_SIZE = 5
+        scores, _, _ = Textual()._process_chunk(self.file, SKIP_FRAMES, 0, len(self.expected))
+        np.testing.assert_allclose(self.expected, scores, rtol=1e-6)
+
+    def test_chunks(self):
+        tasks = [(self.file, SKIP_FRAMES, first, last, None) for first, last in ((0, 5), (5, 11), (11, 16))]
+
+        # the chunks seek to their first sample, joined they are the same as the whole video
+        scores = [score for task in tasks for score in Textual()._process_chunk(*task)[0]]
+        np.testing.assert_allclose(self.expected, scores, rtol=1e-6)
+
+        with Pool(processes=2, initializer=textual._init_worker) as pool:
+            scores = [score for detected, _, _ in pool.imap(textual._process_chunk, tasks) for score in detected]
+        np.testing.assert_allclose(self.expected, scores, rtol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from torpido.config.config import Config
+from torpido.visual import Visual
+
+
+def write_clip(file, frames=60):
+    # a square moving over noise, still for a while and blurred in the second half
+    writer = cv2.VideoWriter(file, cv2.VideoWriter_fourcc(*'MJPG'), 20, (640, 360))
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (360, 640, 3), dtype=np.uint8)
+    for i in range(frames):
+        frame = background.copy()
+        x = 20 + 10 * min(i, 25)
+        frame[100: 200, x: x + 100] = 255
+        if i >= frames // 2:
+            frame = cv2.GaussianBlur(frame, (15, 15), 0)
+        writer.write(frame)
+    writer.release()
+
+
+class VisualRangesTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, "clip.avi")
+        write_clip(self.file)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_ranges_same_as_sequential(self):
+        visual = Visual()
+        motion, blur, shots, raw, _ = visual._analyse_range(self.file, 0, None, Config.BLUR_THRESHOLD)
+
+        # the time ranges of the workers, merged as the parallel run merges them
+        parts = [visual._analyse_range(self.file, start, end, Config.BLUR_THRESHOLD)
+                 for start, end in ((0, 17), (17, 41), (41, None))]
+        merged_motion, merged_blur, merged_shots, merged_raw, _ = parts[0]
+        for part_motion, part_blur, part_shots, part_raw, _ in parts[1:]:
+            merged_motion.merge(part_motion)
+            merged_blur.merge(part_blur)
+            merged_shots.merge(part_shots)
+            for track, part in zip(merged_raw, part_raw):
+                track.merge(part)
+
+        self.assertListEqual(motion.means(), merged_motion.means())
+        self.assertListEqual(blur.means(), merged_blur.means())
+        self.assertListEqual(shots.seconds(), merged_shots.seconds())
+        for track, merged in zip(raw, merged_raw):
+            np.testing.assert_array_equal(track.values(), merged.values())
+
+        # the clip has both motion and blur, so the ranks are not trivially equal
+        self.assertEqual(2, len(motion.means()))
+        self.assertGreater(max(motion.means()), 0)
+        self.assertGreater(max(blur.means()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+
+import numpy as np
+
+from torpido.wavelet import getAllWavelets, decomposeArbitraryLength, FastWaveletTransform
+from torpido.wavelet import plan as wavelet_plan
+from torpido.wavelet.extension.numpy_transform import BaseTransform, WaveletTransform
+from torpido.wavelet.plan import getPlan
+from torpido.wavelet.wavelets import getWaveletDefinition
+
+
+def loop_dwt(w, arrTime, level):
+    # the loop of the extension
+    arrHilbert, a = np.zeros(level), level >> 1
+    for i in range(a):
+        for j in range(w.__motherWaveletLength__):
+            k = ((i << 1) + j) % level
+            arrHilbert[i] += arrTime[k] * w.decompositionLowFilter[j]
+            arrHilbert[i + a] += arrTime[k] * w.decompositionHighFilter[j]
+    return arrHilbert
+
+
+def loop_idwt(w, arrHilbert, level):
+    arrTime, a = np.zeros(level), level >> 1
+    for i in range(a):
+        for j in range(w.__motherWaveletLength__):
+            k = ((i << 1) + j) % level
+            arrTime[k] += arrHilbert[i] * w.reconstructionLowFilter[j] + arrHilbert[i + a] * w.reconstructionHighFilter[j]
+    return arrTime
+
+
+class NumpyTransformTest(unittest.TestCase):
+    def test_levels(self):
+        data = np.random.default_rng(0).standard_normal(64)
+
+        for name in getAllWavelets():
+            w, transform = getWaveletDefinition(name), WaveletTransform(name)
+            for level in (2, 4, 16, 64):
+                np.testing.assert_allclose(loop_dwt(w, data, level), transform.dwt(data, level), atol=1e-12,
+                                           err_msg=name)
+                np.testing.assert_allclose(loop_idwt(w, data, level), transform.idwt(data, level), atol=1e-12,
+                                           err_msg=name)
+
+    def test_extension(self):
+        try:
+            from torpido.wavelet.extension.base_transform import BaseTransform as Extension
+        except ImportError:
+            self.skipTest("extension is not built")
+
+        class ExtensionTransform(Extension):
+            pass
+
+        data = np.random.default_rng(1).standard_normal(128)
+
+        for name in getAllWavelets():
+            extension, transform = ExtensionTransform(name), BaseTransform(name)
+            for length, level in ((1, 1), (2, 7), (32, 2), (128, 7), (64, 7)):
+                np.testing.assert_allclose(extension.waveDec1(data[:length].copy(), level),
+                                           transform.waveDec1(data[:length], level), atol=1e-12, err_msg=name)
+                np.testing.assert_allclose(extension.waveRec1(data[:length].copy(), level),
+                                           transform.waveRec1(data[:length], level), atol=1e-12, err_msg=name)
+
+
+class PlanTest(unittest.TestCase):
+    def test_slices(self):
+        data = np.random.default_rng(2).standard_normal(43)
+
+        for name in getAllWavelets():
+            transform = BaseTransform(name)
+            for level in (1, 3, 5):
+                decomposed, reconstructed, offset = list(), list(), 0
+                for power in decomposeArbitraryLength(len(data)):
+                    part = data[offset: offset + 2 ** power]
+                    decomposed.extend(transform.waveDec1(part, level))
+                    reconstructed.extend(transform.waveRec1(part, level))
+                    offset += 2 ** power
+
+                plan = getPlan(name, len(data), level)
+                np.testing.assert_allclose(decomposed, plan.decompose(data), atol=1e-12, err_msg=name)
+                np.testing.assert_allclose(reconstructed, plan.reconstruct(data), atol=1e-12, err_msg=name)
+
+    def test_reuse(self):
+        plan = getPlan("db4", 100, 6)
+        self.assertIs(plan, getPlan("db4", 100, 6))
+        self.assertIsNot(plan, getPlan("db4", 100, 5))
+
+        data = np.random.default_rng(3).standard_normal(100)
+        expected = plan.decompose(data)
+
+        # in place and in a strided view give the same output
+        buffer, strided = data.copy(), np.zeros((100, 2))
+        self.assertIs(buffer, plan.decompose(buffer, out=buffer))
+        plan.decompose(data, out=strided[:, 1])
+        np.testing.assert_array_equal(expected, buffer)
+        np.testing.assert_array_equal(expected, strided[:, 1])
+
+        with self.assertRaises(ValueError):
+            plan.decompose(data[:10])
+
+    def test_threads(self):
+        data = np.random.default_rng(4).standard_normal(1000)
+        single, threaded = FastWaveletTransform("db4"), FastWaveletTransform("db4", threads=3)
+
+        # small chunks, so the levels are split over the threads
+        chunk, wavelet_plan.PARALLEL_CHUNK_ROWS = wavelet_plan.PARALLEL_CHUNK_ROWS, 16
+        try:
+            coeff = threaded.wavedec(data)
+            np.testing.assert_array_equal(single.wavedec(data), coeff)
+            np.testing.assert_array_equal(single.waverec(coeff), threaded.waverec(coeff))
+
+            # a stack of short signals is split by the signals
+            stack = data[:480].reshape(20, 24)
+            np.testing.assert_array_equal(single.wavedec(stack, axis=1), threaded.wavedec(stack, axis=1))
+        finally:
+            wavelet_plan.PARALLEL_CHUNK_ROWS = chunk
+
+
+if __name__ == '__main__':
+    unittest.main()
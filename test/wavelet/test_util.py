@@ -1,6 +1,9 @@
 import unittest
 
-from torpido.wavelet import FastWaveletTransform, decomposeArbitraryLength, getExponent, scalb, isPowerOf2
+import numpy as np
+
+from torpido.wavelet import FastWaveletTransform, decomposeArbitraryLength, getExponent, scalb, isPowerOf2, \
+    threshold
 
 
 class WaveletTest(unittest.TestCase):
@@ -30,6 +33,49 @@ class WaveletTest(unittest.TestCase):
 
         self.assertTrue(any([data, list(clean)]))
 
+    def test_in_place(self):
+        t = FastWaveletTransform("db4")
+        data = np.random.default_rng(0).standard_normal(42)
+
+        coeff = t.wavedec(data)
+        self.assertIsInstance(coeff, np.ndarray)
+
+        buffer = data.copy()
+        self.assertIs(buffer, t.wavedec(buffer, out=buffer))
+        np.testing.assert_array_equal(coeff, buffer)
+
+        clean = t.waverec(coeff)
+        self.assertIs(buffer, t.waverec(buffer, out=buffer))
+        np.testing.assert_array_equal(clean, buffer)
+
+    def test_axis(self):
+        t = FastWaveletTransform("coif1")
+        blocks = np.random.default_rng(1).standard_normal((3, 42))
+
+        # a stack of blocks is the same as each block, along any axis
+        coeff = t.wavedec(blocks, axis=-1)
+        for block, expected in zip(blocks, coeff):
+            np.testing.assert_allclose(expected, t.wavedec(block), atol=1e-12)
+        np.testing.assert_allclose(coeff.T, t.wavedec(blocks.T, axis=0), atol=1e-12)
+        np.testing.assert_allclose(t.waverec(coeff[1]), t.waverec(coeff, axis=1)[1], atol=1e-12)
+
+        # 2D is the rows then the columns, and back
+        matrix = t.wavedec(t.wavedec(blocks, axis=1), axis=0)
+        np.testing.assert_allclose(matrix, t.wavedec(blocks), atol=1e-12)
+        np.testing.assert_allclose(t.waverec(t.waverec(matrix, axis=0), axis=1), t.waverec(matrix), atol=1e-12)
+
+        cube = np.random.default_rng(2).standard_normal((2, 3, 5))
+        self.assertEqual(cube.shape, t.waverec(t.wavedec(cube)).shape)
+
+    def test_threshold(self):
+        data = np.array([-3., -1., 0., 0.5, 2.])
+        expected = [-2., 0., 0., 0., 1.]
+        np.testing.assert_array_equal(expected, threshold(data, 1))
+        np.testing.assert_array_equal([-2., 0., 9., 9., 1.], threshold(data, 1, substitute=9))
+
+        self.assertIs(data, threshold(data, 1, out=data))
+        np.testing.assert_array_equal(expected, data)
+
     def test_decomposition(self):
         self.assertEqual(decomposeArbitraryLength(13), [3, 2, 0])
         self.assertEqual(decomposeArbitraryLength(42), [5, 3, 1])
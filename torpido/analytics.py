@@ -78,9 +78,11 @@ class Analytics:
     def __plot_rank_line(self):
         """
         Plotting the ranks of each feature in the sub plot, with
-        legends and color specified
+        legends and color specified, the ranks are of the bins of `bin_secs` secs
+        so they are plotted in secs same as the timestamps
         """
-        numbers = [i for i in range(self.__rank_length)]
+        bin_secs = Ranking.bin_secs()
+        numbers = [i * bin_secs for i in range(self.__rank_length)]
 
         fig = plt.figure()
         ax = fig.add_subplot(211)
@@ -100,7 +102,7 @@ class Analytics:
         custom_lines = [Line2D([0], [0], color='red', linestyle='dashed', linewidth=1.5),
                         Line2D([0], [0], color='green', linestyle='dashed', linewidth=1.5)]
 
-        ax.plot([i for i in range(self.__rank_length)], self.__ranks)
+        ax.plot(numbers, self.__ranks)
         ax.set_ylim(0)
         ax.set_title("sum of all rankings")
         ax.legend(custom_lines, ['start time', 'end time'], loc=0).set_draggable(True)
@@ -13,6 +13,7 @@ from matplotlib import pyplot as plt
 from .config.cache import Cache
 from .config.config import Config
 from .config.constants import *
+from .tools.features import save_features
 from .tools.logger import Log
 from .tools.ranking import Ranking
 from .wavelet import FastWaveletTransform, VisuShrinkCompressor
@@ -39,27 +40,42 @@ class Auditory:
         sound file object having the info of the audio file
     __energy : list
         list of the ranks for the audio signal
+    __rms : list
+        rms of the de noised signal of each rank bin, saved for the re cuts
+    __bin_size : int
+        no of samples of a rank bin (`RANK_BIN` secs)
     __silence_threshold : int
         threshold value to determine the rank
     __cache : Cache
         object of the cache to store the audio file info
     __fwt : FastWaveletTransform
-        performs dwt & idwt on the data
+        performs dwt & idwt on the data, on the `AUDIO_THREADS` threads
     __compressor : VisuShrinkCompressor
         performs visu shrink thresholding on the coefficients
     """
     def __init__(self):
         self.__file_name = self.__rate = self.__data = None
-        self.__plot = self.__info = self.__energy = None
+        self.__plot = self.__info = self.__energy = self.__rms = self.__bin_size = None
         self.__silence_threshold, self.__cache = Config.SILENCE_THRESHOLD, Cache()
-        self.__fwt = FastWaveletTransform(Config.WAVELET)
+        self.__fwt = FastWaveletTransform(Config.WAVELET, threads=self.__get_threads())
         self.__compressor = VisuShrinkCompressor()
 
-    def __get_energy_rms(self, block):
+    @staticmethod
+    def __get_threads():
         """
-        RMS = Root Mean Square to calculate the signal data to the dB, if signal
-        satisfies some threshold the ranking can be affected and audio portion
-        can be ranked
+        No of threads for the de noising, `AUDIO_THREADS` or the cores left over by the visual
+        and the text workers that run along with the audio (the cascade runs the text after)
+        """
+        if Config.AUDIO_THREADS > 0:
+            return Config.AUDIO_THREADS
+
+        workers = Config.VISUAL_WORKERS + (0 if Config.CASCADE else Config.TEXT_WORKERS)
+        return max(1, (os.cpu_count() or 1) - workers)
+
+    @staticmethod
+    def __get_rms(block):
+        """
+        RMS = Root Mean Square to calculate the signal data to the dB
         RMS -> square root of mean of squared data
 
         Audio data range : -1 to 1
@@ -67,16 +83,46 @@ class Auditory:
         Parameters
         ----------
         block : np-array
-            input signal block
+            input signal block, or the bins of the signal as the rows
+
+        Returns
+        -------
+        float, np-array
+            rms of the block, or of each of the bins
+        """
+        return np.sqrt(np.mean(np.power(block, 2), axis=-1))
+
+    def __get_energy_rms(self, rms):
+        """
+        If the rms of the signal satisfies some threshold the ranking can be affected
+        and audio portion can be ranked
+
+        Parameters
+        ----------
+        rms : np-array
+            rms of each bin of the signal
 
         Returns
         -------
-        int
-            rank for the portion which is then set for all the portion of data
+        list
+            rank for each of the bins
         """
-        if np.sqrt(np.mean(np.power(block, 2))) > self.__silence_threshold:
-            return Config.RANK_AUDIO
-        return 0
+        return np.where(rms > self.__silence_threshold, Config.RANK_AUDIO, 0).tolist()
+
+    def __add_bins(self, signal, final=False):
+        """
+        Adds the rms of the complete bins of the signal, the samples left over are returned
+        to be joined with the next block, so the bins stay aligned to the time of the audio.
+        The partial bin at the end of the audio is added as well
+        """
+        bins = len(signal) // self.__bin_size
+        if bins > 0:
+            self.__rms.extend(self.__get_rms(signal[:bins * self.__bin_size].reshape(bins, -1)).tolist())
+
+        signal = signal[bins * self.__bin_size:]
+        if final and len(signal) > 0:
+            self.__rms.append(float(self.__get_rms(signal)))
+        return signal
 
     def __set_audio_info(self):
         """ Storing audio info """
@@ -142,13 +188,15 @@ class Auditory:
             Log.e(f"File {input_file} does not exists")
             return
 
-        self.__file_name, self.__energy = input_file, list()
+        self.__file_name, self.__energy, self.__rms = input_file, list(), list()
         self.__info = soundfile.info(self.__file_name)
         self.__rate = self.__info.samplerate
+        self.__bin_size = max(1, int(round(self.__rate * Config.RANK_BIN)))
         self.__set_audio_info()
         Log.i(f"Audio duration is {self.__info.duration}.")
 
         count, to_read = 0, int(self.__rate * self.__info.duration * Config.AUDIO_BLOCK_PER)
+        pending = np.zeros(0)
         # creating and opening the output audio file
         with soundfile.SoundFile(output_file, mode="w", samplerate=self.__rate, channels=1) as out:
             for block in soundfile.blocks(self.__file_name, to_read):
@@ -158,23 +206,27 @@ class Auditory:
                 if block.ndim > 1:
                     block = block.sum(axis=1) / 2
 
-                # decomposition -> threshold -> reconstruction
+                # decomposition -> threshold -> reconstruction, the coefficients are thresholded in place
                 coefficients = self.__fwt.wavedec(block)
-                coefficients = self.__compressor.compress(coefficients)
-                cleaned = self.__fwt.waverec(coefficients)
+                self.__compressor.compress(coefficients, out=coefficients)
+                cleaned = self.__fwt.waverec(coefficients, out=coefficients)
 
-                # recreating the audio signal in original form and writing to the output file
-                cleaned = np.array(cleaned, dtype=np.float_)
+                # writing the de noised signal to the output file
                 out.write(cleaned)
 
-                # calculating the audio rank
-                self.__energy.extend([self.__get_energy_rms(cleaned)] * max(1, int(len(cleaned) / self.__rate)))
+                # rms of each rank bin, the bins are not aligned to the blocks
+                pending = self.__add_bins(np.concatenate((pending, cleaned)))
                 count += 1
 
                 if plot and (count == 5 or count == 7):
                     self._specshow(block, cleaned, self.__info.samplerate)
 
+        # calculating the audio rank
+        self.__add_bins(pending, final=True)
+        self.__energy = self.__get_energy_rms(np.asarray(self.__rms))
+
         Ranking.add(CACHE_RANK_AUDIO, self.__energy)
+        save_features("audio", rank_bin=Config.RANK_BIN, rms=np.asarray(self.__rms))
         Log.i("Audio de noised successfully")
         Log.d(f"Audio ranking length {len(self.__energy)}")
         Log.i("Audio ranking saved .............")
@@ -26,9 +26,21 @@ class _TorpidoSettings:
     # ranking for text in video
     RANK_TEXT = 5
 
+    # width of the bins the ranks are given for (secs), the cuts land on the bins
+    RANK_BIN = 1.0
+
     # output video min rank
     MIN_RANK_OUT_VIDEO = 3
 
+    # a clip goes on till the rank falls to MIN_RANK_OUT_VIDEO less the hysteresis
+    CLIP_HYSTERESIS = 0.0
+
+    # gaps between the clips shorter than this are kept, joining the clips (secs)
+    CLIP_MIN_GAP = 0.0
+
+    # clips shorter than this are dropped (secs)
+    CLIP_MIN_LENGTH = 0.0
+
     # ******************* VIDEO PART *************************
     # threshold for video reading motion
     MOTION_THRESHOLD = 50
@@ -36,6 +48,52 @@ class _TorpidoSettings:
     # threshold for blur detection
     BLUR_THRESHOLD = 500
 
+    # region the blur is measured on "full", "pyramid" (half size) or "crop" (centre)
+    BLUR_MODE = "full"
+
+    # fraction of the width and the height kept by the "crop" blur mode
+    BLUR_CROP = 0.5
+
+    # decode the video once and share the frames with visual and textual
+    SHARED_DECODE = True
+
+    # video reader, "opencv" or "ffmpeg" (scales and converts the frames in the decoder)
+    VIDEO_BACKEND = "opencv"
+
+    # memory for the frames read ahead of the visual analysis (in MB)
+    STREAM_BUFFER_MB = 128
+
+    # analyse a cached low resolution proxy of the input instead of the original
+    ANALYSIS_PROXY = False
+
+    # frame rate of the proxy, 0 keeps the frame rate of the input
+    PROXY_FPS = 0
+
+    # max size of all the proxies kept in the cache, the least recently used are removed (in MB)
+    PROXY_CACHE_MB = 2048
+
+    # reuse the blur and the text of the last analysed frame for near identical frames (perceptual
+    # hash), the motion of every frame is still measured, so small moving regions are not missed
+    FRAME_DEDUPE = False
+
+    # max no of bits the hash of a frame can differ from the last analysed frame to be reused
+    HASH_DISTANCE = 0
+
+    # mean change of the pixels of a frame above which it starts a new shot
+    SHOT_THRESHOLD = 30.0
+
+    # max distance of a cut boundary from a shot cut to be moved onto it (sec), 0 disables
+    SHOT_SNAP_TOLERANCE = 1.0
+
+    # crop the black bars and mask the static overlays found by a pre pass over the video
+    ANALYSIS_ROI = False
+
+    # no of processes for the visual analysis, video is split into time ranges
+    VISUAL_WORKERS = 1
+
+    # no of frames stacked for a single run of the motion and blur detection (max 511)
+    VISUAL_BATCH_SIZE = 32
+
     # ******************* AUDIO PART *************************
     # reading 10 percent of audio file at a time
     AUDIO_BLOCK_PER = 0.1
@@ -46,6 +104,9 @@ class _TorpidoSettings:
     # silence threshold
     SILENCE_THRESHOLD = 0.005
 
+    # no of threads for the wavelet de noising, 0 uses the cores left by the visual and text workers
+    AUDIO_THREADS = 0
+
     # ********************** TEXTUAL PART ************************
     # min confidence of the text being detected
     TEXT_MIN_CONFIDENCE = 0.5
@@ -53,6 +114,15 @@ class _TorpidoSettings:
     # text detection is slow so some frames are skipped (sec)
     TEXT_SKIP_FRAMES = 10
 
+    # no of processes for the text detection, each loads its own model
+    TEXT_WORKERS = 1
+
+    # no of sampled frames run through the text detection model at once
+    TEXT_BATCH_SIZE = 1
+
+    # run the text detection after audio and visual, only on the seconds they have not settled
+    CASCADE = False
+
     # delay to check the CPU and MEM usage (in secs)
     WATCHER_DELAY = 5
 
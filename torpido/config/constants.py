@@ -40,6 +40,15 @@ CACHE_RANK_TEXT = "CACHE_RANK_TEXT"
 # ranking for audio
 CACHE_RANK_AUDIO = "CACHE_RANK_AUDIO"
 
+# shot cut points of the video (secs)
+CACHE_SHOTS = "CACHE_SHOTS"
+
+# width of the rank bins of the analysed video (secs)
+CACHE_RANK_BIN = "CACHE_RANK_BIN"
+
+# raw measurements of the analyzers, kept after the clean up for the re cuts
+FEATURE_DIR = "features"
+
 # video width
 CACHE_VIDEO_WIDTH = "CACHE_VIDEO_WIDTH"
 
@@ -50,6 +59,39 @@ CACHE_VIDEO_HEIGHT = "CACHE_VIDEO_HEIGHT"
 # video width to keep while processing
 VIDEO_WIDTH = 500
 
+# no of frames held by the shared frame bus at a time
+FRAME_BUS_SLOTS = 64
+
+# delay between the checks of the frame bus for the consumers that have died (in secs)
+FRAME_BUS_WATCH_DELAY = 0.5
+
+# max no of frames in a batch of the motion and blur detection (max channels of OpenCV)
+FRAME_BATCH_MAX = 512
+
+# no of frames spread over the video used to map the blur threshold to the blur mode
+BLUR_CALIBRATION_FRAMES = 16
+
+# no of frames spread over the video sampled to find the region of interest
+ROI_SAMPLE_FRAMES = 16
+
+# max gray value of the black bars
+ROI_BLACK_LEVEL = 24
+
+# max standard deviation across the sampled frames of a pixel of a static overlay
+ROI_STATIC_STD = 4.0
+
+# max fraction of the frame the static pixels can cover, more is a static video not an overlay
+ROI_OVERLAY_MAX_AREA = 0.1
+
+# min time between two shot cuts (sec), the cuts of a flash or a fade are counted once
+SHOT_MIN_GAP = 0.5
+
+# max difference of the mean intensity (0 - 255) of a frame from the last analysed frame to reuse its result
+HASH_MEAN_DELTA = 2
+
+# no of frame buffers the ffmpeg reader writes the frames into, reused in a ring
+FFMPEG_READER_BUFFERS = 128
+
 # window level in the wavelet level
 WAVELET_LEVEL = 1
 
@@ -77,6 +119,12 @@ OUT_AUDIO_FILE = "_audio_de_noised.wav"
 # thumbnail file name
 THUMBNAIL_FILE = "_thumbnail.jpg"
 
+# analysis proxy file name in the cache dir, formatted with the key of the input
+PROXY_FILE = "proxy_%s.avi"
+
+# jpeg quality of the analysis proxy frames (2 - 31, lower is better)
+PROXY_QUALITY = 3
+
 # supported video file formats
 SUPPORTED_VIDEO_FILES = [".mp4", ".webm", ".mkv", ".mov", ".flv", ".avi", ".ogg"]
 
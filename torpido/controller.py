@@ -11,13 +11,14 @@ from time import time
 from multiprocessing import Process
 
 from . import Auditory, FFMPEG, Textual, Visual, Analytics
-from .config import Cache, LINUX, ID_COM_LOGGER, ID_COM_PROGRESS, ID_COM_VIDEO
+from .config import Cache, Config, LINUX, ID_COM_LOGGER, ID_COM_PROGRESS, ID_COM_VIDEO
 from .exceptions import RankingOfFeatureMissing, EastModelEnvironmentMissing
 from .manager import ManagerPool
 from .pmpi import Communication
 from .tools import Watcher, Log
 from .tools.ranking import Ranking
 from .util import check_type_video
+from .video import FrameBus, RegionOfInterest, sample_frames
 
 
 def logo():
@@ -49,6 +50,8 @@ class Controller:
         middleware of the controller and the ui
     __video_file : str
         input video file to process
+    __analysis_file : str
+        video file read by the visual and the textual processes, the input or its proxy
     __audio_file : str
         input audio file split from the video file
     __audio_process : Process
@@ -57,6 +60,10 @@ class Controller:
         process to perform video processing
     __textual_process : Process
         process to perform video text detection
+    __frame_bus : FrameBus
+        decodes the video once for both the visual and the textual processes
+    __roi : RegionOfInterest
+        crop rectangle and static overlays of the video, used by the visual and the textual
     __de_noised_audio_file : str
         output audio file from the audio processing
     __video_display : bool
@@ -91,8 +98,9 @@ class Controller:
 
     def __init__(self):
         self.__App = self.__watcher = self.__pool = None
-        self.__video_file = self.__audio_file = self.__de_noised_audio_file = None
-        self.__audio_process = self.__visual_process = self.__textual_process = None
+        self.__video_file = self.__analysis_file = self.__audio_file = self.__de_noised_audio_file = None
+        self.__audio_process = self.__visual_process = self.__textual_process = self.__frame_bus = None
+        self.__roi = None
         self.__video_display = self.__text_detect_display = self.__spec_plot_display = self.__analytics_display = False
         self.__visual, self.__auditory, self.__ffmpeg = Visual(), Auditory(), FFMPEG()
         self.__analytics, self.__cache = Analytics(), Cache()
@@ -189,7 +197,18 @@ class Controller:
             Log.e("Logging out")
             return
 
-        self.__video_file = input_file
+        self.__video_file = self.__analysis_file = input_file
+
+        # the analyzers read the small proxy, the final cut is made from the input
+        if Config.ANALYSIS_PROXY:
+            self.__analysis_file = self.__ffmpeg.gen_proxy(input_file) or input_file
+
+        # pre pass for the black bars and the static overlays
+        self.__roi = None
+        if Config.ANALYSIS_ROI:
+            self.__roi = RegionOfInterest.detect(sample_frames(self.__analysis_file))
+            Log.i(f"Region of interest :: {self.__roi}")
+
         self.__audio_file = self.__ffmpeg.get_input_audio_file_name_path()
         self.__de_noised_audio_file = self.__ffmpeg.get_output_audio_file_name_path()
 
@@ -200,11 +219,27 @@ class Controller:
         """
         Creating 3 processes using the Process class of the multi-processing module.
         FFmpeg separated files are referenced from the Controller public variables
+
+        When `SHARED_DECODE` is set, the video is decoded once by the `FrameBus` and
+        the frames are shared with both the visual and the textual processes. The bus is
+        not used when any of them is split into parallel workers.
+
+        When `CASCADE` is set, the textual process is started only after the audio and the
+        visual processes have ranked the video, and detects text only in the seconds whose
+        cut is not already settled by their ranks. The bus is not used then.
         """
 
         if self.__watcher is not None:
             self.__watcher.start()  # starting the watcher
 
+        visual_reader = textual_reader = None
+        visual_shared = Config.VISUAL_WORKERS <= 1 or self.__video_display
+        textual_shared = Config.TEXT_WORKERS <= 1 or self.__text_detect_display
+
+        if Config.SHARED_DECODE and not Config.CASCADE and visual_shared and textual_shared:
+            self.__frame_bus = FrameBus(self.__analysis_file, consumers=2).start()
+            visual_reader, textual_reader = self.__frame_bus.reader(0), self.__frame_bus.reader(1)
+
         self.__audio_process = Process(target=self.__auditory.start_processing,
                                        args=(self.__audio_file,
                                              self.__de_noised_audio_file,
@@ -212,28 +247,52 @@ class Controller:
 
         self.__visual_process = Process(target=self.__visual.start_processing,
                                         args=(self._channel,
-                                              self.__video_file,
-                                              self.__video_display))
-
-        self.__textual_process = Process(target=self.__textual.start_processing,
-                                         args=(self.__video_file,
-                                               self.__text_detect_display))
+                                              self.__analysis_file,
+                                              self.__video_display,
+                                              visual_reader,
+                                              self.__roi))
 
         # starting the processes
         self.__audio_process.start()
         self.__visual_process.start()
-        self.__textual_process.start()
 
         # adding the processes to the manager pool
         self.__pool.add(self.__audio_process.pid)
         self.__pool.add(self.__visual_process.pid)
+
+        # rank bins in which the text can still change the cut
+        unsettled = None
+        if Config.CASCADE:
+            self.__visual_process.join()
+            self.__audio_process.join()
+            unsettled = Ranking.unsettled_seconds()
+
+        self.__textual_process = Process(target=self.__textual.start_processing,
+                                         args=(self.__analysis_file,
+                                               self.__text_detect_display,
+                                               textual_reader,
+                                               unsettled,
+                                               self.__roi))
+
+        self.__textual_process.start()
         self.__pool.add(self.__textual_process.pid)
 
+        if self.__frame_bus is not None:
+            self.__pool.add(self.__frame_bus.pid)
+
+            # a consumer that dies must not block the decoder for the other one
+            self.__frame_bus.watch(0, self.__visual_process)
+            self.__frame_bus.watch(1, self.__textual_process)
+
         # waiting for the processes to terminate
         self.__visual_process.join()
         self.__audio_process.join()
         self.__textual_process.join()
 
+        if self.__frame_bus is not None:
+            self.__frame_bus.close()
+            self.__frame_bus = None
+
         # running the final pass
         self.__pool.clean()
         self.__completed()
@@ -298,6 +357,10 @@ class Controller:
         if self.__textual_process is not None:
             self.__textual_process.terminate()
 
+        if self.__frame_bus is not None:
+            self.__frame_bus.close()
+            self.__frame_bus = None
+
         Log.d("Terminating the processes")
         Log.d(f"Garbage collecting .. {gc.collect()}")
 
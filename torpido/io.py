@@ -3,14 +3,18 @@ This file contains function to separate out video and audio using ffmpeg.
 It consists of two functions to split and merge video and audio
 using ffmpeg.
 """
+import glob
+import hashlib
 import os
 
+from torpido.config.config import Config
 from torpido.config.constants import (CACHE_DIR, CACHE_NAME,
                                       IN_AUDIO_FILE, OUT_AUDIO_FILE,
-                                      OUT_VIDEO_FILE, THUMBNAIL_FILE)
+                                      OUT_VIDEO_FILE, THUMBNAIL_FILE,
+                                      PROXY_FILE, PROXY_QUALITY, VIDEO_WIDTH)
 from torpido.exceptions import AudioStreamMissingException, FFmpegProcessException
 from torpido.ffpbar import Progress
-from torpido.tools.ffmpeg import split, merge, thumbnail
+from torpido.tools.ffmpeg import split, merge, thumbnail, proxy
 from torpido.tools.logger import Log
 
 
@@ -176,6 +180,104 @@ class FFMPEG:
             self.__progress_bar.clear()
             return False
 
+    @staticmethod
+    def get_proxy_file_name_path(input_file):
+        """
+        Returns the name and path of the analysis proxy for the input file. The name is the
+        hash of the path, size and modified time of the input and the proxy settings, so a
+        changed input or changed settings never reuse an old proxy
+        """
+        stat = os.stat(input_file)
+        key = "|".join(str(val) for val in (os.path.abspath(input_file), stat.st_size, stat.st_mtime_ns,
+                                              VIDEO_WIDTH, Config.PROXY_FPS, PROXY_QUALITY))
+
+        return os.path.join(CACHE_DIR, PROXY_FILE % hashlib.sha1(key.encode()).hexdigest())
+
+    def gen_proxy(self, input_file):
+        """
+        Generates the low resolution, intra frame only proxy of the input video file that
+        is read by the visual and the textual analysis instead of the original. The proxy is
+        kept in the cache dir and reused by the later runs on the same file, it is not
+        removed by the `clean_up`. The least recently used proxies are removed once all of
+        them take more than `PROXY_CACHE_MB`.
+
+        Parameters
+        ----------
+        input_file : str
+            input video file
+
+        Returns
+        -------
+        str
+            name and path of the proxy, None if it could not be generated
+        """
+        proxy_file = self.get_proxy_file_name_path(input_file)
+
+        if os.path.isfile(proxy_file):
+            Log.i("Reusing the analysis proxy.")
+            os.utime(proxy_file)
+            return proxy_file
+
+        if not os.path.isdir(CACHE_DIR):
+            os.mkdir(CACHE_DIR)
+
+        # written to a temporary file first so a stopped run never leaves a half proxy
+        temp_file = proxy_file.replace(".avi", ".tmp.avi")
+
+        try:
+            self.__progress_bar = Progress()
+            Log.i("Generating the analysis proxy.")
+            for log in proxy(input_file, temp_file, VIDEO_WIDTH, Config.PROXY_FPS):
+                self.__progress_bar.display(log)
+
+            if not os.path.isfile(temp_file):
+                raise FFmpegProcessException
+
+            os.replace(temp_file, proxy_file)
+            self.evict_proxies(keep=proxy_file)
+            self.__progress_bar.complete()
+            print("----------------------------------------------------------")
+            return proxy_file
+
+        except FFmpegProcessException:
+            Log.e(FFmpegProcessException.cause)
+            self.__progress_bar.clear()
+            return None
+
+    @staticmethod
+    def evict_proxies(keep=None, directory=CACHE_DIR):
+        """
+        Removes the least recently used analysis proxies (by the modified time, a reused
+        proxy is touched) till all the proxies left fit in `PROXY_CACHE_MB`
+
+        Parameters
+        ----------
+        keep : str, optional
+            proxy that is never removed, the one in use
+        directory : str
+            dir the proxies are kept in
+
+        Returns
+        -------
+        list
+            name and path of the removed proxies
+        """
+        # the proxy in use first, then the most recently used
+        proxies = sorted(glob.glob(os.path.join(directory, PROXY_FILE % "*")),
+                         key=lambda proxy_file: (proxy_file == keep, os.path.getmtime(proxy_file)), reverse=True)
+        size, limit, removed = 0, Config.PROXY_CACHE_MB * 1024 * 1024, list()
+
+        for proxy_file in proxies:
+            size += os.path.getsize(proxy_file)
+            if size > limit and proxy_file != keep:
+                size -= os.path.getsize(proxy_file)
+                os.unlink(proxy_file)
+                removed.append(proxy_file)
+
+        if len(removed) > 0:
+            Log.i(f"Removed {len(removed)} old analysis proxies.")
+        return removed
+
     def gen_thumbnail(self, time):
         """
         Generates the thumbnail from the timestamps. Since, the timestamps contains the best
@@ -212,7 +314,8 @@ class FFMPEG:
     def clean_up(self):
         """
         Deletes extra files created while processing, deletes the ranking files
-        cache, etc.
+        cache, etc. The analysis proxy and the raw features are kept for the later runs
+        and the re cuts.
         """
 
         # processing is not yet started for something went wrong
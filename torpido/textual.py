@@ -7,6 +7,8 @@ geometry for the sections that contain the text.
 If mixed with text extraction it can give text from the image.
 """
 
+from multiprocessing import Pool
+
 import cv2
 import numpy as np
 
@@ -14,16 +16,35 @@ from .config.cache import Cache
 from .config.config import Config
 from .config.constants import *
 from .exceptions import EastModelEnvironmentMissing
+from .tools.features import save_features
 from .tools.logger import Log
 from .util import image
-from .tools.ranking import Ranking
+from .tools.ranking import Ranking, RankAccumulator
+from .video import HashCache, frame_key, decode_boxes, max_confidence
+
+# textual object of the pool worker process, the model is loaded once per worker
+_worker = None
+
+# score of the samples that are not run through the model, below any confidence
+_NOT_DETECTED = -1.0
+
+
+def _init_worker():
+    """ Creates the textual object (loads the EAST model) once for each of the pool workers """
+    global _worker
+    _worker = Textual()
+
+
+def _process_chunk(task):
+    """ Runs the text detection for a chunk of samples in the pool worker """
+    return _worker._process_chunk(*task)
 
 
 class Textual:
     """
     Class to perform Textual analysis on the input video file. This class creates its own
-    video reader and handles the frame independent of the `Visual`. The EAST model of the
-    OpenCV is used to detect text in the video.
+    video reader and handles the frame independent of the `Visual`, unless a reader of the
+    shared `FrameBus` is given. The EAST model of the OpenCV is used to detect text in the video.
 
     Since, the model is very slow depend-ing on the system its running. So some of the frames
     are skipped `TEXT_SKIP_FRAMES` determines the no of frames to skip
@@ -36,8 +57,10 @@ class Textual:
         number of frames in the video
     __text_ranks : list
         list of the ranks
-    __video_getter : OpenCV
-        opencv file reader
+    __scores : list
+        max confidence of each sample, saved for the re cuts
+    __video_getter : OpenCV, FrameReader
+        opencv file reader or the reader of the shared frame bus
     __cache : Cache
         object of the Cache to store the ranking
     __min_confidence : int
@@ -48,8 +71,22 @@ class Textual:
         height of the frame
     __skip_frames : int
         no of frames to skip
+    __rank_bin : float
+        width of a rank bin in secs (`RANK_BIN`)
     __net : object
         loaded east model
+    __workers : int
+        no of worker processes, more than 1 splits the video into time chunks
+    __batch_size : int
+        no of sampled frames that are run in a single forward pass of the model
+    __needed : np.ndarray, None
+        True for the samples that are detected, None detects all of them
+    __dedupe : bool
+        samples near identical to an analysed sample reuse its detection (`FRAME_DEDUPE`)
+    __hash_cache : HashCache
+        detection of the last analysed sample keyed by the hash and the mean intensity of the frame
+    __roi : RegionOfInterest, None
+        the static overlays of the frames are masked and the frames cropped to the region
     __text_detect_layer_name
         layer name to detect the text in the video and return the code
     __text_display_layer_names
@@ -58,10 +95,15 @@ class Textual:
 
     def __init__(self):
         cv2.setUseOptimized(True)
-        self.__fps = self.__frame_count = self.__text_ranks = self.__video_getter = None
+        self.__fps = self.__frame_count = self.__text_ranks = self.__scores = self.__video_getter = None
         self.__cache = Cache()
         self.__min_confidence, self.__skip_frames = Config.TEXT_MIN_CONFIDENCE, Config.TEXT_SKIP_FRAMES
+        self.__rank_bin = Config.RANK_BIN
         self.__WIDTH = self.__HEIGHT = 320  # same thing for this
+        self.__workers, self.__batch_size = Config.TEXT_WORKERS, max(1, Config.TEXT_BATCH_SIZE)
+        self.__needed = None
+        self.__dedupe, self.__hash_cache = Config.FRAME_DEDUPE, HashCache("Textual", Config.HASH_DISTANCE)
+        self.__roi = None
 
         # saving the original dim of the frame
         self._original_H, self._original_W = None, None
@@ -82,39 +124,149 @@ class Textual:
 
     def __run_text_detect(self, blob):
         """
-        Function to detect only text and no display. Gets the scores and calculates if the image
-        contains any text
+        Function to detect only text and no display. Gets the scores and the max confidence of
+        text in the images, all the images of the blob are run in a single forward pass
 
         Parameters
         ----------
         blob : blob
-            blob of the image
+            blob of the images
 
         Returns
         -------
-        bool
-            True denotes text detected
+        list
+            max confidence, one for each image of the blob
         """
         self.__net.setInput(blob)
-        scores = self.__net.forward(self.__text_detect_layer_name)
-        num_rows, num_cols = np.asarray(scores).shape[3: 5]
-        confidences = list()
+        return max_confidence(self.__net.forward(self.__text_detect_layer_name)[0])
 
-        # make this faster some how ?
-        # since image is 320x320 the output is 80x80 (scores)
-        for x in range(0, num_rows):
-            score_data = scores[0][0][0][x]
-            for y in range(0, num_cols):
-                if score_data[y] < self.__min_confidence:
-                    continue
+    def __detect_batch(self, frames):
+        """
+        Creates a single blob of the resized frames and runs the text detection on it
 
-                confidences.append(score_data[y])
+        Parameters
+        ----------
+        frames : list
+            frames resized to the model input size
 
-        # if confidences contain some value
-        if len(confidences) > 0:
-            return True
+        Returns
+        -------
+        list
+            max confidence, one for each frame
+        """
+        blob = cv2.dnn.blobFromImages(frames,
+                                      1.0,
+                                      (self.__WIDTH, self.__HEIGHT),
+                                      (123.68, 116.78, 103.94),
+                                      swapRB=True, crop=False)
+        return self.__run_text_detect(blob)
+
+    def __detect_samples(self, samples, hashes):
+        """
+        Runs the collected frames in a single forward pass, the samples that are already
+        known keep their score. The scores of the frames are saved in the hash cache
+
+        Parameters
+        ----------
+        samples : list
+            resized frames, or the score of the samples that are not run
+        hashes : list
+            dedupe key of each of the frames, empty without `FRAME_DEDUPE`
+
+        Returns
+        -------
+        list
+            max confidence, one for each sample
+        """
+        frames = [sample for sample in samples if isinstance(sample, np.ndarray)]
+        scores = self.__detect_batch(frames) if len(frames) > 0 else []
+
+        for frame_hash, score in zip(hashes, scores):
+            self.__hash_cache.put(frame_hash, score)
+
+        detected = iter(scores)
+        return [next(detected) if isinstance(sample, np.ndarray) else sample for sample in samples]
+
+    def __flush(self, samples, hashes):
+        """
+        Runs the collected frames in a single forward pass and adds the ranks in the
+        order of the samples, the samples without a frame are not run and keep their
+        score, `_NOT_DETECTED` for the samples not needed
+
+        Parameters
+        ----------
+        samples : list
+            resized frames, or the score of the samples that are not run
+        hashes : list
+            dedupe key of each of the frames, empty without `FRAME_DEDUPE`
+        """
+        for score in self.__detect_samples(samples, hashes):
+            self.__add_score(score)
 
-        return False
+    def __region(self, frame):
+        """ Masks the static overlays and crops the frame to the region of interest """
+        return frame if self.__roi is None else np.ascontiguousarray(self.__roi.apply(frame))
+
+    def __cached(self, frame, frame_hash=None):
+        """
+        Score of a near identical sample from the hash cache, None if the frame has to be
+        run through the model. Always None without `FRAME_DEDUPE`
+
+        Parameters
+        ----------
+        frame : np.ndarray
+            sampled frame
+        frame_hash : tuple, optional
+            dedupe key computed by the reader, else the frame is hashed here
+
+        Returns
+        -------
+        tuple
+            score or None, and the dedupe key of the frame
+        """
+        if not self.__dedupe:
+            return None, None
+
+        frame_hash = frame_key(frame) if frame_hash is None else frame_hash
+        return self.__hash_cache.previous(frame_hash), frame_hash
+
+    def __bin_frames(self):
+        """ No of frames of a rank bin, fractional for the fractional fps same as the `RankAccumulator` """
+        return self.__fps * self.__rank_bin
+
+    def __set_needed(self, unsettled):
+        """
+        Marks the samples that cover any of the unsettled bins, the sample `j` covers the
+        frames `j * skip_frames` to `(j + 1) * skip_frames - 1` and the bin `b` covers the
+        frames `p` with `floor(p / bin_frames) = b` same as the normalization
+
+        Parameters
+        ----------
+        unsettled : list, None
+            True for the bins in which the text rank can change the cut
+        """
+        if unsettled is None:
+            self.__needed = None
+            return
+
+        frames, samples = self.__bin_frames(), int(self.__frame_count // self.__skip_frames)
+        self.__needed = np.zeros(samples, dtype=bool)
+
+        # first frame of each bin, the bins are fractional no of frames wide
+        starts = np.arange(len(unsettled) + 1) * frames
+        starts = np.ceil(starts - RankAccumulator._EPS * frames).astype(np.int64)
+
+        # the frames past the last sample keep its rank, see `__timed_ranking_normalize`
+        for index in np.flatnonzero(unsettled):
+            first = min(starts[index] // self.__skip_frames, samples - 1)
+            last = (starts[index + 1] - 1) // self.__skip_frames
+            self.__needed[first: last + 1] = True
+
+        Log.i(f"Text detection needed for {np.count_nonzero(self.__needed)} of {samples} samples")
+
+    def __is_needed(self, sample):
+        """ True if the sample is detected, samples past the known frame count are always detected """
+        return self.__needed is None or sample >= len(self.__needed) or self.__needed[sample]
 
     def __run_text_detect_display(self, blob, original):
         """
@@ -130,62 +282,22 @@ class Textual:
 
         Returns
         -------
-        bool
-            True denotes text detected
+        float
+            max confidence of the text, -1 if the model gives no score
         """
         # running the model
         self.__net.setInput(blob=blob)
         scores, geometry = self.__net.forward(self.__text_display_layer_names)
 
-        num_rows, num_cols = scores.shape[2:4]
         rW = self._original_W / float(self.__WIDTH)
         rH = self._original_H / float(self.__HEIGHT)
         rSize = (rW, rH)
-        rect, confidences = list(), list()
 
         # since image is 320x320 the output is 80x80 (scores)
-        for y in range(0, num_rows):
-            scoresData = scores[0, 0, y]
-            xData0 = geometry[0, 0, y]
-            xData1 = geometry[0, 1, y]
-            xData2 = geometry[0, 2, y]
-            xData3 = geometry[0, 3, y]
-            anglesData = geometry[0, 4, y]
-
-            for x in range(0, num_cols):
-                # if our score does not have sufficient probability, ignore it
-                if scoresData[x] < self.__min_confidence:
-                    continue
-
-                # compute the offset factor as our resulting feature maps will
-                # be 4x smaller than the input image
-                (offsetX, offsetY) = (x * 4, y * 4)
-
-                # extract the rotation angle for the prediction and then
-                # compute the sin and cosine
-                angle = anglesData[x]
-                cos = np.cos(angle)
-                sin = np.sin(angle)
-
-                # use the geometry volume to derive the width and height of
-                # the bounding box
-                h = xData0[x] + xData2[x]
-                w = xData1[x] + xData3[x]
-
-                # compute both the starting and ending (x, y)-coordinates for
-                # the text prediction bounding box
-                endX = int(offsetX + (cos * xData1[x]) + (sin * xData2[x]))
-                endY = int(offsetY - (sin * xData1[x]) + (cos * xData2[x]))
-                startX = int(endX - w)
-                startY = int(endY - h)
-
-                # add the bounding box coordinates and probability score to
-                # our respective lists
-                rect.append((startX, startY, endX, endY))
-                confidences.append(scoresData[x])
+        rect, confidences = decode_boxes(scores, geometry, self.__min_confidence)
 
         # compressing the boxes or rectangles
-        boxes = image.non_max_suppression(np.array(rect), probs=confidences)
+        boxes = image.non_max_suppression(rect, probs=confidences)
 
         rW, rH = rSize
         for startX, startY, endX, endY in boxes:
@@ -200,9 +312,7 @@ class Textual:
         cv2.imshow("Text Detection", original)
         cv2.waitKey(1) & 0xFF
 
-        if len(confidences) > 0:
-            return True
-        return False
+        return float(np.amax(scores)) if scores.size > 0 else _NOT_DETECTED
 
     def __timed_ranking_normalize(self):
         """
@@ -222,25 +332,178 @@ class Textual:
 
         if len(self.__text_ranks) == 0:
             text_normalize.extend([0] * int(self.__frame_count))
+        else:
+            # the frames past the last sample keep its rank, so all the bins of the video are
+            # ranked and none are padded by the mean, which the skipped samples of `CASCADE` lower
+            frame_count = int(self.__frame_count)
+            ranks = self.__text_ranks[:frame_count]
+            ranks = ranks + ranks[-1:] * (frame_count - len(ranks))
 
-        for i in range(0, int(self.__frame_count), int(self.__fps)):
-            if len(self.__text_ranks) >= (i + int(self.__fps)):
-                text_normalize.append(np.mean(self.__text_ranks[i: i + int(self.__fps)]))
-            else:
-                break
+            # bins of the frames of the video, 1 sec by default, same as the visual ranks
+            accumulator = RankAccumulator(self.__fps, self.__frame_count, bin_secs=self.__rank_bin)
+            accumulator.extend(ranks)
+            text_normalize = accumulator.means()
 
         # saving all processed stuffs
         Ranking.add(CACHE_RANK_TEXT, text_normalize)
+        save_features("textual", fps=self.__fps, frame_count=self.__frame_count, rank_bin=self.__rank_bin,
+                      skip_frames=self.__skip_frames, scores=np.asarray(self.__scores, dtype=np.float32))
         Log.d(f"Textual rank length {len(text_normalize)}")
         Log.i("Textual ranking saved .............")
 
+    def __add_score(self, score):
+        """ Saves the max confidence of a sample and adds its rank """
+        self.__scores.append(score)
+        self.__add_rank(score >= self.__min_confidence)
+
+    def __add_rank(self, detected_text):
+        """ Adds the rank of a sample for all the frames that were skipped for it """
+        if detected_text:
+            self.__text_ranks.extend([Config.RANK_TEXT] * int(self.__skip_frames))
+            Log.d("Text detected.")
+        else:
+            self.__text_ranks.extend([0] * int(self.__skip_frames))
+            Log.d("No text detected.")
+
+    def _process_chunk(self, input_file, skip_frames, first, last, roi=None):
+        """
+        Runs the text detection for the samples from first to last, each sample is the
+        last frame of its `skip_frames` window, same as the sequential run. Runs in the
+        worker processes.
+
+        Parameters
+        ----------
+        input_file : str
+            input video file
+        skip_frames : int
+            no of frames in each sample window
+        first : int
+            first sample of the chunk
+        last : int
+            sample to stop at
+        roi : RegionOfInterest, optional
+            region the frames are cropped to
+
+        Returns
+        -------
+        tuple
+            max confidence of each sample, and the hits and misses of the hash cache
+            for the chunk
+        """
+        detected, samples, hashes, batched = list(), list(), list(), 0
+        self.__roi = roi
+        hits, misses = self.__hash_cache.hits, self.__hash_cache.misses
+        capture = cv2.VideoCapture(str(input_file))
+        capture.set(cv2.CAP_PROP_POS_FRAMES, first * skip_frames)
+
+        for _ in range(first, last):
+
+            # frames before the sample are only grabbed, not retrieved
+            ret = all(capture.grab() for _ in range(skip_frames - 1))
+            if ret:
+                ret, frame = capture.read()
+
+            if not ret:
+                break
+
+            frame = self.__region(frame)
+            cached, frame_hash = self.__cached(frame)
+            if cached is not None:
+                samples.append(cached)
+                continue
+
+            # resizing the frame to a multiple of 32 x 32
+            samples.append(cv2.resize(frame, (self.__WIDTH, self.__HEIGHT)))
+            if frame_hash is not None:
+                hashes.append(frame_hash)
+
+            batched += 1
+            if batched == self.__batch_size:
+                detected.extend(self.__detect_samples(samples, hashes))
+                samples, hashes, batched = list(), list(), 0
+
+        if len(samples) > 0:
+            detected.extend(self.__detect_samples(samples, hashes))
+
+        capture.release()
+        return detected, self.__hash_cache.hits - hits, self.__hash_cache.misses - misses
+
+    def __snap_chunks(self, firsts, shots, start, end):
+        """
+        Moves the first samples of the chunks onto the samples of the shot cuts within the
+        `SHOT_SNAP_TOLERANCE`, the sample `j` holds the frames `j * skip_frames` onwards
+
+        Parameters
+        ----------
+        firsts : list
+            first sample of each chunk of the run
+        shots : list
+            times of the shot cuts in secs
+        start : int
+            first sample of the run
+        end : int
+            sample after the run
+
+        Returns
+        -------
+        list
+            first sample of each chunk, sorted and unique
+        """
+        times = [first * self.__skip_frames / self.__fps for first in firsts[1:]]
+        snapped = Ranking.snap(times, shots, Config.SHOT_SNAP_TOLERANCE)
+        samples = {int(time * self.__fps / self.__skip_frames + 1e-9) for time in snapped}
+        return [start] + sorted(sample for sample in samples if start < sample < end)
+
+    def __start_parallel(self, input_file):
+        """
+        Splits the samples into chunks, more chunks than the workers so that the
+        load is balanced. Each of the workers loads the model once and processes
+        several chunks, the detections are joined in order. Only the runs of the
+        needed samples are split into chunks, the rest are ranked 0.
+
+        When the shot cuts of the visual are known (`CASCADE`), the chunk boundaries are
+        moved onto the cuts near them, so a shot is read by a single worker and its near
+        identical samples hit the same hash cache.
+
+        Parameters
+        ----------
+        input_file : str
+            input video file
+        """
+        samples = int(self.__frame_count // self.__skip_frames)
+        needed = self.__needed if self.__needed is not None else np.ones(samples, dtype=bool)
+
+        # start and end of each run of the needed samples
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], needed.astype(np.int8), [0]))))
+        runs = edges.reshape(-1, 2)
+
+        size = max(1, int(np.count_nonzero(needed) // (self.__workers * 4)))
+        shots, tasks = Ranking.get(CACHE_SHOTS), list()
+
+        for start, end in runs:
+            firsts = list(range(start, end, size))
+            if shots:
+                firsts = self.__snap_chunks(firsts, shots, start, end)
+            tasks.extend((input_file, self.__skip_frames, first, last, self.__roi)
+                         for first, last in zip(firsts, firsts[1:] + [end]))
+
+        detections = np.full(samples, _NOT_DETECTED)
+        with Pool(processes=self.__workers, initializer=_init_worker) as pool:
+            for (_, _, first, _, _), (detected, hits, misses) in zip(tasks, pool.imap(_process_chunk, tasks)):
+                detections[first: first + len(detected)] = detected
+                self.__hash_cache.hits += hits
+                self.__hash_cache.misses += misses
+
+        for score in detections:
+            self.__add_score(float(score))
+
     def __del__(self):
         """ clean ups """
         del self.__net
         del self.__video_getter
         Log.d("Cleaning up.")
 
-    def start_processing(self, input_file, display=False):
+    def start_processing(self, input_file, display=False, reader=None, unsettled=None, roi=None):
         """
         Function to perform the Textual Processing on the input video file.
         The video can be displayed as the processing is going on.
@@ -251,62 +514,146 @@ class Textual:
             input video file
         display : bool
             True to display the video while processing
+        reader : FrameReader, optional
+            reads the frames from the shared `FrameBus` instead of decoding the video again
+        unsettled : list, optional
+            True for the bins in which the text rank can still change the cut, from
+            `Ranking.unsettled_seconds`. The samples of the other bins are not detected
+            and ranked 0. None detects all the samples
+        roi : RegionOfInterest, optional
+            region of interest found by the pre pass, the static overlays are masked so
+            a logo does not count as text, and the frames are cropped to the region
+
+        Notes
+        -----
+        When `TEXT_WORKERS` is more than 1 and the video is not displayed, the video is
+        split into time chunks that are processed by a pool of workers, the reader is
+        not used then. The reader is always stopped, even when the processing fails, so
+        the decoder of the frame bus does not wait for this consumer.
         """
-
+        try:
+            self.__process(input_file, display, reader, unsettled, roi)
+        finally:
+            if reader is not None:
+                reader.stop()
+
+    def __process(self, input_file, display, reader, unsettled, roi):
+        """ Text detection of the video, see `start_processing` """
         if os.path.isfile(input_file) is False:
             Log.e(f"File {input_file} does not exists")
             return
 
-        self.__video_getter = cv2.VideoCapture(str(input_file))
-        self.__fps = self.__video_getter.get(cv2.CAP_PROP_FPS)
-        self.__frame_count = self.__video_getter.get(cv2.CAP_PROP_FRAME_COUNT)
+        # maintaining the ranks for text detection
+        self.__text_ranks, self.__scores, self.__roi = list(), list(), roi
+
+        if self.__workers > 1 and not display:
+            capture = cv2.VideoCapture(str(input_file))
+            self.__fps = capture.get(cv2.CAP_PROP_FPS)
+            self.__frame_count = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+            self.__skip_frames = int(self.__fps * self.__skip_frames)
+            capture.release()
+            self.__set_needed(unsettled)
+
+            Log.i(f"Detecting text with {self.__workers} workers")
+            self.__start_parallel(input_file)
+            if self.__dedupe:
+                self.__hash_cache.log()
+            self.__timed_ranking_normalize()
+            return
+
+        if reader is not None:
+            self.__video_getter = reader
+            self.__fps, self.__frame_count = reader.fps, reader.frame_count
+        else:
+            self.__video_getter = cv2.VideoCapture(str(input_file))
+            self.__fps = self.__video_getter.get(cv2.CAP_PROP_FPS)
+            self.__frame_count = self.__video_getter.get(cv2.CAP_PROP_FRAME_COUNT)
         self.__skip_frames = int(self.__fps * self.__skip_frames)
+        self.__set_needed(unsettled)
 
-        # maintaining the ranks for text detection
-        count, original = 0, None
-        self.__text_ranks = list()
+        count, original, samples, hashes, batched = 0, None, list(), list(), 0
 
         while True:
-            ret, frame = self.__video_getter.read()
+            count += 1
+            sampled = count % self.__skip_frames == 0
+            needed = sampled and self.__is_needed(count // self.__skip_frames - 1)
+
+            # skipped frames are only grabbed, the image is not retrieved or resized
+            if not needed:
+                ret = reader.skip() if reader is not None else self.__video_getter.grab()
+                if not ret:
+                    break
+
+                # sample not needed by the cut, ranked without running the model
+                if sampled:
+                    if display:
+                        self.__add_score(_NOT_DETECTED)
+                    else:
+                        samples.append(_NOT_DETECTED)
+                continue
+
+            if reader is not None:
+                frame = reader.read()
+                ret = frame is not None
+            else:
+                ret, frame = self.__video_getter.read()
 
             if frame is None or not ret:
                 break
 
+            frame = self.__region(frame)
             if self._original_H is None:
                 self._original_H, self._original_W = frame.shape[:2]
 
             if display:
                 original = frame
 
-            # resizing the frame to a multiple of 32 x 32
-            frame = cv2.resize(frame, (self.__WIDTH, self.__HEIGHT))
-
-            count += 1
-            if count % self.__skip_frames == 0:
-
-                #  making the image blob
-                blob = cv2.dnn.blobFromImage(frame,
-                                             1.0,
-                                             (self.__WIDTH, self.__HEIGHT),
-                                             (123.68, 116.78, 103.94),
-                                             swapRB=True, crop=False)
-
-                # run text detection
+            # near identical frames reuse the detection of the sample analysed before
+            cached, frame_hash = self.__cached(frame, reader.hash if reader is not None else None)
+            if cached is not None:
                 if display:
-                    detected_text = self.__run_text_detect_display(blob, original)
+                    self.__add_score(cached)
                 else:
-                    detected_text = self.__run_text_detect(blob)
+                    samples.append(cached)
+                continue
 
-                # if text is detected
-                if detected_text:
-                    self.__text_ranks.extend([Config.RANK_TEXT] * int(self.__skip_frames))
-                    Log.d("Text detected.")
-                else:
-                    self.__text_ranks.extend([0] * int(self.__skip_frames))
-                    Log.d("No text detected.")
+            # resizing the frame to a multiple of 32 x 32
+            frame = cv2.resize(frame, (self.__WIDTH, self.__HEIGHT))
 
-        # clearing the memory
-        self.__video_getter.release()
+            # samples are collected and run in a single forward pass
+            if not display:
+                samples.append(frame)
+                if frame_hash is not None:
+                    hashes.append(frame_hash)
+                batched += 1
+                if batched == self.__batch_size:
+                    self.__flush(samples, hashes)
+                    samples, hashes, batched = list(), list(), 0
+                continue
+
+            #  making the image blob
+            blob = cv2.dnn.blobFromImage(frame,
+                                         1.0,
+                                         (self.__WIDTH, self.__HEIGHT),
+                                         (123.68, 116.78, 103.94),
+                                         swapRB=True, crop=False)
+
+            # run text detection
+            score = self.__run_text_detect_display(blob, original)
+            if frame_hash is not None:
+                self.__hash_cache.put(frame_hash, score)
+            self.__add_score(score)
+
+        # running the remaining samples
+        if len(samples) > 0:
+            self.__flush(samples, hashes)
+
+        if self.__dedupe:
+            self.__hash_cache.log()
+
+        # clearing the memory, the reader is stopped by `start_processing`
+        if reader is None:
+            self.__video_getter.release()
 
         if display:
             cv2.destroyAllWindows()
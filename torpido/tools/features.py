@@ -0,0 +1,105 @@
+"""
+Raw measurements of the analyzers, saved before they are thresholded into the ranks.
+The ranks and the timestamps can be made again from them with a new config, without
+decoding and analysing the video again (see `torpido.tools.recut`).
+"""
+
+import os
+
+import numpy as np
+
+from ..config.constants import CACHE_DIR, FEATURE_DIR
+from ..tools.logger import Log
+
+
+class FeatureTrack:
+    """
+    Raw measurement of each frame, kept in the same positions as the `RankAccumulator`.
+    The parts added at the offsets of the parallel time ranges are merged and placed in
+    their positions when the values are read.
+
+    Attributes
+    ----------
+    __position : int
+        position of the next value in the video
+    __parts : list
+        position and the values of each part added
+
+    Examples
+    --------
+    >>> blur = FeatureTrack()
+    >>> blur.extend(variance)
+    >>> blur.values()
+    """
+
+    def __init__(self, offset=0):
+        self.__position, self.__parts = int(offset), list()
+
+    def extend(self, values):
+        """ Adds the values of the next frames """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) > 0:
+            self.__parts.append((self.__position, values))
+            self.__position += len(values)
+
+    def merge(self, other):
+        """ Adds the values of the other track (another part of the same video) """
+        self.__parts.extend(other.__parts)
+        self.__position = max(self.__position, other.__position)
+
+    def __len__(self):
+        return max([position + len(values) for position, values in self.__parts], default=0)
+
+    def values(self):
+        """ All the values in their positions, the positions never added are 0 """
+        values = np.zeros(len(self))
+        for position, part in self.__parts:
+            values[position: position + len(part)] = part
+        return values
+
+
+def _feature_file(name, directory=None):
+    return os.path.join(directory or os.path.join(CACHE_DIR, FEATURE_DIR), f"{name}.npz")
+
+
+def save_features(name, directory=None, **arrays):
+    """
+    Saves the arrays of the analyzer, each analyzer writes its own file since they run in
+    separate processes. The file is written aside and moved in place, so a reader never
+    sees a partial file
+
+    Parameters
+    ----------
+    name : str
+        name of the analyzer, "visual", "textual" or "audio"
+    directory : str, optional
+        features dir to save in, the cache by default
+    arrays : np.ndarray
+        measurements and the meta data (fps etc.) of the analyzer
+    """
+    path = _feature_file(name, directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    temp = path + ".tmp.npz"
+    np.savez(temp, **arrays)
+    os.replace(temp, path)
+    Log.d(f"[FEATURES] {name} stored")
+
+
+def load_features(name, directory=None):
+    """
+    Arrays saved by the analyzer as a dict, None if the analyzer has not saved any
+
+    Parameters
+    ----------
+    name : str
+        name of the analyzer, "visual", "textual" or "audio"
+    directory : str, optional
+        features dir of another video (a copy of the features dir), the cache by default
+    """
+    path = _feature_file(name, directory)
+    if not os.path.isfile(path):
+        return None
+
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
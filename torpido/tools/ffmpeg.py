@@ -6,6 +6,7 @@ Function to build the commands live here.
 import subprocess
 
 from torpido import pympeg
+from torpido.config.constants import PROXY_QUALITY
 from torpido.exceptions.custom import FFmpegProcessException
 from torpido.tools.filelogger import FileLogger
 from torpido.tools.logger import Log
@@ -33,6 +34,16 @@ def merge(video_file, audio_file, output_file, timestamps, intro=None, outro=Non
         yield log
 
 
+def proxy(input_file, output_file, width, fps=0):
+    """ Transcoding the input video file into the low resolution analysis proxy """
+    command = _build_proxy_command(input_file, output_file, width, fps)
+    command = ' '.join(command)
+    Log.i(command)
+
+    for log in _ffmpeg_runner(command, "Error while generating the analysis proxy"):
+        yield log
+
+
 def thumbnail(video_file, output_file, sec):
     """ Generates a thumbnail for the video using the time in the video """
     command = _build_thumbnail_gen(video_file, output_file, sec)
@@ -105,6 +116,99 @@ def _build_split_command(input_file, output_audio_file):
     ]
 
 
+def _build_proxy_command(input_file, output_file, width, fps=0):
+    """
+    Creates the command to transcode the video into a small, all intra frame video
+    that is cheap to decode. Audio is dropped since only the analyzers of the video read it.
+
+    Parameters
+    ----------
+    input_file : str
+        input video file name and path
+    output_file : str
+        proxy video file name and path
+    width : int
+        width of the proxy, height keeps the aspect ratio
+    fps : float
+        frame rate of the proxy, 0 keeps the frame rate of the input
+
+    Returns
+    ---------
+    list
+        command line to pass to the subprocess
+
+    Examples
+    ----------
+    `ffmpeg -y -i input.mkv -an -vf scale=500:-2:flags=area -c:v mjpeg -q:v 3 proxy.avi`
+
+        '-an' : FFmpeg option for 'no audio'
+        '-c:v mjpeg' : every frame is a key frame (intra), so decoding a frame never needs another
+        '-q:v 3' : quality of the jpeg frames, lower is better
+    """
+    filters = 'scale=%d:-2:flags=area' % width
+    if fps > 0:
+        filters += ',fps=%s' % fps
+
+    return [
+        'ffmpeg',
+        '-y',
+        '-i',
+        "'" + str(input_file) + "'",
+        '-an',
+        '-vf',
+        filters,
+        '-c:v',
+        'mjpeg',
+        '-q:v',
+        str(PROXY_QUALITY),
+        "'" + str(output_file) + "'"
+    ]
+
+
+def _build_rawvideo_command(input_file, width, height, pix_fmt="bgr24"):
+    """
+    Creates the command to decode the video into raw frames on the std out.
+    The frames are scaled and converted to the pixel format inside the decoder,
+    so every frame on the pipe is exactly `width * height * channels` bytes.
+
+    Parameters
+    ----------
+    input_file : str
+        input video file name and path
+    width : int
+        width of the output frames
+    height : int
+        height of the output frames
+    pix_fmt : str
+        pixel format of the output frames, "bgr24" or "gray"
+
+    Returns
+    ---------
+    list
+        command to pass to the subprocess without the shell
+
+    Examples
+    ----------
+    `ffmpeg -v error -nostdin -i input.mkv -an -sn -vsync passthrough -vf scale=500:281:flags=area
+    -pix_fmt gray -f rawvideo -`
+
+        '-vsync passthrough' : every decoded frame is written, no frame is duplicated or dropped
+        'flags=area' : same interpolation as the `resize` util (INTER_AREA)
+    """
+    return [
+        'ffmpeg',
+        '-v', 'error',
+        '-nostdin',
+        '-i', str(input_file),
+        '-an', '-sn',
+        '-vsync', 'passthrough',
+        '-vf', 'scale=%d:%d:flags=area' % (width, height),
+        '-pix_fmt', pix_fmt,
+        '-f', 'rawvideo',
+        '-'
+    ]
+
+
 def get_width_height(video_file):
     """ Getting the original videos resolution """
     output = pympeg.probe(video_file)
@@ -160,12 +264,16 @@ def _build_merge_command_v2(video_file, audio_file, output_file, timestamps, int
 
     # making trims and scaling them to the output resolution
     for i, times in enumerate(timestamps):
-        start, duration = times
+        start, end = times
+
+        # the clips start and end at fractions of a sec with the shot cuts and the sub sec
+        # rank bins, the times are rounded to the ms so no float noise goes in the filters
+        start, duration = round(start, 3), round(end - start, 3)
 
         # video trim and scale filter
         trim_filters.append(
             split_[i]
-                .filter(filter_name="trim", params={"start": start, "duration": (duration - start)})
+                .filter(filter_name="trim", params={"start": start, "duration": duration})
                 .setpts()
                 .scale(w=str(output_width), h=str(output_height))
                 .arg(args=setsardar)
@@ -174,7 +282,7 @@ def _build_merge_command_v2(video_file, audio_file, output_file, timestamps, int
         # audio trim filter
         trim_filters.append(
             in_audio
-                .filter(filter_name="atrim", params={"start": start, "duration": (duration - start)})
+                .filter(filter_name="atrim", params={"start": start, "duration": duration})
                 .asetpts()
         )
 
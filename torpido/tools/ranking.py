@@ -1,15 +1,18 @@
 import os
 
+import numpy as np
 from joblib import load, dump
 
 from ..tools.logger import Log
+from ..util.timestamp import trim_by_rank
 from ..exceptions.custom import RankingOfFeatureMissing
 from ..config.cache import Cache
 from ..config.config import Config
 from ..config.constants import (CACHE_FRAME_COUNT, CACHE_FPS,
                                 CACHE_DIR, CACHE_NAME,
                                 CACHE_RANK_MOTION, CACHE_RANK_BLUR,
-                                CACHE_RANK_TEXT, CACHE_RANK_AUDIO)
+                                CACHE_RANK_TEXT, CACHE_RANK_AUDIO,
+                                CACHE_SHOTS, CACHE_RANK_BIN, SHOT_MIN_GAP)
 
 
 class _RankCache:
@@ -51,36 +54,233 @@ class _RankCache:
             return list(data[_RankCache.RANK_KEY].values())
 
 
+class RankAccumulator:
+    """
+    Folds the per frame ranks into the per bin sums and counts as they arrive, so the
+    memory is in the order of the bins of the video and no per frame list is kept. The
+    bins are `RANK_BIN` secs wide, the rank at position `p` goes to the bin
+    `floor(p / (fps * bin_secs))`, so the bins stay correct for the fractional fps (29.97)
+    and the sub sec bins too.
+
+    Accumulators of the parts of a video (parallel time ranges) are merged by `merge`,
+    each part starts at its own offset.
+
+    Attributes
+    ----------
+    fps : float
+        input video fps, no of ranks in a second
+    bin_secs : float
+        width of a bin in secs
+    __frames : float
+        no of ranks in a bin
+    __position : int
+        position of the next rank in the video
+    __sums : np.ndarray
+        sum of the ranks of each bin
+    __counts : np.ndarray
+        no of ranks added to each bin
+
+    Examples
+    --------
+    >>> motion = RankAccumulator(fps=30, frame_count=900)
+    >>> motion.add(3)
+    >>> motion.extend([0, 3, 3])
+    >>> motion.means()
+    """
+
+    # guards the exact multiples of the fps against float rounding of the division
+    _EPS = 1e-9
+
+    def __init__(self, fps, frame_count=0, offset=0, bin_secs=1.0):
+        self.fps, self.bin_secs = float(fps), float(bin_secs)
+        self.__frames = self.fps * self.bin_secs
+        self.__position = int(offset)
+        bins = int(frame_count / self.__frames) + 1 if frame_count else 64
+        self.__sums, self.__counts = np.zeros(bins), np.zeros(bins, dtype=np.int64)
+
+    def __bin(self, position):
+        return np.floor(position / self.__frames + RankAccumulator._EPS).astype(np.int64)
+
+    def __grow(self, bins):
+        """ Grows the storage to hold at least the bins """
+        if bins > len(self.__sums):
+            extra = max(bins, 2 * len(self.__sums)) - len(self.__sums)
+            self.__sums = np.concatenate((self.__sums, np.zeros(extra)))
+            self.__counts = np.concatenate((self.__counts, np.zeros(extra, dtype=np.int64)))
+
+    def add(self, rank):
+        """ Adds the rank of the next frame """
+        index = int(self.__bin(self.__position))
+        self.__grow(index + 1)
+        self.__sums[index] += rank
+        self.__counts[index] += 1
+        self.__position += 1
+
+    def extend(self, ranks):
+        """ Adds the ranks of the next frames at once """
+        ranks = np.asarray(ranks, dtype=np.float64)
+        if len(ranks) == 0:
+            return
+
+        bins = self.__bin(np.arange(self.__position, self.__position + len(ranks)))
+        self.__grow(int(bins[-1]) + 1)
+
+        size = len(self.__sums)
+        self.__sums += np.bincount(bins, weights=ranks, minlength=size)
+        self.__counts += np.bincount(bins, minlength=size)
+        self.__position += len(ranks)
+
+    def merge(self, other):
+        """ Adds the ranks of the other accumulator (another part of the same video) """
+        self.__grow(len(other.__sums))
+        self.__sums[:len(other.__sums)] += other.__sums
+        self.__counts[:len(other.__counts)] += other.__counts
+        self.__position = max(self.__position, other.__position)
+
+    def __len__(self):
+        """ No of complete bins """
+        return int(self.__bin(self.__position))
+
+    def means(self):
+        """ Mean rank of each complete bin, the partial bin at the end is left out """
+        bins = len(self)
+        return (self.__sums[:bins] / np.maximum(self.__counts[:bins], 1)).tolist()
+
+
+class ShotIndex:
+    """
+    Compact index of the shot cuts, only the positions of the frames that start a new
+    shot are kept. Fed with the mean change of each frame from the frame before, in the
+    same positions as the `RankAccumulator`, so the indexes of the parallel time ranges
+    are merged the same way.
+
+    Attributes
+    ----------
+    fps : float
+        input video fps
+    threshold : float
+        mean change of a frame above which it starts a new shot
+    __position : int
+        position of the next frame in the video
+    __cuts : list
+        positions of the frames that start a new shot
+
+    Examples
+    --------
+    >>> shots = ShotIndex(fps=30, threshold=30)
+    >>> shots.extend(changes)
+    >>> shots.seconds()
+    [12.4, 31.0]
+    """
+
+    def __init__(self, fps, threshold, offset=0):
+        self.fps, self.threshold = float(fps), threshold
+        self.__position, self.__cuts = int(offset), list()
+
+    def extend(self, changes):
+        """ Adds the mean changes of the next frames, the change at position `p` is of the frame `p + 1` """
+        changes = np.asarray(changes)
+        cuts = np.flatnonzero(changes > self.threshold) + self.__position + 1
+        self.__cuts.extend(cuts.tolist())
+        self.__position += len(changes)
+
+    def merge(self, other):
+        """ Adds the cuts of the other index (another part of the same video) """
+        self.__cuts = sorted(set(self.__cuts) | set(other.__cuts))
+        self.__position = max(self.__position, other.__position)
+
+    def __len__(self):
+        return len(self.__cuts)
+
+    def seconds(self, min_gap=SHOT_MIN_GAP):
+        """ Times of the cuts in secs, a cut closer than the min gap to the cut before is dropped """
+        times = list()
+        for cut in sorted(self.__cuts):
+            time = round(cut / self.fps, 3)
+            if len(times) == 0 or time - times[-1] >= min_gap:
+                times.append(time)
+        return times
+
+
 class Ranking:
+    @staticmethod
+    def bin_secs():
+        """ Width of the rank bins of the analysed video in secs, the `RANK_BIN` if not stored """
+        bin_secs = Cache().read_data(CACHE_RANK_BIN)
+        return Config.RANK_BIN if bin_secs is None else bin_secs
+
     @staticmethod
     def _add_padding(val):
-        _max_length = int(Cache().read_data(CACHE_FRAME_COUNT) / Cache().read_data(CACHE_FPS))
+        _frames = Cache().read_data(CACHE_FPS) * Ranking.bin_secs()
+        _max_length = int(Cache().read_data(CACHE_FRAME_COUNT) / _frames + RankAccumulator._EPS)
         if len(val) < _max_length:
             val.extend([sum(val) / len(val)] * abs(_max_length - len(val)))
             return val
         return val[0: _max_length]
 
     @staticmethod
-    def _trim_by_rank(ranks):
-        timestamps = list()
-        _min_rank = Config.MIN_RANK_OUT_VIDEO
-        start, end, prev_end, i = None, None, 0, 0
+    def _trim_by_rank(ranks, bin_secs=1.0):
+        """ Clips of the ranks of the bins in secs """
+        timestamps = trim_by_rank(ranks, bin_secs)
+        if bin_secs == 1:
+            return timestamps
+        return np.round(np.multiply(timestamps, bin_secs), 3).tolist()
 
-        for i in range(len(ranks)):
-            if start is None and ranks[i] > _min_rank:
-                start = i
+    @staticmethod
+    def snap(points, shots, tolerance):
+        """
+        Moves each of the points onto the nearest shot cut, if the cut is within the tolerance
+
+        Parameters
+        ----------
+        points : list
+            times in secs
+        shots : list
+            sorted times of the shot cuts in secs
+        tolerance : float
+            max distance a point is moved
+
+        Returns
+        -------
+        list
+            snapped points, the points without a cut near them are kept as they are
+        """
+        if len(shots) == 0 or tolerance <= 0 or len(points) == 0:
+            return list(points)
+
+        shots, points = np.asarray(shots, dtype=np.float64), np.asarray(points, dtype=np.float64)
+
+        # nearest of the cuts before and after each point
+        right = np.clip(np.searchsorted(shots, points), 0, len(shots) - 1)
+        left = np.clip(right - 1, 0, len(shots) - 1)
+        nearest = np.where(np.abs(shots[left] - points) <= np.abs(shots[right] - points), shots[left], shots[right])
+
+        return np.where(np.abs(nearest - points) <= tolerance, nearest, points).tolist()
 
-            if start is not None and end is None and ranks[i] <= _min_rank:
-                end = i - 1
+    @staticmethod
+    def _snap_to_shots(timestamps, shots, tolerance):
+        """
+        Snaps the start and the end of each clip to the shot cuts near them, so the clips do
+        not start or end a few frames into another shot. The clips that meet or overlap
+        after snapping are joined, so fewer clips go to the merge. A clip shorter than the
+        tolerance can snap both of its edges to the same cut, it keeps its edges then
+        """
+        if len(timestamps) == 0:
+            return timestamps
 
-            if start is not None and end is not None:
-                timestamps.append([start, end])
-                start, end = None, None
+        snapped = np.reshape(Ranking.snap(np.ravel(timestamps), shots, tolerance), (-1, 2)).tolist()
+        joined = list()
 
-        if end is None and start is not None:
-            timestamps.append([start, i + 1])
+        for (start, end), clip in zip(snapped, timestamps):
+            if start >= end:
+                start, end = clip
+
+            if len(joined) > 0 and start <= joined[-1][1]:
+                joined[-1][1] = max(joined[-1][1], end)
+            else:
+                joined.append([start, end])
 
-        return timestamps
+        return joined
 
     @staticmethod
     def add(key, rank: list):
@@ -95,6 +295,26 @@ class Ranking:
         keys = [CACHE_RANK_MOTION, CACHE_RANK_BLUR, CACHE_RANK_TEXT, CACHE_RANK_AUDIO]
         return [Ranking._add_padding(Ranking.get(key) if Ranking.get(key) else list()) for key in keys]
 
+    @staticmethod
+    def unsettled_seconds():
+        """
+        Bins for which the text rank can still change the keep or drop decision of the
+        final cut. A bin is settled when the other ranks alone are more than the
+        `MIN_RANK_OUT_VIDEO` or when even the full `RANK_TEXT` can not take them over the
+        `MIN_RANK_OUT_VIDEO` less the `CLIP_HYSTERESIS`, the rank a clip goes on through.
+        Returns None when any of the other ranks is missing, so all the bins are detected.
+        """
+        keys = [CACHE_RANK_MOTION, CACHE_RANK_BLUR, CACHE_RANK_AUDIO]
+        ranks = [Ranking.get(key) for key in keys]
+
+        if not all(ranks):
+            return None
+
+        base = np.sum([Ranking._add_padding(list(rank)) for rank in ranks], axis=0)
+        _min_rank = Config.MIN_RANK_OUT_VIDEO
+
+        return ((base <= _min_rank) & (base + Config.RANK_TEXT > _min_rank - Config.CLIP_HYSTERESIS)).tolist()
+
     @staticmethod
     def get_timestamps():
         sum_ranks = [sum(rank_list) for rank_list in zip(* Ranking.ranks())]
@@ -102,7 +322,12 @@ class Ranking:
         if sum_ranks is None:
             raise RankingOfFeatureMissing
 
-        timestamps, final = Ranking._trim_by_rank(sum_ranks), list()
+        timestamps, final = Ranking._trim_by_rank(sum_ranks, Ranking.bin_secs()), list()
+
+        # clip boundaries on the shot cuts found by the visual
+        shots = Ranking.get(CACHE_SHOTS)
+        if shots:
+            timestamps = Ranking._snap_to_shots(timestamps, shots, Config.SHOT_SNAP_TOLERANCE)
 
         for clip in timestamps:
             if len(clip) % 2 == 0:
@@ -135,4 +360,5 @@ class Ranking:
         first = timestamps[0]
         start, end = first[0], first[1]
 
-        return randint(start, end)
+        # the clips snapped to the shots start and end at fractions of a sec
+        return randint(int(start), int(end))
@@ -0,0 +1,140 @@
+"""
+Re cut of an analysed video: the ranks and the timestamps are made again from the raw
+features saved by the analyzers (see `torpido.tools.features`) with the current config,
+without decoding and analysing the video again. Changing the thresholds, the ranks or the
+min rank of the output only needs a re cut.
+
+The features are measured before any threshold, except for the ones that change what is
+measured, `BLUR_MODE`, `TEXT_SKIP_FRAMES`, `ANALYSIS_ROI`, `FRAME_DEDUPE` and `RANK_BIN`
+need a new analysis. With `CASCADE` the samples the text detection skipped stay without text.
+
+Usage: python -m torpido.tools.recut
+"""
+
+import numpy as np
+
+from ..config.cache import Cache
+from ..config.config import Config
+from ..config.constants import (CACHE_FPS, CACHE_FRAME_COUNT, CACHE_RANK_BIN, CACHE_RANK_MOTION,
+                                CACHE_RANK_BLUR, CACHE_RANK_TEXT, CACHE_RANK_AUDIO, CACHE_SHOTS)
+from ..exceptions.custom import RankingOfFeatureMissing
+from ..tools.features import load_features
+from ..tools.logger import Log
+from ..tools.ranking import Ranking, RankAccumulator, ShotIndex
+
+
+def rank_bin(features):
+    """ Width of the rank bins the features were saved for, 1 sec for the features without it """
+    return float(features.get("rank_bin", 1.0))
+
+
+def _bin_means(ranks, fps, frame_count, bin_secs):
+    """ Mean rank of each complete bin of the per frame ranks """
+    accumulator = RankAccumulator(fps, frame_count, bin_secs=bin_secs)
+    accumulator.extend(ranks)
+    return accumulator.means()
+
+
+def _visual_ranks(visual):
+    """ Motion and blur ranks of each bin and the shot cuts, from the visual features """
+    fps, frame_count, bin_secs = float(visual["fps"]), float(visual["frame_count"]), rank_bin(visual)
+
+    # the threshold was calibrated for the blur mode, a new `BLUR_THRESHOLD` scales it
+    blur_threshold = float(visual["blur_threshold"]) * (Config.BLUR_THRESHOLD / float(visual["blur_base"]))
+
+    motion = np.where(visual["delta"] > Config.MOTION_THRESHOLD, Config.RANK_MOTION, 0)
+    blur = np.where(visual["variance"] < blur_threshold, Config.RANK_BLUR, 0)
+
+    shots = ShotIndex(fps, Config.SHOT_THRESHOLD)
+    shots.extend(visual["change"])
+
+    return (_bin_means(motion, fps, frame_count, bin_secs), _bin_means(blur, fps, frame_count, bin_secs),
+            shots.seconds())
+
+
+def _text_ranks(textual):
+    """ Text ranks of each bin, the rank of a sample is kept for all the frames skipped for it """
+    fps, frame_count = float(textual["fps"]), int(textual["frame_count"])
+    detected = textual["scores"] >= Config.TEXT_MIN_CONFIDENCE
+    ranks = np.repeat(np.where(detected, Config.RANK_TEXT, 0), int(textual["skip_frames"]))
+
+    if len(ranks) == 0:
+        return [0] * frame_count
+
+    # same as the textual, the frames past the last sample keep its rank
+    ranks = np.pad(ranks[:frame_count], (0, max(0, frame_count - len(ranks))), mode="edge")
+    return _bin_means(ranks, fps, frame_count, rank_bin(textual))
+
+
+def _audio_ranks(audio):
+    """ Audio ranks of each bin from the rms of the de noised signal """
+    return np.where(audio["rms"] > Config.SILENCE_THRESHOLD, Config.RANK_AUDIO, 0).tolist()
+
+
+def recut(directory=None):
+    """
+    Makes the ranks and the shot cuts again from the saved features with the current
+    config, and saves them in the rank cache in place of the ranks of the analysis
+
+    Parameters
+    ----------
+    directory : str, optional
+        features dir of the video, the features of the last analysed video by default
+
+    Returns
+    -------
+    list
+        start and end (secs) of each clip of the new cut
+
+    Raises
+    ------
+    RankingOfFeatureMissing
+        the visual features are not saved, the video is not analysed
+    """
+    visual = load_features("visual", directory)
+    textual, audio = load_features("textual", directory), load_features("audio", directory)
+    if visual is None:
+        raise RankingOfFeatureMissing
+
+    # the ranks are made for the bins of the analysis, the audio can not be binned again
+    if rank_bin(visual) != Config.RANK_BIN:
+        Log.w(f"Re cut on the rank bins of the analysis ({rank_bin(visual)} secs), not the RANK_BIN")
+
+    cache = Cache()
+    cache.write_data(CACHE_FPS, float(visual["fps"]))
+    cache.write_data(CACHE_FRAME_COUNT, float(visual["frame_count"]))
+    cache.write_data(CACHE_RANK_BIN, rank_bin(visual))
+
+    motion, blur, shots = _visual_ranks(visual)
+    Ranking.add(CACHE_RANK_MOTION, motion)
+    Ranking.add(CACHE_RANK_BLUR, blur)
+    Ranking.add(CACHE_SHOTS, shots)
+
+    # without the textual or the audio features their ranks of the analysis are kept
+    if textual is not None:
+        Ranking.add(CACHE_RANK_TEXT, _text_ranks(textual))
+    else:
+        Log.w("Textual features are missing, keeping the text ranks of the analysis")
+
+    if audio is not None:
+        Ranking.add(CACHE_RANK_AUDIO, _audio_ranks(audio))
+    else:
+        Log.w("Audio features are missing, keeping the audio ranks of the analysis")
+
+    return Ranking.get_timestamps()
+
+
+def main():
+    try:
+        timestamps = recut()
+    except RankingOfFeatureMissing:
+        Log.e(RankingOfFeatureMissing.cause)
+        return 1
+
+    for start, end in timestamps:
+        print(f"{start}\t{end}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
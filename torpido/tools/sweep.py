@@ -0,0 +1,214 @@
+"""
+Parameter sweep over the raw features saved by the analyzers (see `torpido.tools.features`).
+A grid of configs is evaluated in one vectorized pass: the per bin fractions of the frames
+over each threshold are computed once for all the thresholds of the grid, and the rank of
+every config and bin is a weighted sum of those fractions. For each config the
+duration of the output, the no of clips and the kept ratio of the video are reported.
+
+The clips are found by `rank_runs` same as `Ranking.get_timestamps`, without the snapping
+to the shot cuts (it only moves the clip boundaries within `SHOT_SNAP_TOLERANCE`).
+
+Usage: python -m torpido.tools.sweep MOTION_THRESHOLD=30,50,70 MIN_RANK_OUT_VIDEO=2,3,4
+"""
+
+import argparse
+from itertools import product
+
+import numpy as np
+
+from ..config.config import Config
+from ..exceptions.custom import RankingOfFeatureMissing
+from ..tools.features import load_features
+from ..tools.logger import Log
+from ..tools.ranking import RankAccumulator
+from ..tools.recut import rank_bin
+from ..util.timestamp import rank_runs
+
+# settings that can be swept, the ones missing in the grid keep the value of the config
+SWEEP_KEYS = ("MOTION_THRESHOLD", "BLUR_THRESHOLD", "TEXT_MIN_CONFIDENCE", "SILENCE_THRESHOLD",
+              "RANK_MOTION", "RANK_BLUR", "RANK_TEXT", "RANK_AUDIO", "MIN_RANK_OUT_VIDEO",
+              "CLIP_HYSTERESIS", "CLIP_MIN_GAP", "CLIP_MIN_LENGTH")
+
+
+def _frame_hits(values, thresholds, frames, above=True):
+    """
+    No of frames of each complete bin past each of the thresholds, and the no of frames
+    of each bin, the bins of `frames` frames are the same as of the `RankAccumulator`
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)[:, np.newaxis]
+    return _bin_hits((values > thresholds) if above else (values < thresholds), frames)
+
+
+def _bin_hits(hits, frames):
+    """ Sums the hits of the frames (the columns) over each complete bin of `frames` frames """
+    bins = np.floor(np.arange(hits.shape[1]) / frames + RankAccumulator._EPS).astype(np.int64)
+    complete = int(np.floor(hits.shape[1] / frames + RankAccumulator._EPS))
+    if complete == 0:
+        return np.zeros((len(hits), 0)), np.zeros(0)
+
+    # frames of the partial bin at the end are left out
+    starts = np.searchsorted(bins, np.arange(complete))
+    end = int(np.searchsorted(bins, complete))
+    return np.add.reduceat(hits[:, :end].astype(np.int64), starts, axis=1), np.diff(np.append(starts, end))
+
+
+def _text_hits(textual, confidences):
+    """ No of frames with text of each bin for each min confidence, and the frames of a bin """
+    frame_count, skip = int(textual["frame_count"]), int(textual["skip_frames"])
+    detected = textual["scores"] >= np.asarray(confidences, dtype=np.float64)[:, np.newaxis]
+
+    # the detection of a sample holds for all the frames skipped for it, within the video,
+    # and the frames past the last sample keep its detection same as the textual
+    hits = np.repeat(detected, skip, axis=1)[:, :frame_count]
+    if 0 < hits.shape[1] < frame_count:
+        hits = np.pad(hits, ((0, 0), (0, frame_count - hits.shape[1])), mode="edge")
+    return _bin_hits(hits, float(textual["fps"]) * rank_bin(textual))
+
+
+def _pad(ranks, bins):
+    """ Pads each row of the ranks with its mean to the length of the video, as `Ranking.ranks` """
+    if ranks.shape[1] >= bins:
+        return ranks[:, :bins]
+
+    means = ranks.mean(axis=1, keepdims=True) if ranks.shape[1] > 0 else np.zeros((len(ranks), 1))
+    return np.hstack((ranks, np.repeat(means, bins - ranks.shape[1], axis=1)))
+
+
+def _clips(ranks, columns, bin_secs):
+    """
+    Duration (in bins) and no of the clips of each row of the ranks. Same as the clips of
+    `trim_by_rank`, the clip of a run ends a bin before the run unless it runs till the
+    end of the video, the clips of 0 secs are dropped
+    """
+    rows, bins = ranks.shape
+    run_rows, starts, ends = rank_runs(ranks, columns["MIN_RANK_OUT_VIDEO"], columns["CLIP_HYSTERESIS"],
+                                       columns["CLIP_MIN_GAP"] / bin_secs, columns["CLIP_MIN_LENGTH"] / bin_secs)
+
+    durations = ends - starts - (ends != bins)
+    valid = durations > 0
+    return (np.bincount(run_rows, weights=np.where(valid, durations, 0), minlength=rows),
+            np.bincount(run_rows[valid], minlength=rows))
+
+
+def sweep(grid, directory=None):
+    """
+    Evaluates all the combinations of the values of the grid on the features of a video
+
+    Parameters
+    ----------
+    grid : dict
+        values of each setting to sweep, the keys are of the `SWEEP_KEYS`
+    directory : str, optional
+        features dir of the video, the features of the last analysed video by default
+
+    Returns
+    -------
+    list
+        dict of the settings and the "duration" (secs), "clips" and "kept" (ratio of the
+        video) of each config
+
+    Raises
+    ------
+    RankingOfFeatureMissing
+        the visual features are not saved, the video is not analysed
+    """
+    unknown = set(grid) - set(SWEEP_KEYS)
+    if unknown:
+        raise KeyError(f"Can not sweep {', '.join(sorted(unknown))}")
+
+    visual = load_features("visual", directory)
+    textual, audio = load_features("textual", directory), load_features("audio", directory)
+    if visual is None:
+        raise RankingOfFeatureMissing
+
+    keys = list(SWEEP_KEYS)
+    configs = list(product(*[list(grid.get(key, [getattr(Config, key)])) for key in keys]))
+    columns = {key: np.array([config[i] for config in configs], dtype=np.float64) for i, key in enumerate(keys)}
+
+    # the ranks are made for the rank bins of the analysis
+    bin_secs = rank_bin(visual)
+    frames = float(visual["fps"]) * bin_secs
+    bins = int(float(visual["frame_count"]) / frames + RankAccumulator._EPS)
+
+    # the threshold was calibrated for the blur mode, a new `BLUR_THRESHOLD` scales it
+    blur_threshold, blur_base = float(visual["blur_threshold"]), float(visual["blur_base"])
+
+    # rank of each config and bin, each feature adds rank * (frames past the threshold / frames)
+    total = np.zeros((len(configs), bins))
+    features = [
+        ("MOTION_THRESHOLD", "RANK_MOTION", lambda values: _frame_hits(visual["delta"], values, frames)),
+        ("BLUR_THRESHOLD", "RANK_BLUR",
+         lambda values: _frame_hits(visual["variance"], blur_threshold * (values / blur_base), frames, above=False)),
+        ("TEXT_MIN_CONFIDENCE", "RANK_TEXT", lambda values: _text_hits(textual, values) if textual else None),
+        ("SILENCE_THRESHOLD", "RANK_AUDIO",
+         lambda values: (audio["rms"] > values[:, np.newaxis], 1) if audio else None),
+    ]
+
+    for threshold, rank, hits_of in features:
+        # each of the thresholds is measured once, the configs index into them
+        unique, index = np.unique(columns[threshold], return_inverse=True)
+        hits = hits_of(unique)
+        if hits is None:
+            Log.w(f"Features for {rank} are missing, swept without it")
+            continue
+
+        hits, counts = hits
+        ranks = _pad((columns[rank][:, np.newaxis] * hits[index]) / np.maximum(counts, 1), bins)
+        total += ranks
+
+    durations, clips = _clips(total, columns, bin_secs)
+
+    results = list()
+    for i, config in enumerate(configs):
+        result = dict(zip(keys, config))
+        result.update(duration=round(float(durations[i]) * bin_secs, 3), clips=int(clips[i]),
+                      kept=float(durations[i] / bins) if bins > 0 else 0.0)
+        results.append(result)
+    return results
+
+
+def _parse_grid(settings):
+    """ KEY=v1,v2,.. arguments to the grid, the values are of the type of the config """
+    grid = dict()
+    for setting in settings:
+        key, _, values = setting.partition("=")
+        key = key.strip().upper()
+        if key not in SWEEP_KEYS:
+            raise KeyError(f"Can not sweep {key}")
+
+        kind = type(getattr(Config, key))
+        grid[key] = [kind(value) for value in values.split(",") if value.strip()]
+    return grid
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m torpido.tools.sweep",
+                                     description="Sweeps the config over the saved features of the videos")
+    parser.add_argument("grid", nargs="*", help="KEY=v1,v2,.. values of a setting, one of " + ", ".join(SWEEP_KEYS))
+    parser.add_argument("--features", nargs="*", default=[None], metavar="DIR",
+                        help="features dirs of the videos, the last analysed video by default")
+    args = parser.parse_args(args)
+
+    try:
+        grid = _parse_grid(args.grid)
+    except (KeyError, ValueError) as error:
+        parser.error(str(error))
+
+    swept = [key for key in SWEEP_KEYS if key in grid]
+    print("\t".join(["video"] + swept + ["duration", "clips", "kept"]))
+
+    for directory in args.features:
+        try:
+            results = sweep(grid, directory)
+        except RankingOfFeatureMissing:
+            Log.e(f"No features saved for {directory or 'the last video'}")
+            continue
+
+        for result in results:
+            print("\t".join([directory or "-"] + [str(result[key]) for key in swept] +
+                            [f"{result['duration']:g}", str(result["clips"]), f"{result['kept']:.3f}"]))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -11,6 +11,8 @@ using ffmpeg.
 """
 from random import randint
 
+import numpy as np
+
 from ..config.cache import Cache
 from ..config.config import Config
 from ..config.constants import (CACHE_RANK_MOTION, CACHE_RANK_TEXT,
@@ -75,40 +77,89 @@ def read_rankings():
             text, audio]
 
 
-def trim_by_rank(ranks):
+def rank_runs(ranks, threshold, hysteresis=0.0, min_gap=0, min_length=0):
+    """
+    Runs of the ranks above the threshold, found from the edges of the mask of the ranks
+    instead of a loop over them. A run starts at a rank above the threshold and goes on
+    till the rank falls to the threshold less the hysteresis, so a short dip does not
+    split a clip. The runs closer than the min gap are joined and the runs shorter than
+    the min length are dropped.
+
+    The ranks can be a 2d array, each row is the ranks of another config, and the settings
+    can be an array of a value for each row (see `torpido.tools.sweep`)
+
+    Parameters
+    ----------
+    ranks : iterable
+        ranks of the video, or the rows of the ranks
+    threshold : float, np.ndarray
+        min rank of a run, a rank must be above it
+    hysteresis : float, np.ndarray
+        fall of the rank below the threshold a run goes on through
+    min_gap : int, np.ndarray
+        runs with less ranks between them are joined
+    min_length : int, np.ndarray
+        runs of less ranks are dropped
+
+    Returns
+    -------
+    tuple
+        row, start and end (exclusive) of each run, sorted by the row and the start
+    """
+    ranks = np.atleast_2d(np.asarray(ranks, dtype=np.float64))
+    rows, length = ranks.shape
+    threshold, hysteresis, min_gap, min_length = (np.broadcast_to(np.asarray(setting, dtype=np.float64), (rows,))
+                                                  for setting in (threshold, hysteresis, min_gap, min_length))
+
+    # the runs of the ranks above the lower threshold, from the rising and the falling edges
+    above = ranks > (threshold - hysteresis)[:, np.newaxis]
+    edges = np.diff(np.pad(above.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+    run_rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+
+    # a run starts at its first rank above the threshold, the runs without one are dropped
+    if np.any(hysteresis > 0):
+        # flat positions of the ranks above the threshold, past the end of all the rows at last
+        peaks = np.append(np.flatnonzero(ranks > threshold[:, np.newaxis]), rows * length)
+        offsets = run_rows * length
+        first = peaks[np.searchsorted(peaks, offsets + starts)]
+        valid = first < offsets + ends
+        run_rows, starts, ends = run_rows[valid], (first - offsets)[valid], ends[valid]
+
+    # joining the runs of the same row with short gaps between them
+    if len(starts) > 1:
+        joined = (run_rows[1:] == run_rows[:-1]) & (starts[1:] - ends[:-1] < min_gap[run_rows[1:]])
+        run_rows, starts = run_rows[np.append(True, ~joined)], starts[np.append(True, ~joined)]
+        ends = ends[np.append(~joined, True)]
+
+    valid = ends - starts >= min_length[run_rows]
+    return run_rows[valid], starts[valid], ends[valid]
+
+
+def trim_by_rank(ranks, bin_secs=1.0):
     """
     Parse the ranks to generate timestamps. Ranks are per sec so the start rank will be start
-    timestamp for trimming
+    timestamp for trimming. The runs are found by `rank_runs` with the clip settings of the
+    config, a clip ends at the start of the last sec of its run, unless the run goes on till
+    the end of the video
 
     Parameters
     ----------
     ranks : iterable
         ranks of the video
+    bin_secs : float
+        width of the bin of each rank in secs, the clip settings of the config are in secs
 
     Returns
     --------
     timestamps : list-any
-        timestamps parsed from the ranks
+        timestamps parsed from the ranks, in bins
     """
-    timestamps = list()
-    start, end, prev_end, i = None, None, 0, 0
-    min_rank_out = Config.MIN_RANK_OUT_VIDEO
-
-    for i in range(len(ranks)):
-        if start is None and ranks[i] > min_rank_out:
-            start = i
-
-        if start is not None and end is None and ranks[i] <= min_rank_out:
-            end = i - 1
-
-        if start is not None and end is not None:
-            timestamps.append([start, end])
-            start, end = None, None
-
-    if end is None and start is not None:
-        timestamps.append([start, i + 1])
+    _, starts, ends = rank_runs(ranks, Config.MIN_RANK_OUT_VIDEO, Config.CLIP_HYSTERESIS,
+                                Config.CLIP_MIN_GAP / bin_secs, Config.CLIP_MIN_LENGTH / bin_secs)
 
-    return timestamps
+    ends = np.where(ends == len(ranks), ends, ends - 1)
+    return np.stack((starts, ends), axis=1).tolist()
 
 
 def get_timestamps(data):
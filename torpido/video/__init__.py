@@ -1 +1,8 @@
+from torpido.video.ffmpeg_reader import *
+from torpido.video.smart_queue import *
 from torpido.video.video_stream import *
+from torpido.video.frame_bus import *
+from torpido.video.frame_batch import *
+from torpido.video.frame_hash import *
+from torpido.video.roi import *
+from torpido.video.east import *
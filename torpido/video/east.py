@@ -0,0 +1,75 @@
+"""
+Decoding of the outputs of the EAST text detector. For an input of 320x320 the model
+gives 80x80 maps, a score map of the text and a geometry map of the distances to the
+edges of the box and its angle for each cell, the maps are decoded with array operations
+instead of the loops over the cells.
+"""
+
+import numpy as np
+
+
+def max_confidence(scores):
+    """
+    Max score of each image of the batch, an image contains text if any of its scores
+    satisfies the min confidence, so only the max is needed, no mask or list of scores
+
+    Parameters
+    ----------
+    scores : np.ndarray
+        score maps of the batch (images, 1, rows, cols)
+
+    Returns
+    -------
+    list
+        max confidence, one for each image
+    """
+    return np.amax(scores.reshape(len(scores), -1), axis=1).tolist()
+
+
+def decode_boxes(scores, geometry, min_confidence):
+    """
+    Boxes and the confidences of the cells of the first image with a score of at least
+    the min confidence, in the row major order of the cells
+
+    Parameters
+    ----------
+    scores : np.ndarray
+        score maps (images, 1, rows, cols)
+    geometry : np.ndarray
+        geometry maps (images, 5, rows, cols), the distances to the top, right, bottom
+        and left edges of the box and its angle
+    min_confidence : float
+        min score of a cell
+
+    Returns
+    -------
+    tuple
+        start x, start y, end x and end y of each box in the input image (boxes, 4) and
+        the confidence of each box
+    """
+    # cells that does not have sufficient probability are ignored
+    y, x = np.nonzero(scores[0, 0] >= min_confidence)
+    confidences = scores[0, 0, y, x]
+    xData0, xData1, xData2, xData3, anglesData = geometry[0, :, y, x].T
+
+    # compute the offset factor as our resulting feature maps will
+    # be 4x smaller than the input image
+    offsetX, offsetY = x * 4, y * 4
+
+    # extract the rotation angle for the prediction and then
+    # compute the sin and cosine
+    cos, sin = np.cos(anglesData), np.sin(anglesData)
+
+    # use the geometry volume to derive the width and height of
+    # the bounding box
+    h = xData0 + xData2
+    w = xData1 + xData3
+
+    # compute both the starting and ending (x, y)-coordinates for
+    # the text prediction bounding box
+    endX = (offsetX + (cos * xData1) + (sin * xData2)).astype(int)
+    endY = (offsetY - (sin * xData1) + (cos * xData2)).astype(int)
+    startX = (endX - w).astype(int)
+    startY = (endY - h).astype(int)
+
+    return np.stack((startX, startY, endX, endY), axis=1), confidences
@@ -0,0 +1,130 @@
+"""
+Video reader backed by an ffmpeg process. The frames are scaled and converted
+to the pixel format by ffmpeg itself and read from its std out as raw bytes,
+so they arrive already small and, for the gray format, single channel.
+"""
+
+import shutil
+import subprocess
+
+import cv2
+import numpy as np
+
+from torpido.config.constants import VIDEO_WIDTH, FFMPEG_READER_BUFFERS
+from torpido.tools.ffmpeg import _build_rawvideo_command
+
+
+def ffmpeg_available():
+    """ True if the ffmpeg binary is found on the path """
+    return shutil.which("ffmpeg") is not None
+
+
+class FFmpegReader:
+    """
+    Reads the fixed size raw frames from the ffmpeg pipe into a ring of preallocated
+    buffers. Has the same `read` and `release` as the `cv2.VideoCapture`, the frame
+    returned by `read` is a view on the buffer, that is valid until the ring wraps
+    around (`buffers` more reads).
+
+    Attributes
+    ----------
+    fps : float
+        input video fps
+    frame_count : float
+        number of frames in the input video
+    shape : tuple
+        shape of the frames, same dimensions as the `resize` util would create
+    __frame_size : int
+        no of bytes of a single frame on the pipe
+    __buffers : list
+        preallocated buffers the frames are read into
+    __next : int
+        index of the buffer for the next frame
+    __process : Popen
+        ffmpeg decoder process
+
+    Examples
+    --------
+    >>> reader = FFmpegReader("video.mp4", gray=True)
+    >>> grabbed, frame = reader.read()
+    >>> frame.shape
+    (281, 500)
+    """
+
+    def __init__(self, src, width=VIDEO_WIDTH, gray=False, buffers=FFMPEG_READER_BUFFERS):
+        self.__process = None
+
+        # meta data is read same as the open cv reader
+        capture = cv2.VideoCapture(src)
+        self.fps = capture.get(cv2.CAP_PROP_FPS)
+        self.frame_count = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+        original_w = capture.get(cv2.CAP_PROP_FRAME_WIDTH)
+        original_h = capture.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        capture.release()
+
+        height = int(original_h * (width / float(original_w)))
+        self.shape = (height, width) if gray else (height, width, 3)
+        self.__frame_size = int(np.prod(self.shape))
+        self.__buffers = [bytearray(self.__frame_size) for _ in range(max(1, buffers))]
+        self.__next = 0
+
+        command = _build_rawvideo_command(src, width, height, "gray" if gray else "bgr24")
+        self.__process = subprocess.Popen(args=command,
+                                          stdout=subprocess.PIPE,
+                                          stderr=subprocess.DEVNULL,
+                                          bufsize=0)
+
+    def read(self, out=None):
+        """
+        Reads the next frame from the pipe
+
+        Parameters
+        ----------
+        out : np.ndarray, optional
+            contiguous uint8 array of the frame shape to read the frame into,
+            else the next buffer of the ring is used
+
+        Returns
+        -------
+        tuple
+            grabbed and the frame, False and None when the video has ended
+        """
+        if self.__process is None:
+            return False, None
+
+        if out is None:
+            buffer = self.__buffers[self.__next]
+            self.__next = (self.__next + 1) % len(self.__buffers)
+        else:
+            buffer = out
+
+        view, filled = memoryview(buffer).cast('B'), 0
+
+        # a pipe read can return less than a frame
+        while filled < self.__frame_size:
+            read = self.__process.stdout.readinto(view[filled:])
+            if not read:
+                return False, None
+            filled += read
+
+        if out is None:
+            return True, np.frombuffer(buffer, dtype=np.uint8).reshape(self.shape)
+        return True, out
+
+    def grab(self):
+        """ Moves past the next frame, False when the video has ended """
+        return self.read()[0]
+
+    def release(self):
+        """ Stops the ffmpeg process """
+        if self.__process is None:
+            return
+
+        self.__process.stdout.close()
+        if self.__process.poll() is None:
+            self.__process.terminate()
+        self.__process.wait()
+        self.__process = None
+
+    def __del__(self):
+        self.release()
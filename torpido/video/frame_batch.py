@@ -0,0 +1,226 @@
+"""
+Batched motion and blur detection. The gray frames are stacked as the channels of
+a single image, so every OpenCV call works on the whole batch at once instead of
+being called from python for each frame.
+"""
+
+import cv2
+import numpy as np
+
+from torpido.config.constants import FRAME_BATCH_MAX
+
+# regions of the frames the blur is measured on
+BLUR_MODES = ("full", "pyramid", "crop")
+
+
+def _blur_region(stack, mode="full", crop=0.5):
+    """ Region of the frames the laplacian is run on, the next pyramid level or the centre crop """
+    if mode == "pyramid":
+        return cv2.pyrDown(stack)
+
+    if mode == "crop":
+        height, width = stack.shape[:2]
+        y, x = int(height * (1 - crop) / 2), int(width * (1 - crop) / 2)
+        return stack[y: height - y, x: width - x]
+
+    return stack
+
+
+def blur_variance(stack, mode="full", crop=0.5, dst=None):
+    """
+    Variance of the laplacian of each frame of the stack. The 3x3 laplacian of 8 bit
+    frames is at most 4 * 255, so the 16 bit laplacian holds it exactly
+
+    Parameters
+    ----------
+    stack : np.ndarray
+        gray frames as the channels (height, width, frames)
+    mode : str
+        one of the `BLUR_MODES`
+    crop : float
+        fraction of the width and the height kept by the centre crop
+    dst : np.ndarray, optional
+        reusable 16 bit buffer of the laplacian, same shape as the region
+
+    Returns
+    -------
+    np.ndarray
+        variance of each frame
+    """
+    laplacian = cv2.Laplacian(_blur_region(stack, mode, crop), cv2.CV_16S, dst=dst)
+    return cv2.meanStdDev(laplacian)[1].ravel() ** 2
+
+
+def calibrate_blur_threshold(frames, threshold, mode="full", crop=0.5):
+    """
+    Maps the threshold of the full frame laplacian (`BLUR_THRESHOLD`) to the blur mode.
+    The pyramid level and the crop change the variance of the frames, the threshold is
+    scaled by the median ratio of the variance of the mode to the full frame variance
+
+    Parameters
+    ----------
+    frames : list
+        gray frames of the video
+    threshold : float
+        threshold for the full frames
+    mode : str
+        one of the `BLUR_MODES`
+    crop : float
+        fraction of the width and the height kept by the centre crop
+
+    Returns
+    -------
+    float
+        threshold for the mode
+    """
+    if mode == "full" or len(frames) == 0:
+        return threshold
+
+    stack = np.dstack(frames)
+    full, region = blur_variance(stack), blur_variance(stack, mode, crop)
+
+    # flat frames have no edges to compare
+    valid = full > 0
+    if not np.any(valid):
+        return threshold
+
+    return float(threshold * np.median(region[valid] / full[valid]))
+
+
+class FrameBatch:
+    """
+    Stack of gray frames in the channel stacked layout (height, width, frames). The
+    channel 0 holds the last frame of the previous batch, so the motion of the first
+    frame of a batch is measured same as the others. OpenCV filters the channels
+    independently, so the blur and the motion of each frame are the same as running
+    the filters on the single frames.
+
+    Attributes
+    ----------
+    size : int
+        max no of frames in the batch, limited by the max channels of OpenCV
+    __blur_threshold : float
+        variance of the laplacian below which a frame is blurred
+    __motion_threshold : float
+        change of a pixel above which a frame has motion
+    __blur_mode : str
+        region the blur is measured on, one of the `BLUR_MODES`
+    __crop : float
+        fraction of the width and the height kept by the centre crop
+    __laplacian : np.ndarray
+        reusable laplacian buffer of the full batches
+    __stack : np.ndarray
+        preallocated stack, the previous frame and the frames of the batch
+    __count : int
+        no of frames added to the batch
+    __duplicates : list
+        True for the frames that are duplicates of the frame measured before, their blur
+        is not measured again
+    __has_previous : bool
+        the baseline frame is set
+
+    Examples
+    --------
+    >>> batch = FrameBatch((281, 500), size=32, blur_threshold=500, motion_threshold=50)
+    >>> batch.set_previous(first_frame)
+    >>> if batch.add(frame):
+    ...     motion, blur, change = batch.detect()
+    """
+
+    def __init__(self, shape, size, blur_threshold, motion_threshold, blur_mode="full", crop=0.5):
+        self.size = int(min(max(1, size), FRAME_BATCH_MAX - 1))
+        self.__blur_threshold, self.__motion_threshold = blur_threshold, motion_threshold
+        self.__blur_mode, self.__crop = blur_mode, crop
+        self.__stack = np.empty(tuple(shape[:2]) + (self.size + 1,), dtype=np.uint8)
+        self.__count, self.__has_previous, self.__duplicates = 0, False, list()
+
+        region = _blur_region(self.__stack, blur_mode, crop)
+        self.__laplacian = np.empty(region.shape, dtype=np.int16)
+
+    def __len__(self):
+        return self.__count
+
+    def set_previous(self, frame):
+        """ Sets the gray frame the motion of the next frame is measured from """
+        self.__stack[:, :, 0] = frame
+        self.__has_previous = True
+
+    def add(self, frame, duplicate=False):
+        """
+        Adds the gray frame to the batch, True when the batch is full. A duplicate of the
+        frame measured before is stacked too, so its motion is measured from its own pixels,
+        only the laplacian is not run again, it gets the blur of that frame
+        """
+        self.__count += 1
+        self.__stack[:, :, self.__count] = frame
+        self.__duplicates.append(duplicate)
+        return self.__count == self.size
+
+    def __variance(self, stack, count):
+        """ Laplacian variance of each frame of the batch, the duplicates take it from the frame they repeat """
+        if not any(self.__duplicates):
+            dst = self.__laplacian if count == self.size else None
+            return blur_variance(stack, self.__blur_mode, self.__crop, dst)[1:]
+
+        # channel of the last frame measured at or before each channel, channel 0 is the previous frame
+        sources = np.arange(count + 1)
+        sources[1:][np.asarray(self.__duplicates)] = 0
+        sources = np.maximum.accumulate(sources)[1:]
+
+        measured = np.unique(sources)
+        variance = blur_variance(np.ascontiguousarray(stack[:, :, measured]), self.__blur_mode, self.__crop)
+        return variance[np.searchsorted(measured, sources)]
+
+    def measure(self):
+        """
+        Measures the blur and the motion of all the frames of the batch and empties it, the
+        last frame is kept as the previous frame of the next batch. The raw measurements
+        are kept by the visual, so the ranks can be made again with other thresholds
+
+        Returns
+        -------
+        tuple
+            laplacian variance, max change of a pixel and mean change of the pixels of each
+            frame of the batch from the frame before
+        """
+        count = self.__count
+        if count == 0:
+            return np.zeros(0), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+
+        # channel slices of a partial batch are not contiguous
+        stack = self.__stack if count == self.size else np.ascontiguousarray(self.__stack[:, :, :count + 1])
+
+        # laplacian variance of each frame, channel 0 is the previous frame
+        variance = self.__variance(stack, count)
+
+        # frames as the columns, so the neighbour frames are column slices of a 2d image
+        blurred = cv2.GaussianBlur(stack, (21, 21), 0).reshape(-1, count + 1)
+        if not self.__has_previous:
+            blurred[:, 0] = blurred[:, 1 if count > 0 else 0]
+
+        # a frame has motion if any pixel changes more than the threshold, so only the max
+        # change of each frame is needed, no thresholded image. The mean change of the same
+        # difference is high only when the whole frame changes, a cut to a new shot
+        delta, change = np.zeros(count + 1, dtype=np.float32), np.zeros(count + 1, dtype=np.float32)
+        if count > 0:
+            frame_delta = cv2.absdiff(blurred[:, 1:], blurred[:, :-1])
+            delta[1:] = cv2.reduce(frame_delta, 0, cv2.REDUCE_MAX).ravel()
+            change[1:] = cv2.reduce(frame_delta, 0, cv2.REDUCE_AVG, dtype=cv2.CV_32F).ravel()
+
+        self.__stack[:, :, 0] = self.__stack[:, :, count]
+        self.__count, self.__has_previous, self.__duplicates = 0, True, list()
+        return variance, delta[1:], change[1:]
+
+    def detect(self):
+        """
+        Runs the blur and motion detection on all the frames of the batch and empties it,
+        the last frame is kept as the previous frame of the next batch
+
+        Returns
+        -------
+        tuple
+            motion and blur, boolean array of the frames of the batch each, and the mean
+            change of the pixels of each frame from the frame before (for the shot cuts)
+        """
+        variance, delta, change = self.measure()
+        return delta > self.__motion_threshold, variance < self.__blur_threshold, change
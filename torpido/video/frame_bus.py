@@ -0,0 +1,303 @@
+"""
+Single decoder stage for the video analyzers. The input video is decoded
+once in a dedicated process and every frame is published into a ring of
+shared memory slots, from where any number of analyzer processes read it.
+"""
+
+from multiprocessing import Condition, Process, RawArray, RawValue
+from multiprocessing.shared_memory import SharedMemory
+from threading import Event, Thread
+
+import cv2
+import numpy as np
+
+from torpido.config.config import Config
+from torpido.config.constants import VIDEO_WIDTH, FRAME_BUS_SLOTS, FRAME_BUS_WATCH_DELAY
+from torpido.tools.logger import Log
+from torpido.util import resize
+from torpido.video.ffmpeg_reader import FFmpegReader, ffmpeg_available
+from torpido.video.frame_hash import frame_key
+
+
+class FrameBus:
+    """
+    Decodes the video once and fans out the frames to the consumers. The frames are
+    stored in a fixed number of shared memory slots, the decoder waits for the slowest
+    consumer before a slot is reused, so no frame is skipped by any of the consumers.
+
+    Attributes
+    ----------
+    fps : float
+        input video fps
+    frame_count : float
+        number of frames in the input video
+    shape : tuple
+        shape of the frames published on the bus (resized to `VIDEO_WIDTH`)
+    __src : str
+        input video file
+    __slots : int
+        number of frames the bus can hold at a time
+    __shm : SharedMemory
+        shared memory block holding all the slots
+    __cond : Condition
+        wakes up the decoder and the consumers on every change of the counters
+    __written : RawValue
+        number of frames published by the decoder
+    __read : RawArray
+        number of frames read by each of the consumers
+    __ended : RawValue
+        set when the decoder has no more frames
+    __hashes : RawArray, None
+        perceptual hash of the frame in each slot, only with `FRAME_DEDUPE`
+    __means : RawArray, None
+        mean intensity of the frame in each slot, only with `FRAME_DEDUPE`
+    __process : Process
+        decoder process
+    __consumers : dict
+        process of each watched consumer, by the index of its reader
+    __watcher : Thread
+        detaches the readers of the consumers that have died, so the decoder does not wait
+        for them
+    __stopped : Event
+        stops the watcher
+
+    Examples
+    --------
+    >>> bus = FrameBus("video.mp4", consumers=2).start()
+    >>> Process(target=visual.start_processing, args=(None, "video.mp4", False, bus.reader(0))).start()
+    >>> Process(target=textual.start_processing, args=("video.mp4", False, bus.reader(1))).start()
+    >>> bus.watch(0, visual_process)
+    """
+
+    def __init__(self, src, consumers=2, slots=FRAME_BUS_SLOTS, width=VIDEO_WIDTH):
+        capture = cv2.VideoCapture(src)
+        self.fps = capture.get(cv2.CAP_PROP_FPS)
+        self.frame_count = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+        original_w = capture.get(cv2.CAP_PROP_FRAME_WIDTH)
+        original_h = capture.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        capture.release()
+
+        # same dimensions as the `resize` util would create
+        self.shape = (int(original_h * (width / float(original_w))), width, 3)
+        self.__src, self.__slots, self.__width = src, slots, width
+
+        self.__shm = SharedMemory(create=True, size=int(np.prod(self.shape)) * slots)
+        self.__cond = Condition()
+        self.__written, self.__ended = RawValue('q', 0), RawValue('b', 0)
+        self.__read = RawArray('q', consumers)
+        self.__hashes = RawArray('Q', slots) if Config.FRAME_DEDUPE else None
+        self.__means = RawArray('B', slots) if Config.FRAME_DEDUPE else None
+        self.__process = self.__watcher = None
+        self.__consumers, self.__stopped = dict(), Event()
+
+    @property
+    def pid(self):
+        """ Process id of the decoder """
+        return self.__process.pid if self.__process is not None else None
+
+    def start(self):
+        """ Starts the decoder process """
+        self.__process = Process(target=self.__decode, name="torpido.video.FrameBus", args=())
+        self.__process.daemon = True
+        self.__process.start()
+        return self
+
+    def reader(self, index):
+        """
+        Returns the reader for the consumer, every consumer should use its own index
+
+        Parameters
+        ----------
+        index : int
+            index of the consumer, 0 to consumers - 1
+        """
+        return FrameReader(self, index)
+
+    def watch(self, index, process):
+        """
+        Detaches the reader of the consumer once its process has ended. A consumer that
+        crashed or returned without stopping its reader would block the decoder, and the
+        other consumers with it
+
+        Parameters
+        ----------
+        index : int
+            index of the reader of the consumer
+        process : Process
+            process of the consumer, started
+        """
+        self.__consumers[index] = process
+        if self.__watcher is None:
+            self.__watcher = Thread(target=self.__watch, name="torpido.video.FrameBus.watcher", daemon=True)
+            self.__watcher.start()
+
+    def __watch(self):
+        """ Watcher loop, runs in a thread of the process that started the consumers """
+        while not self.__stopped.wait(FRAME_BUS_WATCH_DELAY):
+            for index, process in list(self.__consumers.items()):
+                if not process.is_alive():
+                    self._detach(index)
+                    del self.__consumers[index]
+
+    def _slot(self, seq):
+        """ Returns the frame view for the sequence number """
+        frames = np.ndarray((self.__slots,) + self.shape, dtype=np.uint8, buffer=self.__shm.buf)
+        return frames[seq % self.__slots]
+
+    def _hash(self, seq):
+        """ Returns the dedupe key of the frame for the sequence number, None if not hashed """
+        if self.__hashes is None:
+            return None
+        return self.__hashes[seq % self.__slots], self.__means[seq % self.__slots]
+
+    def _wait(self, index):
+        """ Waits for the frame for the consumer, returns the sequence number or None if ended """
+        with self.__cond:
+            self.__cond.wait_for(lambda: self.__written.value > self.__read[index] or self.__ended.value)
+            if self.__read[index] >= self.__written.value:
+                return None
+            return self.__read[index]
+
+    def _advance(self, index):
+        """ Marks the current frame as read by the consumer """
+        with self.__cond:
+            self.__read[index] += 1
+            self.__cond.notify_all()
+
+    def _detach(self, index):
+        """ The consumer will not read any more, so the decoder must not wait for it """
+        with self.__cond:
+            self.__read[index] = np.iinfo(np.int64).max
+            self.__cond.notify_all()
+
+    def _more(self, index):
+        """ False when all the published frames are read and the decoder has ended """
+        return not (self.__ended.value and self.__read[index] >= self.__written.value)
+
+    def __decode(self):
+        """
+        Decoder loop, runs in its own process. With the ffmpeg `VIDEO_BACKEND` the
+        frames are scaled by ffmpeg and read from the pipe directly into the slots.
+        """
+        ffmpeg = Config.VIDEO_BACKEND == "ffmpeg"
+        if ffmpeg and not ffmpeg_available():
+            Log.w("FFmpeg not found, reading the video with opencv")
+            ffmpeg = False
+
+        # the consumers are always told the decoder has ended, even when it fails, so
+        # they read the frames published so far and exit instead of waiting forever
+        capture = frames = None
+        try:
+            if ffmpeg:
+                capture = FFmpegReader(self.__src, width=self.__width, buffers=1)
+            else:
+                capture = cv2.VideoCapture(self.__src)
+            frames = np.ndarray((self.__slots,) + self.shape, dtype=np.uint8, buffer=self.__shm.buf)
+
+            while True:
+                # waiting for the slowest consumer to free the slot
+                with self.__cond:
+                    self.__cond.wait_for(lambda: min(self.__read) > self.__written.value - self.__slots)
+
+                slot = frames[self.__written.value % self.__slots]
+
+                if ffmpeg:
+                    grabbed, _ = capture.read(out=slot)
+                else:
+                    grabbed, frame = capture.read()
+                    if grabbed:
+                        slot[:] = resize(frame, width=self.__width)
+
+                if not grabbed:
+                    break
+
+                # hashed once here for all the consumers
+                if self.__hashes is not None:
+                    index = self.__written.value % self.__slots
+                    self.__hashes[index], self.__means[index] = frame_key(slot)
+
+                with self.__cond:
+                    self.__written.value += 1
+                    self.__cond.notify_all()
+
+        except Exception as error:
+            Log.e(f"Frame bus decoder stopped :: {error}")
+
+        finally:
+            if capture is not None:
+                capture.release()
+
+            # views of the shared memory must be gone before it is closed
+            slot = frames = None
+            with self.__cond:
+                self.__ended.value = 1
+                self.__cond.notify_all()
+
+    def join(self):
+        """ Waits for the decoder to finish """
+        if self.__process is not None:
+            self.__process.join()
+
+    def close(self):
+        """ Stops the decoder and the watcher and releases the shared memory """
+        self.__stopped.set()
+        if self.__watcher is not None:
+            self.__watcher.join()
+            self.__watcher = None
+
+        if self.__process is not None:
+            self.__process.terminate()
+            self.__process.join()
+            self.__process = None
+
+        self.__shm.close()
+        self.__shm.unlink()
+
+
+class FrameReader:
+    """
+    Consumer side of the `FrameBus`, it has the same reading functions as the
+    `Stream` so the analyzers can use any of them.
+
+    Attributes
+    ----------
+    fps : float
+        input video fps
+    frame_count : float
+        number of frames in the input video
+    hash : tuple, None
+        hash and mean intensity of the last read frame, None without `FRAME_DEDUPE`
+    __bus : FrameBus
+        bus to read the frames from
+    __index : int
+        index of the consumer on the bus
+    """
+
+    def __init__(self, bus, index):
+        self.__bus, self.__index = bus, index
+        self.fps, self.frame_count = bus.fps, bus.frame_count
+        self.hash = None
+
+    def read(self):
+        """ Returns a copy of the next frame, None when the video has ended """
+        seq = self.__bus._wait(self.__index)
+        if seq is None:
+            return None
+
+        frame, self.hash = self.__bus._slot(seq).copy(), self.__bus._hash(seq)
+        self.__bus._advance(self.__index)
+        return frame
+
+    def skip(self):
+        """ Moves past the next frame without copying it, False when the video has ended """
+        if self.__bus._wait(self.__index) is None:
+            return False
+
+        self.__bus._advance(self.__index)
+        return True
+
+    def more(self):
+        return self.__bus._more(self.__index)
+
+    def stop(self):
+        self.__bus._detach(self.__index)
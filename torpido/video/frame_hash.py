@@ -0,0 +1,132 @@
+"""
+Perceptual hash of the frames and a cache of the analysis result of the last analysed
+frame. The hash is a 64 bit difference hash (dHash) of the gray frame, near identical
+frames of static stretches (slides, titles, paused screens) have the same or a close
+hash, so the result of the frame analysed before can be reused instead of analysing
+again. The dHash only compares the neighbouring pixels, a flat frame hashes to 0 at any
+brightness, so the key of a frame also has its coarse mean intensity and a fade or a
+change of the brightness is not taken as a duplicate.
+"""
+
+import cv2
+import numpy as np
+
+from torpido.config.constants import HASH_MEAN_DELTA
+from torpido.tools.logger import Log
+
+
+def _shrink(frame):
+    """ Gray frame shrunk to 9x8 """
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+
+
+def _bits(small):
+    """ Each bit tells if a pixel of the shrunk frame is brighter than its left neighbour """
+    return int.from_bytes(np.packbits(small[:, 1:] > small[:, :-1]).tobytes(), "big")
+
+
+def dhash(frame):
+    """
+    Difference hash of the frame, the frame is shrunk to 9x8 and each bit tells if a
+    pixel is brighter than its left neighbour
+
+    Parameters
+    ----------
+    frame : np.ndarray
+        gray or BGR frame
+
+    Returns
+    -------
+    int
+        64 bit hash of the frame
+    """
+    return _bits(_shrink(frame))
+
+
+def frame_key(frame):
+    """
+    Dedupe key of the frame, the dHash and the mean intensity of the shrunk frame. Cheap
+    enough to be computed in the decoder
+
+    Parameters
+    ----------
+    frame : np.ndarray
+        gray or BGR frame
+
+    Returns
+    -------
+    tuple
+        64 bit hash and the mean intensity (0 - 255) of the frame
+    """
+    small = _shrink(frame)
+    return _bits(small), int(round(small.mean()))
+
+
+def hamming(first, second):
+    """ No of bits the two hashes differ in """
+    return bin(first ^ second).count("1")
+
+
+class HashCache:
+    """
+    Result of the last analysed frame keyed by the hash and the mean intensity of the
+    frame. A frame hits the cache if its hash is within `distance` bits of the last
+    analysed frame and its mean intensity within `HASH_MEAN_DELTA` of it. Only the last
+    frame is matched, a frame with the same hash later in the video is analysed again.
+    Used by the visual and the textual analysis alike, each process holds its own cache.
+
+    Attributes
+    ----------
+    name : str
+        name of the analysis, used in the logs
+    distance : int
+        max no of bits a hash can differ from the last hash to reuse its result
+    hits : int
+        no of the frames that reused a result
+    misses : int
+        no of the frames that were analysed
+    __last : tuple, None
+        key of the last analysed frame
+    __result : object
+        result of the last analysed frame
+
+    Examples
+    --------
+    >>> cache = HashCache("Textual", distance=0)
+    >>> result = cache.previous(frame_key(frame))
+    >>> if result is None:
+    ...     cache.put(frame_key(frame), detect(frame))
+    """
+
+    def __init__(self, name, distance=0):
+        self.name, self.distance = name, distance
+        self.hits = self.misses = 0
+        self.__last, self.__result = None, None
+
+    def previous(self, key):
+        """ Result of the last analysed frame if the frame is near identical to it, else None """
+        if self.__last is not None and hamming(key[0], self.__last[0]) <= self.distance \
+                and abs(key[1] - self.__last[1]) <= HASH_MEAN_DELTA:
+            self.hits += 1
+            return self.__result
+
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+        """ Saves the result of the analysed frame, it becomes the last frame """
+        self.__last, self.__result = key, result
+
+    def merge(self, other):
+        """ Adds the hits and the misses of the cache of another process """
+        self.hits, self.misses = self.hits + other.hits, self.misses + other.misses
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def log(self):
+        """ Reports the hit rate of the cache """
+        Log.i(f"{self.name} frame cache hit rate :: {self.hit_rate():.1%} "
+              f"({self.hits} of {self.hits + self.misses} frames)")
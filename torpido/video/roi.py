@@ -0,0 +1,166 @@
+"""
+Region of interest of the video, found by a pre pass over frames spread across the whole
+video. Black borders (letterbox and pillarbox bars) are cropped away and the static
+overlays (watermarks, channel logos) are found, so the analyzers process fewer pixels
+and the text detection is not triggered by the same logo over and over.
+"""
+
+import cv2
+import numpy as np
+
+from torpido.config.constants import (VIDEO_WIDTH, ROI_SAMPLE_FRAMES, ROI_BLACK_LEVEL, ROI_STATIC_STD,
+                                      ROI_OVERLAY_MAX_AREA)
+from torpido.util import resize
+
+
+def sample_frames(src, count=ROI_SAMPLE_FRAMES, width=VIDEO_WIDTH):
+    """
+    Frames spread evenly over the whole video, resized to the width
+
+    Parameters
+    ----------
+    src : str
+        input video file
+    count : int
+        no of frames to read, `ROI_SAMPLE_FRAMES` for the pre pass by default
+    width : int
+        width of the frames
+
+    Returns
+    -------
+    list
+        BGR frames, less than count if some of the frames could not be read
+    """
+    capture, frames = cv2.VideoCapture(str(src)), list()
+    total_frames = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+
+    for i in range(count):
+        capture.set(cv2.CAP_PROP_POS_FRAMES, int(total_frames * i / count))
+        grabbed, frame = capture.read()
+        if grabbed:
+            frames.append(resize(frame, width=width))
+
+    capture.release()
+    return frames
+
+
+class RegionOfInterest:
+    """
+    Crop rectangle and static overlays of the video. All the coordinates are fractions of
+    the width and the height of the frame, so the same region is used for the frames of
+    any size (the resized visual frames and the original textual frames).
+
+    Attributes
+    ----------
+    box : tuple
+        left, top, right and bottom of the crop rectangle
+    overlays : list
+        left, top, right and bottom of each static overlay, relative to the full frame
+
+    Examples
+    --------
+    >>> roi = RegionOfInterest.detect(sample_frames("video.mp4"))
+    >>> gray = roi.crop(gray)
+    >>> frame = roi.apply(frame)  # overlays masked, then cropped
+    """
+
+    def __init__(self, box=(0.0, 0.0, 1.0, 1.0), overlays=None):
+        self.box, self.overlays = tuple(box), list(overlays or [])
+
+    def __repr__(self):
+        return f"RegionOfInterest(box={self.box}, overlays={self.overlays})"
+
+    @staticmethod
+    def __pixels(box, height, width):
+        """ Fraction box to the pixel slices of a frame """
+        left, top, right, bottom = box
+        return (slice(int(round(top * height)), int(round(bottom * height))),
+                slice(int(round(left * width)), int(round(right * width))))
+
+    def is_full(self):
+        """ True if nothing is cropped or masked """
+        return self.box == (0.0, 0.0, 1.0, 1.0) and len(self.overlays) == 0
+
+    def crop(self, frame):
+        """ View of the frame inside the crop rectangle """
+        return frame[self.__pixels(self.box, *frame.shape[:2])]
+
+    def mask(self, frame):
+        """ Flattens each of the overlays of the frame to its mean colour, in place """
+        for overlay in self.overlays:
+            region = frame[self.__pixels(overlay, *frame.shape[:2])]
+            if region.size > 0:
+                region[...] = region.mean(axis=(0, 1))
+        return frame
+
+    def apply(self, frame):
+        """ Masks the overlays and crops the frame """
+        return self.crop(self.mask(frame))
+
+    @classmethod
+    def detect(cls, frames, black_level=ROI_BLACK_LEVEL, static_std=ROI_STATIC_STD,
+               overlay_max_area=ROI_OVERLAY_MAX_AREA):
+        """
+        Finds the region of interest from the frames sampled over the whole video.
+
+        Bars: the rows and the columns at the borders that are darker than the black level
+        in every frame are cropped.
+
+        Overlays: the pixels that do not change across the frames belong to something drawn
+        on top of the video. If the static pixels cover more than `overlay_max_area` of the
+        frame the video itself is static (slides, screen recordings), no overlay is masked.
+
+        Parameters
+        ----------
+        frames : list
+            BGR or gray frames spread over the video
+        black_level : int
+            max gray value of the bars
+        static_std : float
+            max standard deviation of a static pixel across the frames
+        overlay_max_area : float
+            max fraction of the frame covered by the static pixels
+
+        Returns
+        -------
+        RegionOfInterest
+            region of the video, the full frame if nothing is found
+        """
+        if len(frames) == 0:
+            return cls()
+
+        stack = np.dstack([frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                           for frame in frames])
+        height, width = stack.shape[:2]
+
+        # brightest value of each pixel over the video, the bars stay dark in all the frames
+        peak = stack.max(axis=2)
+        rows = np.flatnonzero(peak.max(axis=1) > black_level)
+        columns = np.flatnonzero(peak.max(axis=0) > black_level)
+        if len(rows) == 0 or len(columns) == 0:
+            return cls()
+
+        top, bottom, left, right = rows[0], rows[-1] + 1, columns[0], columns[-1] + 1
+        box = (left / width, top / height, right / width, bottom / height)
+
+        if len(frames) < 2:
+            return cls(box)
+
+        # pixels that do not change in any of the frames
+        static = (stack[top:bottom, left:right].std(axis=2) < static_std).astype(np.uint8)
+
+        if np.count_nonzero(static) > overlay_max_area * static.size:
+            return cls(box)
+
+        # removing the single pixels that happen to stay the same, and joining the strokes
+        # of the same logo into one overlay
+        static = cv2.morphologyEx(static, cv2.MORPH_OPEN, np.ones((5, 5), dtype=np.uint8))
+        static = cv2.dilate(static, np.ones((9, 9), dtype=np.uint8))
+        count, _, stats, _ = cv2.connectedComponentsWithStats(static)
+
+        overlays = list()
+        for x, y, w, h, _ in stats[1:count]:
+            overlays.append(((left + x) / width, (top + y) / height,
+                             (left + x + w) / width, (top + y + h) / height))
+
+        return cls(box, overlays)
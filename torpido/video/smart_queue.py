@@ -1,18 +1,144 @@
+"""
+Fixed capacity queue of frames for a single producer and a single consumer thread.
+The frames live in one preallocated array used as a ring, so no memory is allocated
+per frame and the waiting is done on a condition instead of polling.
+"""
+
+from threading import Condition
+
+import numpy as np
+
+
 class SmartQueue:
-    def __init__(self, maxSize=1024):
-        self.maxSize, self.Q = maxSize, list()
+    """
+    Ring buffer of preallocated frames. The ring is allocated on the first `put` (or
+    on creation if the shape is known) and its capacity is the number of frames that
+    fit in the memory budget, limited by `maxSize`.
+
+    The frame returned by `get` is a view on the ring, it stays valid until the next
+    `get`, so the consumer must copy or convert a frame it wants to keep for longer.
+
+    Attributes
+    ----------
+    maxSize : int
+        max no of frames in the ring
+    budget : int, None
+        max no of bytes of the ring, None only uses the `maxSize`
+    capacity : int
+        no of frames in the ring, 0 till the ring is allocated
+    __ring : np.ndarray
+        preallocated frames
+    __tags : list
+        value given with each frame of the ring, like the hash of the frame
+    __head : int
+        sequence number of the oldest frame not yet released by the consumer
+    __tail : int
+        sequence number of the next frame written by the producer
+    __held : bool
+        the consumer holds the frame at the head (returned by the last `get`)
+    __closed : bool
+        no more frames will be added
+    __cond : Condition
+        wakes up the producer and the consumer on every change
+
+    Examples
+    --------
+    >>> queue = SmartQueue(budget=64 * 2 ** 20)
+    >>> queue.put(frame)
+    >>> queue.close()
+    >>> queue.get()  # the frame, then None once the queue is closed and empty
+    """
+
+    def __init__(self, maxSize=1024, budget=None, shape=None, dtype=np.uint8):
+        self.maxSize, self.budget, self.capacity = maxSize, budget, 0
+        self.__ring, self.__tags = None, None
+        self.__head = self.__tail = 0
+        self.__held = self.__closed = False
+        self.__cond = Condition()
+
+        if shape is not None:
+            self.__allocate(shape, dtype)
+
+    def __allocate(self, shape, dtype):
+        """ Creates the ring, as many frames as fit in the budget """
+        frame_size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        self.capacity = self.maxSize
+
+        if self.budget is not None:
+            self.capacity = max(2, min(self.maxSize, int(self.budget // max(1, frame_size))))
+
+        self.__ring = np.empty((self.capacity,) + tuple(shape), dtype=dtype)
+        self.__tags = [None] * self.capacity
+
+    def __unread(self):
+        return self.__tail - self.__head - int(self.__held)
+
+    def slot(self):
+        """
+        Waits for a free frame in the ring and returns it to be written in place, the
+        frame is added to the queue by `commit`. Returns None if the queue is closed
+        """
+        with self.__cond:
+            self.__cond.wait_for(lambda: self.__closed or self.__tail - self.__head < self.capacity)
+            if self.__closed:
+                return None
+            return self.__ring[self.__tail % self.capacity]
+
+    def commit(self, tag=None):
+        """ Adds the frame written in the `slot` to the queue, with an optional tag """
+        with self.__cond:
+            self.__tags[self.__tail % self.capacity] = tag
+            self.__tail += 1
+            self.__cond.notify_all()
+
+    def put(self, data, tag=None):
+        """ Copies the frame into the ring with an optional tag, False if the queue is closed """
+        if self.__ring is None:
+            self.__allocate(data.shape, data.dtype)
+
+        frame = self.slot()
+        if frame is None:
+            return False
+
+        frame[...] = data
+        self.commit(tag)
+        return True
+
+    def get(self):
+        """
+        Releases the frame of the last `get` and waits for the next one, returns None
+        once the queue is closed and all the frames are read
+        """
+        with self.__cond:
+            if self.__held:
+                self.__head, self.__held = self.__head + 1, False
+                self.__cond.notify_all()
+
+            self.__cond.wait_for(lambda: self.__closed or self.__unread() > 0)
+            if self.__unread() == 0:
+                return None
+
+            self.__held = True
+            return self.__ring[self.__head % self.capacity]
+
+    def tag(self):
+        """ Tag of the frame returned by the last `get`, None if no frame is held """
+        return self.__tags[self.__head % self.capacity] if self.__held else None
 
-    def put(self, data):
-        self.Q.append(data)
+    def close(self):
+        """ No more frames will be added, wakes up both the sides """
+        with self.__cond:
+            self.__closed = True
+            self.__cond.notify_all()
 
-    def get(self, index=0):
-        return self.Q.pop(index)
+    def closed(self):
+        return self.__closed
 
     def empty(self):
-        return True if self.Q.__len__() == 0 else False
+        return self.__unread() == 0
 
     def qsize(self):
-        return self.Q.__len__()
+        return self.__unread()
 
     def full(self):
-        return True if self.Q.__len__() == self.maxSize else False
+        return self.__ring is not None and self.__tail - self.__head == self.capacity
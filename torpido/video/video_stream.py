@@ -1,12 +1,15 @@
 import gc
-from queue import Queue, Empty
 from threading import Thread
-from time import sleep
 
 import cv2
 
+from torpido.config.config import Config
 from torpido.config.constants import VIDEO_WIDTH
+from torpido.tools.logger import Log
 from torpido.util import resize
+from torpido.video.ffmpeg_reader import FFmpegReader, ffmpeg_available
+from torpido.video.frame_hash import frame_key
+from torpido.video.smart_queue import SmartQueue
 
 
 class Stream:
@@ -17,24 +20,57 @@ class Stream:
 
     Attributes
     ----------
-    __Q : queue
-        python queue for storing the frames that are to be processed
-    stream : video capture
-        open cv stream object that read the video in frames
+    __Q : SmartQueue
+        ring of preallocated frames that are to be processed, as many frames
+        as fit in `STREAM_BUFFER_MB`
+    __gray : bool
+        frames are converted to gray scale
+    stream : video capture, FFmpegReader
+        open cv stream object that read the video in frames, or the ffmpeg reader
+        that scales and converts the frames in the decoder (`VIDEO_BACKEND`)
     stopped : bool
-        stream is ended or the video is not ended yet
+        reading of the video is ended, frames can still be in the queue
+    fps : float
+        input video fps
+    frame_count : float
+        number of frames in the input video
+    hash : tuple, None
+        hash and mean intensity of the last read frame, computed by the reading thread
+        with `FRAME_DEDUPE`, else None
 
     Examples
     --------
     Reads the video using the Thread and saving the frames in the queue
     to process them. As the video is read by the Thread the speed increases
     and locking functions of open cv can be skipped.
+
+    Notes
+    -----
+    The frame returned by `read` is a view on the queue ring and is only valid
+    till the next `read`, copy or convert the frame to keep it longer.
     """
 
-    def __init__(self, src):
+    def __init__(self, src, gray=False):
         cv2.setUseOptimized(True)
-        self.__Q, self.stream = Queue(maxsize=1200), cv2.VideoCapture(src)
-        self.stopped, self._thread = False, None
+        backend, self.__gray = Config.VIDEO_BACKEND, gray
+
+        if backend == "ffmpeg" and not ffmpeg_available():
+            Log.w("FFmpeg not found, reading the video with opencv")
+            backend = "opencv"
+
+        budget = Config.STREAM_BUFFER_MB * 2 ** 20
+
+        if backend == "ffmpeg":
+            # frames are read from the pipe directly into the ring
+            self.stream = FFmpegReader(src, width=VIDEO_WIDTH, gray=gray, buffers=1)
+            self.__Q = SmartQueue(budget=budget, shape=self.stream.shape)
+            self.fps, self.frame_count = self.stream.fps, self.stream.frame_count
+        else:
+            self.__Q, self.stream = SmartQueue(budget=budget), cv2.VideoCapture(src)
+            self.fps, self.frame_count = self.stream.get(cv2.CAP_PROP_FPS), self.stream.get(cv2.CAP_PROP_FRAME_COUNT)
+
+        self.__ffmpeg, self.stopped, self._thread = backend == "ffmpeg", False, None
+        self.__hashed, self.hash = Config.FRAME_DEDUPE, None
 
     def start(self):
         self._thread = Thread(target=self.__get, name="torpido.video.Stream", args=())
@@ -43,37 +79,40 @@ class Stream:
         return self
 
     def __get(self):
-        while True:
-            if self.stopped:
-                break
+        try:
+            while not self.stopped:
 
-            if not self.__Q.full():
-                (grabbed, frame) = self.stream.read()
+                # ffmpeg has already resized and converted the frame
+                if self.__ffmpeg:
+                    frame = self.__Q.slot()
+                    if frame is None or not self.stream.read(out=frame)[0]:
+                        break
+                    self.__Q.commit(frame_key(frame) if self.__hashed else None)
+                    continue
 
+                (grabbed, frame) = self.stream.read()
                 if not grabbed:
-                    self.stream.release()
-                    self.stopped = True
-                    return
+                    break
 
                 # resizing the reduce memory and since im not using full
                 frame = resize(frame, width=VIDEO_WIDTH)
-                self.__Q.put(frame)
+                if self.__gray:
+                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
-            else:
-                sleep(0.1)
+                # waits for a free frame in the ring, False once stopped
+                if not self.__Q.put(frame, frame_key(frame) if self.__hashed else None):
+                    break
 
-        self.stream.release()
+        # the consumer gets the frames left in the queue, then None
+        finally:
+            self.stopped = True
+            self.__Q.close()
 
     def read(self):
-        try:
-            if self.stopped:
-                return None
-
-            data = self.__Q.get(timeout=3)
-
-        except Empty:
-            data = None
-        return data
+        """ Next frame, valid till the next read, None once all the frames are read """
+        frame = self.__Q.get()
+        self.hash = self.__Q.tag()
+        return frame
 
     def get_capture(self):
         return self.stream
@@ -82,10 +121,11 @@ class Stream:
         return self.__Q.qsize()
 
     def more(self):
-        return not self.stopped
+        return not (self.stopped and self.__Q.empty())
 
     def stop(self):
         self.stopped = True
+        self.__Q.close()
         if self._thread is not None:
             self._thread.join()
             self._thread = None
@@ -4,6 +4,7 @@ that have motion in it, saves in the dictionary with frame numbers
 this dictionary is then saved in a joblib file defined in constants.py
 """
 
+from multiprocessing import Pool
 from time import sleep
 
 import cv2
@@ -14,8 +15,24 @@ from .config.cache import Cache
 from .config.config import Config
 from .config.constants import *
 from .tools.logger import Log
-from .tools.ranking import Ranking
-from .video import Stream
+from .tools.features import FeatureTrack, save_features
+from .tools.ranking import Ranking, RankAccumulator, ShotIndex
+from .util import resize
+from .video import Stream, FrameBatch, HashCache, calibrate_blur_threshold, frame_key, sample_frames
+
+# visual object of the pool worker process
+_worker = None
+
+
+def _init_worker():
+    """ Creates the visual object once for each of the pool workers """
+    global _worker
+    _worker = Visual()
+
+
+def _analyse_range(task):
+    """ Runs the analysis for a time range in the pool worker """
+    return _worker._analyse_range(*task)
 
 
 class Visual:
@@ -27,43 +44,230 @@ class Visual:
     Attributes
     ----------
     self.__blur_threshold : int
-        threshold to rank the blur feature
+        threshold to rank the blur feature, mapped to the `BLUR_MODE`
+    self.__blur_mode : str
+        region of the frames the blur is measured on, "full", "pyramid" or "crop"
     self.__motion_threshold : int
         threshold to rank the motion feature
     self.__fps : float
         input video fps
     self.__frame_count : int
         number of frames
-    self.__motion : list
-        list of the ranks for the motion feature
-    self.__blur : list
-        list of the ranks for the blur feature
+    self.__motion : RankAccumulator
+        per second ranks for the motion feature
+    self.__blur : RankAccumulator
+        per second ranks for the blur feature
+    self.__shots : ShotIndex
+        frames that start a new shot, found from the same frame differences as the motion
+    self.__raw : tuple
+        `FeatureTrack` of the laplacian variance, the max change and the mean change of
+        each frame, saved for the re cuts
     self.__cache : Cache
         cache object to store the data
-    self.__video_stream : Stream
+    self.__video_stream : Stream, FrameReader
         video reader object to read the video and save it in thread
+    self.__workers : int
+        no of worker processes, more than 1 splits the video into time ranges
+    self.__batch_size : int
+        no of frames stacked for a single run of the motion and blur detection
+    self.__dedupe : bool
+        near identical frames reuse the blur of the last analysed frame, their motion is measured
+    self.__hash_cache : HashCache
+        key of the last analysed frame and the hit rate of the dedupe
+    self.__roi : RegionOfInterest, None
+        the frames are cropped to the region, None analyses the full frames
     """
 
     def __init__(self):
         cv2.setUseOptimized(True)
         self.__cache = Cache()
         self.__blur_threshold, self.__motion_threshold = Config.BLUR_THRESHOLD, Config.MOTION_THRESHOLD
-        self.__frame_count = self.__fps = self.__motion = self.__blur = None
+        self.__blur_mode = Config.BLUR_MODE
+        self.__frame_count = self.__fps = self.__motion = self.__blur = self.__shots = self.__raw = None
         self.__video_stream = self.__video_pipe = None
+        self.__workers, self.__batch_size = Config.VISUAL_WORKERS, Config.VISUAL_BATCH_SIZE
+        self.__dedupe, self.__hash_cache, self.__roi = Config.FRAME_DEDUPE, None, None
 
-    def __detect_blur(self, image):
+    def __gray(self, frame):
+        """ Frames from the stream can already be gray, the gray frame is cropped to the region of interest """
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return gray if self.__roi is None else self.__roi.crop(gray)
+
+    def __new_batch(self, first_frame, frame_hash=None):
+        """ Creates the frame batch, the first frame is the baseline of the motion and of the dedupe """
+        batch = FrameBatch(first_frame.shape, self.__batch_size, self.__blur_threshold, self.__motion_threshold,
+                           self.__blur_mode, Config.BLUR_CROP)
+        batch.set_previous(first_frame)
+
+        if self.__dedupe:
+            self.__hash_cache.put(frame_key(first_frame) if frame_hash is None else frame_hash, True)
+        return batch
+
+    def __add_frame(self, batch, frame, frame_hash=None):
         """
-        Laplacian take 2nd derivative of one channel of the image(gray scale)
+        Adds the gray frame to the batch, True when the batch is full. With `FRAME_DEDUPE` a
+        frame near identical to the last analysed frame is added as its duplicate, so its
+        blur is not measured again, the motion is still measured from its own pixels
+
+        Parameters
+        ----------
+        batch : FrameBatch
+            stack of the gray frames
+        frame : np.ndarray
+            gray frame
+        frame_hash : tuple, optional
+            dedupe key computed by the reader, else the frame is hashed here
+        """
+        if not self.__dedupe:
+            return batch.add(frame)
+
+        frame_hash = frame_key(frame) if frame_hash is None else frame_hash
+        if self.__hash_cache.previous(frame_hash) is not None:
+            return batch.add(frame, duplicate=True)
+
+        self.__hash_cache.put(frame_hash, True)
+        return batch.add(frame)
+
+    def __detect_batch(self, batch, motion, blur, shots, raw):
+        """
+        Blur: Laplacian take 2nd derivative of one channel of the image(gray scale)
         It highlights regions of an image containing rapid intensity changes, much like the Sobel and Scharr operators.
-        And then calculates the variance (squared SD), then check if the variance satisfies the Threshold value/
+        And then calculates the variance (squared SD), then check if the variance satisfies the Threshold value
+
+        Motion: Absolute difference of the two blurred frames, if any of the pixel changes more
+        than the motion threshold, the frame has motion in it
+
+        Shots: Mean of the same absolute difference, the whole frame changes at a cut
+
+        All are run for all the frames of the batch at once and the ranks are added
 
         Parameters
-        ---------
-        image : array
-            frame from the video file
+        ----------
+        batch : FrameBatch
+            stack of the gray frames
+        motion : RankAccumulator
+            motion ranks
+        blur : RankAccumulator
+            blur ranks
+        shots : ShotIndex
+            shot cuts
+        raw : tuple
+            `FeatureTrack` of the variance, the max change and the mean change
         """
-        # if blur rank is 0 else RANK_BLUR
-        return 0 if cv2.Laplacian(image, cv2.CV_64F).var() >= self.__blur_threshold else Config.RANK_BLUR
+        variance, delta, change = batch.measure()
+        motion.extend(np.where(delta > self.__motion_threshold, Config.RANK_MOTION, 0))
+        blur.extend(np.where(variance < self.__blur_threshold, Config.RANK_BLUR, 0))
+        shots.extend(change)
+
+        for track, values in zip(raw, (variance, delta, change)):
+            track.extend(values)
+
+    def __calibrate_blur(self, input_file):
+        """
+        Maps the `BLUR_THRESHOLD` of the full frames to the blur mode, using frames spread
+        over the whole video so the existing thresholds keep working for the other modes
+
+        Parameters
+        ----------
+        input_file : str
+            input video file
+        """
+        if self.__blur_mode == "full":
+            return
+
+        frames = [self.__gray(frame) for frame in sample_frames(input_file, BLUR_CALIBRATION_FRAMES)]
+        self.__blur_threshold = calibrate_blur_threshold(frames, Config.BLUR_THRESHOLD, self.__blur_mode,
+                                                         Config.BLUR_CROP)
+        Log.i(f"Blur threshold for the {self.__blur_mode} mode :: {self.__blur_threshold:.2f}")
+
+    def _analyse_range(self, input_file, start, end, blur_threshold, roi=None):
+        """
+        Motion and blur ranks for the frames from start to end. The video is seeked to one
+        frame before the start, so that the motion of the first frame of the range is
+        calculated same as the sequential run. Runs in the worker processes.
+
+        Parameters
+        ----------
+        input_file : str
+            input video file
+        start : int
+            first frame of the range
+        end : int, None
+            frame to stop at, None reads till the end of the video
+        blur_threshold : float
+            blur threshold calibrated by the main process, same for all the ranges
+        roi : RegionOfInterest, optional
+            region the frames are cropped to
+
+        Returns
+        -------
+        tuple
+            motion and blur `RankAccumulator`, the `ShotIndex` and the raw `FeatureTrack` of the
+            range, the ranks start at the same position as in the sequential run, and the
+            `HashCache` of the range
+        """
+        self.__blur_threshold, self.__roi = blur_threshold, roi
+        self.__hash_cache = HashCache("Visual", Config.HASH_DISTANCE)
+        capture = cv2.VideoCapture(str(input_file))
+        position = max(0, start - 1)
+        capture.set(cv2.CAP_PROP_POS_FRAMES, position)
+
+        # the first frame only sets the baseline, so the ranks start at its position
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        motion = RankAccumulator(fps, offset=position, bin_secs=Config.RANK_BIN)
+        blur = RankAccumulator(fps, offset=position, bin_secs=Config.RANK_BIN)
+        shots = ShotIndex(fps, Config.SHOT_THRESHOLD, offset=position)
+        raw = tuple(FeatureTrack(offset=position) for _ in range(3))
+
+        grabbed, frame = capture.read()
+        if not grabbed:
+            capture.release()
+            return motion, blur, shots, raw, self.__hash_cache
+
+        batch = self.__new_batch(self.__gray(resize(frame, width=VIDEO_WIDTH)))
+        position += 1
+
+        while end is None or position < end:
+            grabbed, frame = capture.read()
+            if not grabbed:
+                break
+
+            if self.__add_frame(batch, self.__gray(resize(frame, width=VIDEO_WIDTH))):
+                self.__detect_batch(batch, motion, blur, shots, raw)
+            position += 1
+
+        self.__detect_batch(batch, motion, blur, shots, raw)
+        capture.release()
+        return motion, blur, shots, raw, self.__hash_cache
+
+    def __start_parallel(self, pipe, input_file):
+        """
+        Splits the video into time ranges and analyse each range in its own worker
+        process, the ranks of the ranges are merged.
+
+        Parameters
+        ----------
+        pipe : Communication link
+            set progress on the ui
+        input_file : str
+            input video file
+        """
+        bounds = [int(self.__frame_count * i / self.__workers) for i in range(self.__workers)]
+        ends = bounds[1:] + [None]
+        tasks = [(input_file, start, end, self.__blur_threshold, self.__roi) for start, end in zip(bounds, ends)]
+
+        with Pool(processes=self.__workers, initializer=_init_worker) as pool:
+            for count, (motion, blur, shots, raw, hash_cache) in enumerate(pool.imap(_analyse_range, tasks), 1):
+                self.__motion.merge(motion)
+                self.__blur.merge(blur)
+                self.__shots.merge(shots)
+                for track, part in zip(self.__raw, raw):
+                    track.merge(part)
+                self.__hash_cache.merge(hash_cache)
+
+                # setting progress on the ui
+                if pipe is not None:
+                    pipe.send(ID_COM_PROGRESS, float((count / len(tasks)) * 95.0))
 
     def __timed_ranking_normalize(self):
         """
@@ -76,29 +280,33 @@ class Visual:
         Since ranking is 0 or 1, the mean will be different and we get more versatile
         results.
 
-        We will read both the list and slice the video to get 1 sec of frames(1 * fps) and get
-        mean/average as the rank for the 1 sec
+        The ranks are already summed per bin (`RANK_BIN` secs) by the accumulators while the
+        frames are read, the mean/average of each complete bin is the rank for the bin
 
         """
-        motion_normalize, blur_normalize = list(), list()
-        for i in range(0, int(self.__frame_count), int(self.__fps)):
-            if len(self.__motion) >= (i + int(self.__fps)):
-                motion_normalize.append(np.mean(self.__motion[i: i + int(self.__fps)]))
-                blur_normalize.append(np.mean(self.__blur[i: i + int(self.__fps)]))
-            else:
-                break
+        motion_normalize, blur_normalize = self.__motion.means(), self.__blur.means()
+        shots = self.__shots.seconds()
 
         # saving all processed stuffs
         Ranking.add(CACHE_RANK_MOTION, motion_normalize)
         Ranking.add(CACHE_RANK_BLUR, blur_normalize)
+        Ranking.add(CACHE_SHOTS, shots)
+
+        # raw measurements for the re cuts, along with the blur threshold calibrated for the
+        # blur mode and the `BLUR_THRESHOLD` it was calibrated from
+        variance, delta, change = (track.values() for track in self.__raw)
+        save_features("visual", fps=self.__fps, frame_count=self.__frame_count, rank_bin=Config.RANK_BIN,
+                      variance=variance, delta=delta, change=change, blur_threshold=self.__blur_threshold,
+                      blur_base=Config.BLUR_THRESHOLD)
         Log.d(f"Visual rank length {len(motion_normalize)}  {len(blur_normalize)}")
+        Log.i(f"Shot cuts found :: {len(shots)}")
         Log.i(f"Visual ranking saved .............")
 
     def __del__(self):
         """ Clean  ups """
         del self.__cache, self.__video_stream
 
-    def start_processing(self, pipe, input_file, display=False):
+    def start_processing(self, pipe, input_file, display=False, reader=None, roi=None):
         """
         Function to run the processing on the Video file. Motion and Blur features are
         detected and based on that ranking is set
@@ -111,26 +319,63 @@ class Visual:
             input video file
         display : bool
             True to display the video while processing
+        reader : FrameReader, optional
+            reads the frames from the shared `FrameBus` instead of decoding the video again
+        roi : RegionOfInterest, optional
+            region of interest found by the pre pass, the frames are cropped to it
+
+        Notes
+        -----
+        When `VISUAL_WORKERS` is more than 1 and the video is not displayed, the video is
+        split into time ranges that are analysed in parallel, the reader is not used then.
+        The reader is always stopped, even when the processing fails, so the decoder of the
+        frame bus does not wait for this consumer.
         """
-
+        try:
+            self.__process(pipe, input_file, display, reader, roi)
+        finally:
+            if reader is not None:
+                reader.stop()
+
+    def __process(self, pipe, input_file, display, reader, roi):
+        """ Motion and blur ranking of the video, see `start_processing` """
         if os.path.isfile(input_file) is False:
             Log.e(f"File {input_file} does not exists")
             return
 
-        # maintaining the motion and blur frames list
-        self.__motion, self.__blur = list(), list()
-        self.__video_stream = Stream(str(input_file)).start()
-        my_clip = self.__video_stream.stream
+        parallel = self.__workers > 1 and not display
+        self.__roi = roi
+        self.__calibrate_blur(input_file)
+
+        if parallel:
+            self.__video_stream = None
+            capture = cv2.VideoCapture(str(input_file))
+            fps, total_frames = capture.get(cv2.CAP_PROP_FPS), capture.get(cv2.CAP_PROP_FRAME_COUNT)
+            capture.release()
+        else:
+            if reader is not None:
+                self.__video_stream = reader
+            else:
+                # color frames are only needed for the display
+                self.__video_stream = Stream(str(input_file), gray=not display).start()
+
+            if not self.__video_stream.more():
+                sleep(0.1)
 
-        if not self.__video_stream.more():
-            sleep(0.1)
+            fps, total_frames = self.__video_stream.fps, self.__video_stream.frame_count
 
-        fps = my_clip.get(cv2.CAP_PROP_FPS)
-        total_frames = my_clip.get(cv2.CAP_PROP_FRAME_COUNT)
         self.__fps, self.__frame_count = fps, total_frames
+        self.__hash_cache = HashCache("Visual", Config.HASH_DISTANCE)
+
+        # maintaining the motion and blur ranks per second
+        self.__motion = RankAccumulator(fps, total_frames, bin_secs=Config.RANK_BIN)
+        self.__blur = RankAccumulator(fps, total_frames, bin_secs=Config.RANK_BIN)
+        self.__shots = ShotIndex(fps, Config.SHOT_THRESHOLD)
+        self.__raw = tuple(FeatureTrack() for _ in range(3))
 
         self.__cache.write_data(CACHE_FPS, self.__fps)
         self.__cache.write_data(CACHE_FRAME_COUNT, self.__frame_count)
+        self.__cache.write_data(CACHE_RANK_BIN, Config.RANK_BIN)
         self.__cache.write_data(CACHE_VIDEO_WIDTH, cv2.CAP_PROP_FRAME_WIDTH)
         self.__cache.write_data(CACHE_VIDEO_HEIGHT, cv2.CAP_PROP_FRAME_HEIGHT)
 
@@ -141,8 +386,18 @@ class Visual:
         Log.i(f"Video format :: {cv2.CAP_PROP_FORMAT}")
         Log.i(f"Video four cc :: {cv2.CAP_PROP_FOURCC}")
 
-        first_frame = self.__video_stream.read()
-        first_frame_processed, original, count = True, None, 0
+        if parallel:
+            Log.i(f"Analysing the video in {self.__workers} time ranges")
+            self.__start_parallel(pipe, input_file)
+            if self.__dedupe:
+                self.__hash_cache.log()
+            self.__timed_ranking_normalize()
+            return
+
+        # the frame is only valid till the next read, so it is copied in the batch right away
+        first_frame, original, count, batch = self.__video_stream.read(), None, 0, None
+        if first_frame is not None:
+            batch = self.__new_batch(self.__gray(first_frame), self.__video_stream.hash)
 
         while self.__video_stream.more():
             frame = self.__video_stream.read()
@@ -154,24 +409,9 @@ class Visual:
                 original = frame
             count += 1
 
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            self.__blur.append(self.__detect_blur(frame))
-            frame = cv2.GaussianBlur(frame, (21, 21), 0)
-
-            if first_frame_processed:
-                first_frame = cv2.cvtColor(first_frame, cv2.COLOR_BGR2GRAY)
-                first_frame = cv2.GaussianBlur(first_frame, (21, 21), 0)
-                first_frame_processed = False
-
-            frame_delta = cv2.absdiff(first_frame, frame)
-            thresh = cv2.threshold(frame_delta, self.__motion_threshold, 255, cv2.THRESH_BINARY)[1]
-            # thresh = cv2.adaptiveThreshold(frameDelta, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
-
-            thresh_max = np.max(thresh)
-            if thresh_max > 0:
-                self.__motion.append(Config.RANK_MOTION)
-            else:
-                self.__motion.append(0)
+            # the ranks are calculated once the batch is full
+            if self.__add_frame(batch, self.__gray(frame), self.__video_stream.hash):
+                self.__detect_batch(batch, self.__motion, self.__blur, self.__shots, self.__raw)
 
             if display:
 
@@ -184,13 +424,17 @@ class Visual:
                     cv2.imshow("Video Output", original)
                     # if the `q` key is pressed, break from the loop
 
-            # assigning the processed frame as the first frame to cal diff later on
-            first_frame = frame
-
             # setting progress on the ui
             if pipe is not None:
                 pipe.send(ID_COM_PROGRESS, float((count / total_frames) * 95.0))
 
+        # ranks of the frames left in the batch
+        if batch is not None:
+            self.__detect_batch(batch, self.__motion, self.__blur, self.__shots, self.__raw)
+
+        if self.__dedupe:
+            self.__hash_cache.log()
+
         # completing the progress
         if pipe is not None:
             pipe.send(ID_COM_PROGRESS, 95.0)
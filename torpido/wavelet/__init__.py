@@ -1,4 +1,5 @@
 from .compression import *
 from .fast_transform import FastWaveletTransform
+from .plan import WaveletPlan, getPlan
 from .util import *
 from .wavelets import getAllWavelets
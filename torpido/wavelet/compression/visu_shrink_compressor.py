@@ -27,7 +27,7 @@ class VisuShrinkCompressor:
         self.__compressor = Compressor()
         self.__threshold = None
 
-    def compress(self, coefficients):
+    def compress(self, coefficients, out=None):
         """
         Thresholding by generated the threshold value
 
@@ -35,10 +35,12 @@ class VisuShrinkCompressor:
         ----------
         coefficients: array_like
             input coefficients,  output of the decompose method
+        out: np.ndarray, optional
+            array to write the thresholded coefficients in, can be the coefficients
 
         Returns
         -------
-        array_like
+        np.ndarray
             thresholded coefficients
         """
         # calculating the threshold only once
@@ -46,7 +48,7 @@ class VisuShrinkCompressor:
             sigma = mad(coefficients)
             self.__threshold = sigma * np.sqrt(2 * np.log(len(coefficients)))
 
-        return threshold(coefficients, self.__threshold)
+        return threshold(coefficients, self.__threshold, out=out)
 
     def getCompressionRate(self, data):
         """
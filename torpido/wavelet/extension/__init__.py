@@ -0,0 +1,6 @@
+# the compiled extension is used when it is built, else the numpy transform with the same results
+try:
+    from torpido.wavelet.extension.base_transform import BaseTransform
+    from torpido.wavelet.extension.wavelet_transform import WaveletTransform
+except ImportError:
+    from torpido.wavelet.extension.numpy_transform import BaseTransform, WaveletTransform
@@ -0,0 +1,133 @@
+"""
+Polyphase NumPy implementation of the transforms of the extension, used when the compiled
+extension can not be loaded. Same results as the loops of the `.pyx` files, the periodic
+filtering is split into the even and the odd phases of the signal, so each level is a
+few `np.correlate`/`np.convolve` calls over the whole signal instead of a loop per sample
+"""
+
+import numpy as np
+
+from torpido.wavelet.util import getExponent
+from torpido.wavelet.wavelets import getWaveletDefinition
+
+
+def _phases(filterTaps, length):
+    """
+    Even and odd taps of the first `length` taps of the filter (the length of the mother
+    wavelet, same as the loops), the odd taps are padded to the length of the even taps
+    """
+    taps = np.zeros(length + length % 2)
+    taps[:length] = np.asarray(filterTaps, dtype=np.float64)[:length]
+    return np.ascontiguousarray(taps[0::2]), np.ascontiguousarray(taps[1::2])
+
+
+class WaveletTransform:
+    """
+    Single level periodic dwt and idwt of a wavelet
+
+    Attributes
+    ----------
+    w : object
+        definition of the wavelet
+    __decomposition : tuple
+        even and odd phases of the low and the high decomposition filters
+    __reconstruction : tuple
+        even and odd phases of the low and the high reconstruction filters
+    __taps : int
+        no of taps of each phase
+    __indices : dict
+        periodic index table of each half length, the phase wrapped over its end
+    """
+
+    def __init__(self, waveletName):
+        self.w = getWaveletDefinition(waveletName)
+        length = self.w.__motherWaveletLength__
+        self.__decomposition = (_phases(self.w.decompositionLowFilter, length) +
+                                _phases(self.w.decompositionHighFilter, length))
+        self.__reconstruction = (_phases(self.w.reconstructionLowFilter, length) +
+                                 _phases(self.w.reconstructionHighFilter, length))
+        self.__taps = len(self.__decomposition[0])
+        self.__indices = dict()
+
+    def __wrap(self, half, shift):
+        """ Indices of the phase of `half` values extended by the taps, circularly """
+        key = (half, shift)
+        if key not in self.__indices:
+            self.__indices[key] = (np.arange(half + self.__taps - 1) - shift) % half
+        return self.__indices[key]
+
+    def dwt(self, arrTime, level):
+        """
+        Approximation and detail coefficients of the first `level` values
+
+        out[i] = sum x[(2i + j) % level] * filter[j], for the even and the odd j
+        that is x[2(i + m)] and x[2(i + m) + 1], a correlation of each phase
+        """
+        arrTime = np.asarray(arrTime, dtype=np.float64)[:level]
+        a = level >> 1
+        index = self.__wrap(a, 0)
+        even, odd = arrTime[0::2][index], arrTime[1::2][index]
+        lowEven, lowOdd, highEven, highOdd = self.__decomposition
+
+        arrHilbert = np.empty(level)
+        arrHilbert[:a] = np.correlate(even, lowEven) + np.correlate(odd, lowOdd)
+        arrHilbert[a:] = np.correlate(even, highEven) + np.correlate(odd, highOdd)
+        return arrHilbert
+
+    def idwt(self, arrHilbert, level):
+        """
+        Signal of the approximation and detail coefficients of the first `level` values
+
+        x[2p] and x[2p + 1] sum the coefficients (p - m) % half times the even and the odd
+        taps m, a convolution of the coefficients with each phase
+        """
+        arrHilbert = np.asarray(arrHilbert, dtype=np.float64)[:level]
+        a = level >> 1
+        index = self.__wrap(a, self.__taps - 1)
+        approx, detail = arrHilbert[:a][index], arrHilbert[a:][index]
+        lowEven, lowOdd, highEven, highOdd = self.__reconstruction
+
+        arrTime = np.empty(level)
+        arrTime[0::2] = np.convolve(approx, lowEven, "valid") + np.convolve(detail, highEven, "valid")
+        arrTime[1::2] = np.convolve(approx, lowOdd, "valid") + np.convolve(detail, highOdd, "valid")
+        return arrTime
+
+
+class BaseTransform:
+    """ Multi level transform of a power of 2 length signal, same as the extension """
+
+    def __init__(self, waveletName):
+        self.wavelet = WaveletTransform(waveletName)
+
+    def waveDec1(self, arrTime, level):
+        length = 0
+        arrHilbert = np.array(arrTime, dtype=np.float64)
+        dataLength = len(arrHilbert)
+        transformWaveletLength = 2
+
+        while dataLength >= transformWaveletLength and length < level:
+            arrTemp = self.wavelet.dwt(arrHilbert, dataLength)
+            arrHilbert[: len(arrTemp)] = arrTemp
+
+            dataLength >>= 1
+            length += 1
+
+        return arrHilbert
+
+    def waveRec1(self, arrHilbert, level):
+        arrTime = np.array(arrHilbert, dtype=np.float64)
+        dataLength = len(arrTime)
+        transformWaveletLength = 2
+        h = transformWaveletLength
+
+        steps = getExponent(dataLength) if dataLength > 0 else 0
+        for _ in range(level, steps):
+            h <<= 1
+
+        while len(arrTime) >= h >= transformWaveletLength:
+            arrTemp = self.wavelet.idwt(arrTime, h)
+            arrTime[: len(arrTemp)] = arrTemp
+
+            h <<= 1
+
+        return arrTime
@@ -1,87 +1,125 @@
 """Fast Wavelet Transform calls the Base Transform based on the dimensions"""
 
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
-from torpido.wavelet.extension.base_transform import BaseTransform
+from torpido.wavelet.extension import BaseTransform
 
-from torpido.wavelet.util import decomposeArbitraryLength, scalb, getExponent
+from torpido.wavelet.exceptions import WaveletException
+from torpido.wavelet.plan import getPlan
+from torpido.wavelet.util import getExponent
 
 
 class FastWaveletTransform(BaseTransform):
     """
     Reads the dimensions of the input signal and calls
-    the respective functions of the Base Transform class
+    the respective functions of the Base Transform class.
+    The signals are transformed by the cached plans of their
+    lengths (see `torpido.wavelet.plan`), all the signals along
+    an axis at once, the large levels are split over the threads
+
+    Attributes
+    ----------
+    __waveletName: str
+        name of the wavelet
+    __threads: int
+        no of threads the transforms run on
+    __pool: ThreadPoolExecutor
+        threads of the transforms, made on the first transform
+        (in the process that runs it)
     """
 
-    def __init__(self, waveletName):
+    def __init__(self, waveletName, threads=1):
         super().__init__(waveletName)
+        self.__waveletName = waveletName
+        self.__threads, self.__pool = max(1, int(threads)), None
+
+    def __getPool(self):
+        """ Thread pool of the transforms, None for a single thread """
+        if self.__pool is None and self.__threads > 1:
+            self.__pool = ThreadPoolExecutor(max_workers=self.__threads, thread_name_prefix="wavelet")
+        return self.__pool
 
-    def waverec(self, arrHilbert, level=None):
+    def waverec(self, arrHilbert, level=None, out=None, axis=None):
         """
         Wavelet Reconstruction
 
         Parameters
         ----------
         level: int
-            level for reconstruction
+            level for reconstruction, the max level of each axis by default
         arrHilbert: array_like
             input array in the Hilbert domain
+        out: np.ndarray, optional
+            float64 array of the same shape to write the output in, can be the input
+        axis: int, optional
+            axis of the signals, all the signals along it are reconstructed at once.
+            By default all the axes are reconstructed (the columns then the rows of 2D)
 
         Returns
         -------
-        array_like
+        np.ndarray
             Time domain
         """
-        dimensions = np.ndim(arrHilbert)
-
-        # setting the max level
-        if level is None:
-            level = getExponent(len(arrHilbert))
-
-        # for single dim data
-        if dimensions == 1:
-            # perform ancient egyptian reconstruction
-            return self.__waveRecAncientEgyptian(arrHilbert, level)
+        arrHilbert = np.asarray(arrHilbert, dtype=np.float64)
 
-        # for two dim data
-        if dimensions == 2:
+        # reverse order of the decomposition
+        for axis in self.__getAxes(arrHilbert, axis):
             # perform ancient egyptian reconstruction
-            return self.__waveRecAncientEgyptian2(arrHilbert)
+            arrHilbert = out = self.__waveRecAncientEgyptian(arrHilbert, self.__getLevel(arrHilbert, level, axis),
+                                                             axis, out)
+        return out
 
-    def wavedec(self, arrTime, level=None):
+    def wavedec(self, arrTime, level=None, out=None, axis=None):
         """
         Wavelet Decomposition
 
         Parameters
         ----------
         level: int
-            level for decomposition
+            level for decomposition, the max level of each axis by default
         arrTime: array_like
             input array in the Time domain
+        out: np.ndarray, optional
+            float64 array of the same shape to write the output in, can be the input
+        axis: int, optional
+            axis of the signals, all the signals along it are decomposed at once
+            (a stack of audio blocks or channels). By default all the axes are
+            decomposed (the rows then the columns of 2D)
 
         Returns
         -------
-        array_like
+        np.ndarray
             Hilbert domain
         """
-        dimensions = np.ndim(arrTime)
+        arrTime = np.asarray(arrTime, dtype=np.float64)
 
-        # setting the max level
-        if level is None:
-            level = getExponent(len(arrTime))
-
-        # for two single data
-        if dimensions == 1:
-            # perform ancient egyptian decomposition
-            return self.__waveDecAncientEgyptian(arrTime, level)
-
-        # for two dim data
-        if dimensions == 2:
+        # the last axis first, the rows of 2D
+        for axis in self.__getAxes(arrTime, axis)[::-1]:
             # perform ancient egyptian decomposition
-            return self.__waveDecAncientEgyptian2(arrTime)
-
-    def __waveDecAncientEgyptian(self, arrTime, level):
+            arrTime = out = self.__waveDecAncientEgyptian(arrTime, self.__getLevel(arrTime, level, axis), axis, out)
+        return out
+
+    @staticmethod
+    def __getAxes(arr, axis):
+        """ Axes to transform, the axis or all the axes """
+        if np.ndim(arr) == 0:
+            raise WaveletException("Input should have at least one dimension")
+        return list(range(np.ndim(arr))) if axis is None else [axis]
+
+    @staticmethod
+    def __getLevel(arr, level, axis):
+        """ Level of the axis, by default the max level of its length """
+        return getExponent(arr.shape[axis]) if level is None else level
+
+    @staticmethod
+    def __getOutput(arr, axis):
+        """ Output with the signals along the axis as its contiguous rows """
+        return np.moveaxis(np.empty(np.moveaxis(arr, axis, -1).shape), -1, axis)
+
+    def __waveDecAncientEgyptian(self, arrTime, level, axis, out=None):
         """
-        Wavelet decomposition for data of arbitrary length
+        Wavelet decomposition for data of arbitrary length, of all the signals along the axis
 
         References
         ----------
@@ -94,34 +132,29 @@ class FastWaveletTransform(BaseTransform):
 
         Parameters
         ----------
-        arrTime: array_like
-            input array in the time domain
+        arrTime: np.ndarray
+            input float64 array in the time domain
+        axis: int
+            axis of the signals
+        out: np.ndarray, optional
+            array to write the output in, can be a strided view or the input
 
         Returns
         -------
-        array_like
+        np.ndarray
             hilbert domain array
         """
-        arrHilbert = list()
-        powers = decomposeArbitraryLength(len(arrTime))
-        offset = 0
-
-        # running for each decomposed array by power
-        for power in powers:
-            sliceIndex = int(scalb(1., power))
-            arrTimeSliced = arrTime[offset: (offset + sliceIndex)]
-
-            # run the wavelet decomposition for the slice
-            arrHilbert.extend(self.waveDec1(np.array(arrTimeSliced, dtype=np.float_), level))
-
-            # incrementing the offset
-            offset += sliceIndex
+        out = self.__getOutput(arrTime, axis) if out is None else out
 
-        return arrHilbert
+        # the partition and the transform of each slice is done by the plan of the length,
+        # for all the signals at once
+        plan = getPlan(self.__waveletName, arrTime.shape[axis], level)
+        plan.decompose(np.moveaxis(arrTime, axis, -1), np.moveaxis(out, axis, -1), self.__getPool())
+        return out
 
-    def __waveRecAncientEgyptian(self, arrHilbert, level):
+    def __waveRecAncientEgyptian(self, arrHilbert, level, axis, out=None):
         """
-        Wavelet reconstruction for data of arbitrary length
+        Wavelet reconstruction for data of arbitrary length, of all the signals along the axis
 
         References
         ----------
@@ -134,116 +167,22 @@ class FastWaveletTransform(BaseTransform):
 
         Parameters
         ----------
-        arrHilbert: array_like
-            input array in the hilbert domain
+        arrHilbert: np.ndarray
+            input float64 array in the hilbert domain
+        axis: int
+            axis of the signals
+        out: np.ndarray, optional
+            array to write the output in, can be a strided view or the input
 
         Returns
         -------
-        array_like
+        np.ndarray
             hilbert time array
         """
-        arrTime = list()
-        powers = decomposeArbitraryLength(len(arrHilbert))
-        offset = 0
-
-        # running for each decomposed array by power
-        for power in powers:
-            sliceIndex = int(scalb(1., power))
-            arrHilbertSliced = arrHilbert[offset: (offset + sliceIndex)]
-
-            # run the wavelet decomposition for the slice
-            arrTimeSliced = self.waveRec1(np.array(arrHilbertSliced, dtype=np.float_), level)
-            arrTime.extend(arrTimeSliced)
-
-            # incrementing the offset
-            offset += sliceIndex
-
-        return arrTime
-
-    def __waveDecAncientEgyptian2(self, matTime):
-        """
-        Wavelet decomposition for data of arbitrary length (2D)
-
-        References
-        ----------
-        The array is distributed by the length of the power of 2
-        and then wavelet decomposition is performed
-        Look into the utility.decomposeArbitraryLength function
-
-        for a data with length 42
-        Ex: 42 = 2^5, 2^3, 2^1   i.e. 32, 8, 2 lengths partitions are made
-
-        Parameters
-        ----------
-        matTime: array_like
-            input 2D array in the time domain
-
-        Returns
-        -------
-        array_like
-            hilbert domain array
-        """
-        # shape
-        noOfRows = len(matTime)
-        noOfCols = len(matTime[0])
-
-        levelM = getExponent(noOfRows)
-        levelN = getExponent(noOfCols)
-
-        matHilbert = np.zeros(shape=(noOfRows, noOfCols))
-
-        # rows
-        for i in range(noOfRows):
-            # run the decomposition
-            matHilbert[i] = self.__waveDecAncientEgyptian(np.array(matTime[i], dtype=np.float_), levelN)
-
-        # cols
-        for j in range(noOfCols):
-            # run the decomposition
-            matHilbert[:, j] = self.__waveDecAncientEgyptian(np.array(matHilbert[:, j], dtype=np.float_), levelM)
-
-        return matHilbert
-
-    def __waveRecAncientEgyptian2(self, matHilbert):
-        """
-        Wavelet reconstruction for data of arbitrary length (2D)
-
-        References
-        ----------
-        The array is distributed by the length of the power of 2
-        and then wavelet decomposition is performed
-        Look into the utility.decomposeArbitraryLength function
-
-        for a data with length 42
-        Ex: 42 = 2^5, 2^3, 2^1   i.e. 32, 8, 2 lengths partitions are made
-
-        Parameters
-        ----------
-        matHilbert: array_like
-            input 2D array in the hilbert domain
-
-        Returns
-        -------
-        array_like
-            hilbert time array
-        """
-        noOfRows = len(matHilbert)
-        noOfCols = len(matHilbert[0])
-
-        # getting the levels
-        levelM = getExponent(noOfRows)
-        levelN = getExponent(noOfCols)
-
-        matTime = np.zeros(shape=(noOfRows, noOfCols))
-
-        # rows
-        for j in range(noOfCols):
-            # run the reconstruction on the row
-            matTime[:, j] = self.__waveRecAncientEgyptian(np.array(matHilbert[:, j], dtype=np.float_), levelM)
-
-        # cols
-        for i in range(noOfRows):
-            # run the reconstruction on the column
-            matTime[i] = self.__waveRecAncientEgyptian(np.array(matTime[i], dtype=np.float_), levelN)
+        out = self.__getOutput(arrHilbert, axis) if out is None else out
 
-        return matTime
+        # the partition and the transform of each slice is done by the plan of the length,
+        # for all the signals at once
+        plan = getPlan(self.__waveletName, arrHilbert.shape[axis], level)
+        plan.reconstruct(np.moveaxis(arrHilbert, axis, -1), np.moveaxis(out, axis, -1), self.__getPool())
+        return out
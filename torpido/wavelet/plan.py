@@ -0,0 +1,275 @@
+"""
+Transform plans: everything the transform of a signal length needs is made once and reused,
+same as the plans of FFTW. The filters, the periodic index tables of each level and the
+power of 2 partition of the length are precomputed, and the plan owns the scratch buffer
+the levels are gathered in, so the repeated transforms of same length blocks only write
+into the output
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from torpido.wavelet.util import decomposeArbitraryLength, getExponent, scalb
+from torpido.wavelet.wavelets import getWaveletDefinition
+
+# max no of plans kept, the audio blocks are mostly of a single length
+PLAN_CACHE_SIZE = 8
+
+# no of outputs of a level run as a single task of the thread pool, smaller levels run at once
+PARALLEL_CHUNK_ROWS = 1 << 16
+
+
+def _run(kernel, batch, rows, pool):
+    """
+    Runs the kernel on all the signals and the rows of the output, split into chunks that
+    are run by the thread pool, the rows of the long signals or the signals of a batch of
+    short ones. The numpy loops of the kernels release the GIL, so the chunks run in parallel
+    """
+    if pool is None or batch * rows < 2 * PARALLEL_CHUNK_ROWS:
+        kernel(slice(None), slice(None))
+        return
+
+    if rows >= PARALLEL_CHUNK_ROWS:
+        chunks = [(slice(None), slice(start, start + PARALLEL_CHUNK_ROWS))
+                  for start in range(0, rows, PARALLEL_CHUNK_ROWS)]
+    else:
+        signals = PARALLEL_CHUNK_ROWS // rows
+        chunks = [(slice(start, start + signals), slice(None)) for start in range(0, batch, signals)]
+
+    list(pool.map(lambda chunk: kernel(*chunk), chunks))
+
+
+class WaveletPlan:
+    """
+    Multi level periodic transform of a signal of arbitrary length, same as the
+    `BaseTransform.waveDec1` and `waveRec1` of each power of 2 slice. Each level is
+    a single `np.einsum` or `np.matmul` over a strided window view of the gathered
+    scratch buffer, for all the signals of a batch (the rows of a 2D input) at once
+
+    Attributes
+    ----------
+    waveletName : str
+        name of the wavelet
+    length : int
+        length of the signal
+    level : int
+        level of the transform
+    __decomposition : np.ndarray
+        low and high decomposition filters as the rows (2, taps)
+    __reconstruction : np.ndarray
+        even and odd taps (the columns) of the low and the high reconstruction filters,
+        reversed and interleaved for the windows (taps, 2)
+    __slices : list
+        offset, length and the level lengths of the decomposition and the reconstruction
+        of each power of 2 slice
+    __dwt : dict
+        start in the scratch and the periodic index table of the wrapped values of each
+        slice and level length of the decomposition
+    __idwt : dict
+        start in the scratch and the periodic index table of the wrapped coefficients of
+        each slice and level length of the reconstruction
+    __scratch : np.ndarray
+        scratch of the signals as the rows, each slice has its own part of a row
+    __views : tuple
+        batch size and the gathered scratch and its windows of each level for the batch
+
+    Examples
+    --------
+    >>> plan = getPlan("coif1", len(block), 10)
+    >>> coefficients = plan.decompose(block)
+    >>> plan.reconstruct(coefficients, out=coefficients)
+    >>> plan.decompose(np.stack(blocks))  # all the blocks of the length at once
+
+    The scratch is shared by the calls, so a plan runs one transform at a time, the
+    threads of a pool only split the levels of that transform
+    """
+
+    def __init__(self, waveletName, length, level):
+        self.waveletName, self.length, self.level = waveletName, int(length), int(level)
+
+        w = getWaveletDefinition(waveletName)
+        taps = w.__motherWaveletLength__
+
+        # only the taps of the mother wavelet are used, same as the extension
+        filters = np.zeros((4, taps + taps % 2))
+        for row, values in enumerate((w.decompositionLowFilter, w.decompositionHighFilter,
+                                      w.reconstructionLowFilter, w.reconstructionHighFilter)):
+            filters[row, :taps] = np.asarray(values, dtype=np.float64)[:taps]
+
+        taps = filters.shape[1]
+        self.__decomposition = filters[:2].copy()
+        self.__reconstruction = np.ascontiguousarray(
+            filters[2:].reshape(2, -1, 2)[:, ::-1].transpose(1, 0, 2).reshape(-1, 2))
+        half = taps >> 1
+
+        self.__slices, self.__dwt, self.__idwt = list(), dict(), dict()
+        offset, scratch = 0, 0
+        for power in (decomposeArbitraryLength(self.length) if self.length > 0 else []):
+            size = int(scalb(1., power))
+
+            # level lengths 8 -> 4 -> 2 of the decomposition and 2 -> 4 -> 8 of the reconstruction
+            decomposition, dataLength = list(), size
+            while dataLength >= 2 and len(decomposition) < self.level:
+                decomposition.append(dataLength)
+                dataLength >>= 1
+
+            h = 2 << max(0, getExponent(size) - self.level)
+            reconstruction = list()
+            while size >= h >= 2:
+                reconstruction.append(h)
+                h <<= 1
+
+            self.__slices.append((offset, size, decomposition, reconstruction))
+            for dataLength in decomposition:
+                self.__dwt[offset, dataLength] = (scratch, np.arange(dataLength, dataLength + taps - 2) % dataLength)
+            for h in reconstruction:
+                a = h >> 1
+                self.__idwt[offset, h] = (scratch, (np.arange(half - 1) - (half - 1)) % a)
+
+            offset += size
+            scratch += size + taps
+
+        self.__taps, self.__scratchLength = taps, scratch
+        self.__scratch, self.__views = np.empty((0, scratch)), (0, None, None)
+
+    def __workspace(self, batch):
+        """
+        Gathered scratch and its windows of each level for the batch size, made again only
+        when the batch size changes. The scratch grows to the largest batch
+        """
+        if self.__views[0] == batch:
+            return self.__views[1:]
+
+        if len(self.__scratch) < batch:
+            self.__scratch = np.empty((batch, self.__scratchLength))
+
+        scratch, taps, dwt, idwt = self.__scratch[:batch], self.__taps, dict(), dict()
+        for key, (start, index) in self.__dwt.items():
+            gathered = scratch[:, start: start + key[1] + len(index)]
+            dwt[key] = (gathered, sliding_window_view(gathered, taps, axis=-1)[:, ::2])
+
+        # the approximation and the detail coefficients are interleaved, each window is contiguous
+        for key, (start, index) in self.__idwt.items():
+            gathered = scratch[:, start: start + key[1] + 2 * len(index)]
+            idwt[key] = (gathered.reshape(batch, -1, 2), sliding_window_view(gathered, taps, axis=-1)[:, ::2])
+
+        self.__views = (batch, dwt, idwt)
+        return dwt, idwt
+
+    def __dwt1(self, arr, offset, dataLength, views, pool=None):
+        """ Single level decomposition of the first `dataLength` values of the slices in place """
+        index = self.__dwt[offset, dataLength][1]
+        gathered, window = views[offset, dataLength]
+
+        # the values and the first values again, wrapped by the index table for the short lengths
+        np.copyto(gathered[:, :dataLength], arr[:, :dataLength])
+        gathered[:, dataLength:] = arr[:, index]
+
+        # out[i] = sum x[(2i + j) % dataLength] * filter[j], the low and the high filters as the rows
+        out = arr[:, :dataLength].reshape(len(arr), 2, -1)
+        _run(lambda signals, rows: np.einsum("bij,cj->bci", window[signals, rows], self.__decomposition,
+                                             out=out[signals, :, rows]),
+             len(arr), out.shape[2], pool)
+
+    def __idwt1(self, arr, offset, h, views, pool=None):
+        """ Single level reconstruction of the first `h` values of the slices in place """
+        index = self.__idwt[offset, h][1]
+        gathered, window = views[offset, h]
+
+        # the last coefficients (wrapped for the short lengths) and then all the coefficients
+        coefficients = arr[:, :h].reshape(len(arr), 2, -1).transpose(0, 2, 1)
+        gathered[:, :len(index)] = coefficients[:, index]
+        np.copyto(gathered[:, len(index):], coefficients)
+
+        # x[2p + k] = sum of the coefficients (p - m) % half times the taps 2m + k
+        out = arr[:, :h].reshape(len(arr), -1, 2)
+        _run(lambda signals, rows: np.matmul(window[signals, rows], self.__reconstruction, out=out[signals, rows]),
+             len(arr), out.shape[1], pool)
+
+    def __check(self, arr, out):
+        """
+        Output to write in, the output as the rows of the signals and True when the rows
+        are a copy, the output can not be viewed as the rows
+        """
+        arr = np.asarray(arr, dtype=np.float64)
+        if arr.ndim == 0 or arr.shape[-1] != self.length:
+            raise ValueError(f"Plan for length {self.length} got the shape {arr.shape}")
+
+        if out is None:
+            out = arr.copy()
+        elif out is not arr:
+            np.copyto(out, arr)
+
+        # setting the shape of a view fails instead of copying
+        rows = out.view()
+        try:
+            rows.shape = (-1, self.length)
+        except AttributeError:
+            return out, out.reshape(-1, self.length), True
+        return out, rows, False
+
+    def __transform(self, arr, out, pool, forward):
+        """ Runs the levels of each slice on all the signals """
+        out, rows, copied = self.__check(arr, out)
+        dwt, idwt = self.__workspace(len(rows))
+
+        for offset, size, decomposition, reconstruction in self.__slices:
+            sliced = rows[:, offset: offset + size]
+            if forward:
+                for dataLength in decomposition:
+                    self.__dwt1(sliced, offset, dataLength, dwt, pool)
+            else:
+                for h in reconstruction:
+                    self.__idwt1(sliced, offset, h, idwt, pool)
+
+        if copied:
+            np.copyto(out, rows.reshape(out.shape))
+        return out
+
+    def decompose(self, arrTime, out=None, pool=None):
+        """
+        Wavelet decomposition of the signal
+
+        Parameters
+        ----------
+        arrTime: array_like
+            signal of the length of the plan, or the signals along the last axis
+        out: np.ndarray, optional
+            float64 array to write the output in, can be a strided view or the input
+        pool: ThreadPoolExecutor, optional
+            threads the large levels are split over
+
+        Returns
+        -------
+        np.ndarray
+            hilbert domain array
+        """
+        return self.__transform(arrTime, out, pool, forward=True)
+
+    def reconstruct(self, arrHilbert, out=None, pool=None):
+        """
+        Wavelet reconstruction of the coefficients
+
+        Parameters
+        ----------
+        arrHilbert: array_like
+            coefficients of the length of the plan, or the coefficients along the last axis
+        out: np.ndarray, optional
+            float64 array to write the output in, can be a strided view or the input
+        pool: ThreadPoolExecutor, optional
+            threads the large levels are split over
+
+        Returns
+        -------
+        np.ndarray
+            time domain array
+        """
+        return self.__transform(arrHilbert, out, pool, forward=False)
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def getPlan(waveletName, length, level):
+    """ Plan of the transform, the plans of the recently used keys are kept """
+    return WaveletPlan(waveletName, length, level)
@@ -50,22 +50,29 @@ def decomposeArbitraryLength(number):
     return tempArray[:position]
 
 
-def threshold(data, value, substitute=0):
-    """Soft thresholding"""
+def threshold(data, value, substitute=0, out=None):
+    """
+    Soft thresholding
 
-    magnitude = np.absolute(data)
+    The factor of each value is made in the buffer of the magnitude, so the
+    output can be written in `out`, or in place when `out` is the data
+    """
+    data = np.asarray(data)
+    magnitude = np.absolute(data, dtype=np.result_type(data, 1.))
+    cond = np.less(magnitude, value) if substitute != 0 else None
 
     with np.errstate(divide='ignore'):
         # divide by zero okay as np.inf values get clipped, so ignore warning.
-        thresholded = (1 - value / magnitude)
-        thresholded.clip(min=0, max=None, out=thresholded)
-        thresholded *= data
+        np.divide(value, magnitude, out=magnitude)
+        np.subtract(1, magnitude, out=magnitude)
+        magnitude.clip(min=0, max=None, out=magnitude)
+        thresholded = np.multiply(magnitude, data, out=out)
 
-    if substitute == 0:
+    if cond is None:
         return thresholded
     else:
-        cond = np.less(magnitude, value)
-        return np.where(cond, substitute, thresholded)
+        np.copyto(thresholded, substitute, where=cond)
+        return thresholded
 
 
 def mad(data):